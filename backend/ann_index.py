@@ -0,0 +1,284 @@
+"""
+Approximate Nearest-Neighbour Index for 128D Face Encodings
+
+Replaces brute-force linear scans once the gallery is large. Every backend
+only proposes CANDIDATES; distances returned to callers are always exact
+Euclidean distances recomputed from the stored vectors, so threshold
+decisions (0.6 tolerance, 70% confidence floor) are never made on
+approximate distances.
+
+Features:
+- Brute-force backend (exact, used for small galleries)
+- IVF backend in pure NumPy (k-means coarse quantizer + inverted lists)
+- HNSW graph backend when hnswlib is installed
+- Incremental inserts and deletes keyed by caller-chosen ids
+"""
+
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# Galleries smaller than this are scanned exactly
+MIN_INDEX_SIZE = 20000
+
+# Default number of inverted lists probed per IVF query
+DEFAULT_N_PROBE = 16
+
+# Default number of graph candidates examined per HNSW query
+DEFAULT_EF_SEARCH = 128
+
+
+class BruteForceEncodingIndex:
+    """
+    Exact index: scans every stored encoding
+
+    Also the base class of the approximate backends, which only override
+    how candidate slots are proposed (_candidate_slots).
+    """
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+        self._vectors = np.zeros((0, dim), dtype=np.float64)
+        self._slot_keys: List[Optional[Hashable]] = []
+        self._key_slots: Dict[Hashable, int] = {}
+        self._free_slots: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._key_slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._key_slots
+
+    def add(self, key: Hashable, vector: np.ndarray):
+        """Insert (or replace) the encoding stored under key"""
+        if key in self._key_slots:
+            self.remove(key)
+
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = len(self._slot_keys)
+            if slot >= self._vectors.shape[0]:
+                # Amortized growth: double capacity
+                grown = np.zeros((max(2 * self._vectors.shape[0], 64), self.dim), dtype=np.float64)
+                grown[:slot] = self._vectors[:slot]
+                self._vectors = grown
+            self._slot_keys.append(None)
+
+        self._vectors[slot] = vector
+        self._slot_keys[slot] = key
+        self._key_slots[key] = slot
+        self._on_add(slot)
+
+    def remove(self, key: Hashable):
+        """Delete the encoding stored under key (no-op if absent)"""
+        slot = self._key_slots.pop(key, None)
+        if slot is None:
+            return
+        self._on_remove(slot)
+        self._slot_keys[slot] = None
+        self._free_slots.append(slot)
+
+    def search(self, query: np.ndarray, k: int = 1) -> Tuple[List[Hashable], np.ndarray]:
+        """
+        k nearest encodings, re-ranked by exact distance
+
+        Returns:
+            Tuple of (keys, exact distances), ascending by distance
+        """
+        slots, distances = self._exact(query, self._candidate_slots(query, k))
+        order = np.argsort(distances, kind='stable')[:k]
+        return [self._slot_keys[s] for s in slots[order]], distances[order]
+
+    def range_search(self, query: np.ndarray, radius: float) -> Tuple[List[Hashable], np.ndarray]:
+        """
+        Encodings within radius of query, by exact distance
+
+        Returns:
+            Tuple of (keys, exact distances), ascending by distance
+        """
+        slots, distances = self._exact(query, self._candidate_slots(query, None))
+        within = distances <= radius
+        slots, distances = slots[within], distances[within]
+        order = np.argsort(distances, kind='stable')
+        return [self._slot_keys[s] for s in slots[order]], distances[order]
+
+    def _live_slots(self) -> np.ndarray:
+        return np.fromiter(self._key_slots.values(), dtype=np.int64, count=len(self._key_slots))
+
+    def _exact(self, query: np.ndarray, slots: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Exact Euclidean distances from query to the given slots"""
+        slots = np.sort(slots)
+        distances = np.linalg.norm(self._vectors[slots] - np.asarray(query, dtype=np.float64), axis=1)
+        return slots, distances
+
+    def _candidate_slots(self, query: np.ndarray, k: Optional[int]) -> np.ndarray:
+        """Slots worth scoring exactly; k is None for range queries"""
+        return self._live_slots()
+
+    def _on_add(self, slot: int):
+        pass
+
+    def _on_remove(self, slot: int):
+        pass
+
+
+class IVFEncodingIndex(BruteForceEncodingIndex):
+    """
+    Inverted-file index in pure NumPy
+
+    Encodings are bucketed by their nearest k-means centroid; a query only
+    scores the members of the n_probe buckets closest to it. The quantizer
+    is (re)trained lazily once the index has grown past twice the size it
+    was last trained on, so incremental inserts stay cheap.
+    """
+
+    def __init__(self, dim: int = 128, n_probe: int = DEFAULT_N_PROBE,
+                 min_train_size: int = 1024, seed: int = 0):
+        super().__init__(dim)
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self._rng = np.random.default_rng(seed)
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lists: List[List[int]] = []
+        self._list_arrays: List[Optional[np.ndarray]] = []
+        self._slot_list: Dict[int, int] = {}
+
+    def train(self, iterations: int = 10):
+        """Fit the coarse quantizer on the current encodings and re-bucket them"""
+        live = self._live_slots()
+        n_lists = max(1, int(np.sqrt(len(live))))
+        data = self._vectors[live]
+
+        sample = data
+        if len(sample) > 50 * n_lists:
+            sample = data[self._rng.choice(len(data), 50 * n_lists, replace=False)]
+        centroids = sample[self._rng.choice(len(sample), n_lists, replace=False)].copy()
+
+        for _ in range(iterations):
+            assignment = self._nearest_centroids(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        self._centroids = centroids
+        self._trained_size = len(live)
+        self._lists = [[] for _ in range(n_lists)]
+        self._list_arrays = [None] * n_lists
+        self._slot_list = {}
+        for slot, list_id in zip(live, self._nearest_centroids(data, centroids)):
+            self._lists[list_id].append(int(slot))
+            self._slot_list[int(slot)] = int(list_id)
+
+    @staticmethod
+    def _nearest_centroids(data: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        squared = (
+            np.einsum('ij,ij->i', centroids, centroids)[None, :] -
+            2.0 * (data @ centroids.T)
+        )
+        return np.argmin(squared, axis=1)
+
+    def _needs_training(self) -> bool:
+        return len(self) >= self.min_train_size and len(self) > 2 * self._trained_size
+
+    def _on_add(self, slot: int):
+        if self._centroids is None:
+            return
+        list_id = int(self._nearest_centroids(self._vectors[slot:slot + 1], self._centroids)[0])
+        self._lists[list_id].append(slot)
+        self._list_arrays[list_id] = None
+        self._slot_list[slot] = list_id
+
+    def _on_remove(self, slot: int):
+        list_id = self._slot_list.pop(slot, None)
+        if list_id is not None:
+            self._lists[list_id].remove(slot)
+            self._list_arrays[list_id] = None
+
+    def _candidate_slots(self, query: np.ndarray, k: Optional[int]) -> np.ndarray:
+        if self._needs_training():
+            self.train()
+        if self._centroids is None:
+            return self._live_slots()
+
+        query = np.asarray(query, dtype=np.float64)
+        centroid_distances = np.linalg.norm(self._centroids - query, axis=1)
+        probe = np.argsort(centroid_distances)[:self.n_probe]
+
+        arrays = []
+        for list_id in probe:
+            if self._list_arrays[list_id] is None:
+                self._list_arrays[list_id] = np.array(self._lists[list_id], dtype=np.int64)
+            arrays.append(self._list_arrays[list_id])
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+
+
+class HNSWEncodingIndex(BruteForceEncodingIndex):
+    """
+    Graph index backed by hnswlib (optional dependency)
+
+    The graph proposes ef_search candidates; they are re-ranked with exact
+    distances from the stored vectors. Deletes use hnswlib's mark_deleted.
+    """
+
+    def __init__(self, dim: int = 128, ef_search: int = DEFAULT_EF_SEARCH,
+                 ef_construction: int = 200, m: int = 16):
+        import hnswlib  # ImportError tells create_encoding_index to fall back
+        super().__init__(dim)
+        self.ef_search = ef_search
+        self._graph = hnswlib.Index(space='l2', dim=dim)
+        self._graph_capacity = 1024
+        self._graph.init_index(max_elements=self._graph_capacity, ef_construction=ef_construction, M=m)
+        self._graph.set_ef(ef_search)
+        self._graph_slots = set()
+
+    def _on_add(self, slot: int):
+        if slot in self._graph_slots:
+            # Reused slot: revive the graph node, add_items then updates its vector
+            self._graph.unmark_deleted(slot)
+        elif len(self._graph_slots) >= self._graph_capacity:
+            self._graph_capacity *= 2
+            self._graph.resize_index(self._graph_capacity)
+        self._graph.add_items(self._vectors[slot:slot + 1], np.array([slot]))
+        self._graph_slots.add(slot)
+
+    def _on_remove(self, slot: int):
+        self._graph.mark_deleted(slot)
+
+    def _candidate_slots(self, query: np.ndarray, k: Optional[int]) -> np.ndarray:
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64)
+        count = min(len(self), max(self.ef_search, k or 0))
+        labels, _ = self._graph.knn_query(np.asarray(query, dtype=np.float32).reshape(1, -1), k=count)
+        return labels[0].astype(np.int64)
+
+
+def create_encoding_index(backend: str = 'auto', dim: int = 128, n_probe: int = DEFAULT_N_PROBE,
+                          ef_search: int = DEFAULT_EF_SEARCH) -> BruteForceEncodingIndex:
+    """
+    Create an encoding index
+
+    Args:
+        backend: 'auto' (HNSW if hnswlib is installed, else IVF), 'hnsw', 'ivf' or 'brute'
+        dim: Encoding dimensionality
+        n_probe: Inverted lists probed per query (IVF)
+        ef_search: Graph candidates examined per query (HNSW)
+
+    Returns:
+        Index instance
+    """
+    if backend in ('auto', 'hnsw'):
+        try:
+            return HNSWEncodingIndex(dim, ef_search=ef_search)
+        except ImportError:
+            if backend == 'hnsw':
+                raise
+            print("--- [ANN INDEX] hnswlib not available, using NumPy IVF index ---")
+            backend = 'ivf'
+    if backend == 'ivf':
+        return IVFEncodingIndex(dim, n_probe=n_probe)
+    if backend == 'brute':
+        return BruteForceEncodingIndex(dim)
+    raise ValueError(f"Unknown index backend: {backend}")
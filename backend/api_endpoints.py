@@ -24,12 +24,14 @@ import json
 from datetime import datetime
 from typing import Dict, List, Optional
 import traceback
+import threading
 
 # Import our components
 from photo_processor import PhotoProcessor
 from live_face_scanner_enhanced import LiveFaceScanner
 from multi_angle_database import MultiAngleFaceDatabase
 from enhanced_matching_engine import EnhancedMatchingEngine
+from model_registry import model_registry
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -44,16 +46,23 @@ photo_processor = None
 live_scanner = None
 database = None
 matching_engine = None
+_init_lock = threading.Lock()
 
 def init_components():
     """Initialize components on first use"""
     global photo_processor, live_scanner, database, matching_engine
     
-    if photo_processor is None:
+    with _init_lock:
+        if photo_processor is not None:
+            return
         print("Initializing API components...")
-        photo_processor = PhotoProcessor()
-        live_scanner = LiveFaceScanner(min_quality=0.5)
+        # One database (a connection per request thread) and one set of
+        # warmed-up models for all components; the detector serializes its calls
         database = MultiAngleFaceDatabase()
+        detector = model_registry.get('enhanced_detector')
+        extractor = model_registry.get('feature_extractor')
+        photo_processor = PhotoProcessor(detector=detector, extractor=extractor, database=database)
+        live_scanner = LiveFaceScanner(min_quality=0.5, detector=detector, extractor=extractor, database=database)
         matching_engine = EnhancedMatchingEngine(database)
         print("✓ API components initialized")
 
@@ -355,10 +364,9 @@ def find_similar_faces():
             if image is None:
                 return create_error_response("Failed to load image")
             
-            # Detect face
-            from enhanced_face_detector import EnhancedFaceDetector
-            detector = EnhancedFaceDetector()
-            detections = detector.detect_faces(image)
+            # Detect face (a loaded detector, not a new one per request)
+            with model_registry.lease('enhanced_detector') as detector:
+                detections = detector.detect_faces(image, profile='search')
             
             if len(detections) == 0:
                 return create_error_response("No face detected in image")
@@ -369,8 +377,7 @@ def find_similar_faces():
             x, y, w, h = bbox
             face_img = image[y:y+h, x:x+w]
             
-            from deep_feature_extractor import DeepFeatureExtractor
-            extractor = DeepFeatureExtractor()
+            extractor = model_registry.get('feature_extractor')
             encoding = extractor.extract_encoding(face_img)
             
             if encoding is None:
@@ -428,7 +435,8 @@ def get_system_status():
                 'database': db_stats,
                 'matching_engine': matching_stats,
                 'photo_processor': processing_stats
-            }
+            },
+            'models': model_registry.stats()
         }, "System status retrieved")
         
     except Exception as e:
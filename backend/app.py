@@ -1,12 +1,16 @@
+import time
+# Cold start is measured from here (see /api/health/ready)
+APP_IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask, request, jsonify, send_from_directory, render_template, session, redirect, url_for
 from functools import wraps
 import os
 import base64
 import numpy as np
 import cv2
-import face_recognition
 import shutil
 import threading
+import multiprocessing
 import json
 import mysql.connector
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -17,16 +21,22 @@ import uuid
 from datetime import datetime
 import traceback # Import for better error logging
 
-# Import face recognition models
-from face_model import FaceRecognitionModel
-from multi_angle_face_model import (
-    MultiAngleFaceModel, 
-    preprocess_image_for_recognition, 
-    detect_sunglasses,
-    detect_face_orientation,
-    assess_image_quality,
-    analyze_photo_all_faces_all_angles
-)
+# Face recognition models (face_model, multi_angle_face_model, photo_pipeline)
+# import face_recognition and dlib: they are imported when first used
+from batch_encoding import box_to_location, encode_faces_across_images
+from processing_status import ProcessingStatusBoard, StageTimer, RUN_DONE, RUN_CANCELLED, RUN_FAILED
+from processing_queue import ProcessingQueue, PROCESSING_MAX_EVENTS, PRIORITY_UPLOAD, PRIORITY_BACKFILL
+from image_context import ImageContext
+from processing_manifest import ProcessingManifest, STATUS_PROCESSED, STATUS_NO_FACES, STATUS_ERROR
+from cascade_policy import CascadePolicy
+from model_registry import model_registry, warm_robust_detector
+
+try:
+    from face_recognition_config import CASCADE_POLICY_FILE, PIPELINE_CHUNK_SIZE, MODEL_LOADING
+except ImportError:
+    CASCADE_POLICY_FILE = 'cascade_policy.json'
+    PIPELINE_CHUNK_SIZE = 4
+    MODEL_LOADING = 'background'
 
 # --- CONFIGURATION ---
 app = Flask(__name__, static_folder='../frontend/static', template_folder='../frontend/pages')
@@ -37,6 +47,7 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, '..', 'uploads')
 PROCESSED_FOLDER = os.path.join(BASE_DIR, '..', 'processed')
 EVENTS_DATA_PATH = os.path.join(BASE_DIR, '..', 'events_data.json')
 KNOWN_FACES_DATA_PATH = os.path.join(BASE_DIR, 'known_faces.dat')
+CASCADE_POLICY_PATH = os.path.join(BASE_DIR, CASCADE_POLICY_FILE)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['PROCESSED_FOLDER'] = PROCESSED_FOLDER
 
@@ -44,18 +55,42 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(PROCESSED_FOLDER, exist_ok=True)
 
 # --- INITIALIZE THE ML MODELS ---
-# Old model for backward compatibility
-model = FaceRecognitionModel(data_file=KNOWN_FACES_DATA_PATH)
-
-# New multi-angle model
+# Loaded through model_registry on first use, or ahead of it by
+# start_model_loading() (MODEL_LOADING)
 MULTI_ANGLE_DATA_PATH = os.path.join(BASE_DIR, 'multi_angle_faces.dat')
-multi_angle_model = MultiAngleFaceModel(data_file=MULTI_ANGLE_DATA_PATH)
 
-# Migrate old data to new model if needed
-if len(model.known_encodings) > 0 and len(multi_angle_model.known_faces) == 0:
-    print("--- [INIT] Migrating old face data to multi-angle model ---")
-    multi_angle_model.migrate_from_old_model(model.known_encodings, model.known_ids)
-    print("--- [INIT] Migration complete ---")
+
+def _load_face_model():
+    # Old model for backward compatibility
+    from face_model import FaceRecognitionModel
+    return FaceRecognitionModel(data_file=KNOWN_FACES_DATA_PATH)
+
+
+def _load_multi_angle_model():
+    from multi_angle_face_model import MultiAngleFaceModel
+    multi_angle_model = MultiAngleFaceModel(data_file=MULTI_ANGLE_DATA_PATH)
+
+    # Migrate old data to new model if needed
+    model = get_face_model()
+    if len(model.known_encodings) > 0 and len(multi_angle_model.known_faces) == 0:
+        print("--- [INIT] Migrating old face data to multi-angle model ---")
+        multi_angle_model.migrate_from_old_model(model.known_encodings, model.known_ids)
+        print("--- [INIT] Migration complete ---")
+    return multi_angle_model
+
+
+model_registry.register('face_model', _load_face_model)
+model_registry.register('multi_angle_model', _load_multi_angle_model)
+
+
+def get_face_model():
+    """The legacy gallery, loaded on first use"""
+    return model_registry.get('face_model')
+
+
+def get_multi_angle_model():
+    """The multi-angle gallery (with the legacy one migrated), loaded on first use"""
+    return model_registry.get('multi_angle_model')
 
 # --- HELPER FUNCTIONS ---
 def get_db_connection():
@@ -69,19 +104,37 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# Import robust face detector
+# Detector cascade statistics per event, shared by every processing run
+cascade_policy = CascadePolicy.load(CASCADE_POLICY_PATH)
+
+# Import robust face detector (the registry's instance, so the module-level
+# detect_faces_robust() helper shares it and its cascade policy). Its models
+# load on first use
 try:
     from robust_face_detector import RobustFaceDetector
-    robust_detector = RobustFaceDetector()
+    model_registry.register('robust_detector', lambda: RobustFaceDetector(cascade_policy=cascade_policy),
+                            warm_robust_detector)
     USE_ROBUST_DETECTION = True
-    print("--- [INIT] Robust Face Detector loaded successfully ---")
 except Exception as e:
     USE_ROBUST_DETECTION = False
-    robust_detector = None
     print(f"--- [INIT] Robust Face Detector not available: {e} ---")
     print("--- [INIT] Falling back to standard face_recognition ---")
 
-def process_images(event_id):
+
+def get_robust_detector():
+    """The shared RobustFaceDetector, loaded on first use (None when it cannot be)"""
+    global USE_ROBUST_DETECTION
+    if not USE_ROBUST_DETECTION:
+        return None
+    try:
+        return model_registry.get('robust_detector')
+    except Exception as e:
+        USE_ROBUST_DETECTION = False
+        print(f"--- [INIT] Robust Face Detector not available: {e} ---")
+        print("--- [INIT] Falling back to standard face_recognition ---")
+        return None
+
+def process_images(event_id, cancel_event=None):
     """
     Process images for an event with ROBUST face detection:
     - Uses multiple detection algorithms with automatic fallback
@@ -89,6 +142,9 @@ def process_images(event_id):
     - Image preprocessing for challenging scenarios
     - 1 face = INDIVIDUAL photo (stored ONLY in individual folder, NO watermark)
     - 2+ faces = GROUP photo (stored ONLY in group folder, WITH watermark prefix)
+    
+    Runs are scheduled by processing_queue; cancel_event is set when the
+    event is deleted and is checked between photos.
     """
     try:
         input_dir = os.path.join(app.config['UPLOAD_FOLDER'], event_id)
@@ -100,8 +156,12 @@ def process_images(event_id):
         
         os.makedirs(output_dir, exist_ok=True)
 
+        from photo_pipeline import iter_photo_analyses, workers_per_event, ThroughputMeter
+        model, multi_angle_model = get_face_model(), get_multi_angle_model()
+        robust_detector = get_robust_detector()
+
         print(f"--- [PROCESS] Starting for event: {event_id} ---")
-        if USE_ROBUST_DETECTION:
+        if robust_detector:
             print(f"--- [PROCESS] Using ROBUST face detection (multi-algorithm + preprocessing) ---")
         else:
             print(f"--- [PROCESS] Using standard face detection ---")
@@ -110,185 +170,275 @@ def process_images(event_id):
         skipped_count = 0
         robust_success_count = 0
         
-        for filename in os.listdir(input_dir):
+        # The manifest says in O(1) whether an upload was already handled
+        # (with or without faces); events from before it are indexed once
+        manifest = get_event_manifest(event_id)
+        if not manifest.exists():
+            filed = scan_filed_photos(output_dir)
+            seeded = manifest.bootstrap(input_dir, filed)
+            # Their persons join the event's membership too: this run adds only
+            # the persons of new photos, after which the event counts as indexed
+            index_filed_persons(event_id, {pid for kinds in filed.values() for ids in kinds.values() for pid in ids})
+            print(f"--- [PROCESS] Indexed {seeded} previously processed photos in the manifest ---")
+        
+        # Sorted so a run assigns person IDs in the same order every time
+        pending = []
+        for filename in sorted(os.listdir(input_dir)):
             if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.webp')) and not filename.endswith('_qr.png'):
-                image_path = os.path.join(input_dir, filename)
+                if not manifest.needs_processing(filename, os.path.join(input_dir, filename)):
+                    skipped_count += 1
+                    continue
+                pending.append(filename)
+        print(f"--- [PROCESS] {len(pending)} new or changed photos, {skipped_count} already processed ---")
+        
+        # Detection, encoding and face analysis run in worker processes when
+        # PIPELINE_WORKERS > 1, within this event's share of the CPU budget;
+        # matching and writes stay here, in photo order
+        workers = workers_per_event(PROCESSING_MAX_EVENTS)
+        analyses = iter_photo_analyses(
+            [os.path.join(input_dir, filename) for filename in pending],
+            detector=robust_detector,
+            workers=workers,
+            use_robust=robust_detector is not None,
+            profile=event_id,
+            policy_path=CASCADE_POLICY_PATH
+        )
+        meter = ThroughputMeter(total=len(pending))
+        processing_status.start_run(event_id, total=len(pending), already_processed=skipped_count, workers=workers)
+        run_state = RUN_DONE
+        
+        for filename, analysis in zip(pending, analyses):
+            if cancel_event is not None and cancel_event.is_set():
+                print(f"--- [PROCESS] Cancelled for event: {event_id} ---")
+                run_state = RUN_CANCELLED
+                break
+            meter.tick()
+            image_path = analysis['path']
+            # Detector attempts made in a worker process
+            if analysis.get('detector_trace'):
+                cascade_policy.merge(analysis['detector_trace'])
+            # Worker stage timings, extended with matching and file I/O here
+            timer = StageTimer(analysis['timings'])
+            outcome = STATUS_ERROR
+            print(f"--- [PROCESS] Processing: {filename}")
+            try:
+                # A changed upload is re-filed: drop copies made from its old content
+                previous = manifest.get(filename)
+                if previous and previous.get('person_ids'):
+                    remove_filed_copies(output_dir, filename, previous['person_ids'])
+                
+                if analysis['error']:
+                    manifest.record(filename, image_path, STATUS_ERROR)
+                    skipped_count += 1
+                    continue
+                timer.restart()
                 
-                # CRITICAL FIX: Check if already processed WITH faces
-                # Don't skip if photo was processed but had 0 faces detected
-                already_processed_with_faces = False
-                if os.path.exists(output_dir):
-                    for person_folder in os.listdir(output_dir):
-                        person_path = os.path.join(output_dir, person_folder)
-                        if os.path.isdir(person_path):
-                            # Check individual folder
-                            individual_path = os.path.join(person_path, "individual", filename)
-                            # Check group folder (with watermark)
-                            group_path = os.path.join(person_path, "group", f"watermarked_{filename}")
-                            if os.path.exists(individual_path) or os.path.exists(group_path):
-                                already_processed_with_faces = True
-                                break
+                face_encodings = analysis['encodings']
+                face_count = len(face_encodings)
+                detection_method = analysis['method']
+                if analysis['robust']:
+                    robust_success_count += 1
                 
-                if already_processed_with_faces:
-                    print(f"--- [PROCESS] Skipping {filename} (already processed with faces)")
+                if face_count == 0:
+                    print(f"--- [PROCESS] No faces detected by any method, skipping")
+                    manifest.record(filename, image_path, STATUS_NO_FACES, method=detection_method)
+                    outcome = STATUS_NO_FACES
                     skipped_count += 1
                     continue
                 
-                print(f"--- [PROCESS] Processing: {filename}")
-                try:
-                    face_encodings = []
-                    face_count = 0
-                    detection_method = 'standard'
-                    
-                    # Try ROBUST detection first
-                    if USE_ROBUST_DETECTION and robust_detector:
-                        try:
-                            import cv2
-                            image_cv = cv2.imread(image_path)
-                            
-                            if image_cv is not None:
-                                # Use robust detection with preprocessing
-                                face_detections, method = robust_detector.detect_faces_robust(
-                                    image_cv,
-                                    use_preprocessing=True,
-                                    enhancement_level='medium'
-                                )
-                                
-                                if face_detections:
-                                    # Get encodings from detected faces
-                                    face_encodings = robust_detector.get_face_encodings_from_detections(
-                                        image_cv,
-                                        face_detections
-                                    )
-                                    face_count = len(face_encodings)
-                                    detection_method = f'robust_{method}'
-                                    robust_success_count += 1
-                                    print(f"--- [PROCESS] ROBUST detection ({method}): Found {face_count} face(s)")
-                        except Exception as e:
-                            print(f"--- [PROCESS] Robust detection failed: {e}, falling back to standard ---")
-                    
-                    # Fallback to standard detection if robust failed or not available
-                    if face_count == 0:
-                        image = face_recognition.load_image_file(image_path)
-                        face_encodings = face_recognition.face_encodings(image)
-                        face_count = len(face_encodings)
-                        detection_method = 'standard'
-                        print(f"--- [PROCESS] Standard detection: Found {face_count} face(s)")
-                    
-                    if face_count == 0:
-                        print(f"--- [PROCESS] No faces detected by any method, skipping")
-                        skipped_count += 1
-                        continue
-                    
-                    # ENHANCED: Match faces using intelligent cross-angle matching
-                    person_ids_in_image = set()
+                # ENHANCED: Match faces using intelligent cross-angle matching
+                person_ids_in_image = set()
+                # Event membership is kept per gallery (both use person_NNNN IDs)
+                matched_ids, learned_ids = set(), set()
+                orientations = analysis['orientations']
+                accessories = analysis['accessories']
+                quality_scores = analysis['quality_scores']
+                
+                if orientations is not None:
+                    # Try ENHANCED multi-angle recognition for ALL faces in one batch
+                    match_results = multi_angle_model.recognize_faces_multi_angle_batch(
+                        face_encodings,
+                        photo_orientations=orientations,
+                        has_accessories=accessories,
+                        quality_scores=quality_scores
+                    )
                     
-                    # Analyze photo for orientation and quality
-                    try:
-                        # Load image for analysis
-                        image_rgb = face_recognition.load_image_file(image_path)
+                    for i, face_encoding in enumerate(face_encodings):
+                        person_id, confidence, matched_angle, distance, match_details = match_results[i]
                         
-                        for i, face_encoding in enumerate(face_encodings):
-                            # Get face location for this encoding
-                            if USE_ROBUST_DETECTION and robust_detector and face_detections:
-                                if i < len(face_detections):
-                                    face_location = face_detections[i]['location']
-                                else:
-                                    face_location = None
-                            else:
-                                face_locations_list = face_recognition.face_locations(image_rgb)
-                                face_location = face_locations_list[i] if i < len(face_locations_list) else None
-                            
-                            # Detect orientation and quality
-                            orientation = 'unknown'
-                            has_accessories = False
-                            quality_score = 0.8  # Default
-                            
-                            if face_location:
-                                orientation = detect_face_orientation(image_rgb, face_location)
-                                has_accessories = detect_sunglasses(image_rgb, face_location)
-                                quality_score = assess_image_quality(image_rgb, face_location)
-                            
-                            # Try ENHANCED multi-angle recognition with orientation awareness
-                            person_id, confidence, matched_angle, distance, match_details = multi_angle_model.recognize_face_multi_angle(
-                                face_encoding,
-                                adaptive_tolerance=True,
-                                photo_orientation=orientation,
-                                has_accessories=has_accessories,
-                                quality_score=quality_score
-                            )
-                            
-                            if person_id:
-                                person_ids_in_image.add(person_id)
-                                print(f"--- [PROCESS] ✓ MATCHED {person_id} ---")
-                                print(f"    Confidence: {confidence:.1f}%, Orientation: {orientation}, "
-                                      f"Quality: {quality_score:.2f}, Accessories: {has_accessories}")
-                            else:
-                                # Fallback to old model for backward compatibility
-                                person_id = model.learn_face(face_encoding)
-                                person_ids_in_image.add(person_id)
-                                print(f"--- [PROCESS] New face learned: {person_id} (via fallback) ---")
-                    
-                    except Exception as e:
-                        print(f"--- [PROCESS] Error in enhanced matching: {e}, using basic matching ---")
-                        # Fallback to basic matching
-                        for face_encoding in face_encodings:
-                            person_id, confidence, best_angle, distance, _ = multi_angle_model.recognize_face_multi_angle(
-                                face_encoding,
-                                adaptive_tolerance=True
-                            )
-                            
-                            if person_id:
-                                person_ids_in_image.add(person_id)
-                            else:
-                                person_id = model.learn_face(face_encoding)
-                                person_ids_in_image.add(person_id)
-                    
-                    print(f"--- [PROCESS] Person IDs: {', '.join(person_ids_in_image)} (via {detection_method})")
-                    
-                    # CRITICAL: Classify based on face count
-                    if face_count == 1:
-                        # INDIVIDUAL PHOTO - store ONLY in individual folder, NO watermark
-                        print(f"--- [PROCESS] Classifying as INDIVIDUAL photo")
-                        for pid in person_ids_in_image:
-                            person_dir = os.path.join(output_dir, pid)
-                            individual_dir = os.path.join(person_dir, "individual")
-                            os.makedirs(individual_dir, exist_ok=True)
-                            
-                            dest_path = os.path.join(individual_dir, filename)
-                            shutil.copy(image_path, dest_path)
-                            print(f"--- [PROCESS] Saved to: {pid}/individual/{filename}")
-                    else:
-                        # GROUP PHOTO - store ONLY in group folder, WITH watermark prefix
-                        print(f"--- [PROCESS] Classifying as GROUP photo")
-                        watermarked_filename = f"watermarked_{filename}"
-                        for pid in person_ids_in_image:
-                            person_dir = os.path.join(output_dir, pid)
-                            group_dir = os.path.join(person_dir, "group")
-                            os.makedirs(group_dir, exist_ok=True)
-                            
-                            dest_path = os.path.join(group_dir, watermarked_filename)
-                            shutil.copy(image_path, dest_path)
-                            print(f"--- [PROCESS] Saved to: {pid}/group/{watermarked_filename}")
-                    
-                    processed_count += 1
-                    print(f"--- [PROCESS] ✓ Successfully processed {filename}")
-                    
-                except Exception as e:
-                    print(f"--- [PROCESS] ERROR processing {filename}: {e}")
-                    traceback.print_exc()
-                    skipped_count += 1
+                        if person_id:
+                            person_ids_in_image.add(person_id)
+                            matched_ids.add(person_id)
+                            print(f"--- [PROCESS] ✓ MATCHED {person_id} ---")
+                            print(f"    Confidence: {confidence:.1f}%, Orientation: {orientations[i]}, "
+                                  f"Quality: {quality_scores[i]:.2f}, Accessories: {accessories[i]}")
+                        else:
+                            # Fallback to old model for backward compatibility
+                            person_id = model.learn_face(face_encoding)
+                            person_ids_in_image.add(person_id)
+                            learned_ids.add(person_id)
+                            print(f"--- [PROCESS] New face learned: {person_id} (via fallback) ---")
+                else:
+                    # Face analysis failed: basic matching
+                    match_results = multi_angle_model.recognize_faces_multi_angle_batch(face_encodings)
+                    for face_encoding, (person_id, confidence, best_angle, distance, _) in zip(face_encodings, match_results):
+                        if person_id:
+                            person_ids_in_image.add(person_id)
+                            matched_ids.add(person_id)
+                        else:
+                            person_id = model.learn_face(face_encoding)
+                            person_ids_in_image.add(person_id)
+                            learned_ids.add(person_id)
+                
+                print(f"--- [PROCESS] Person IDs: {', '.join(person_ids_in_image)} (via {detection_method})")
+                multi_angle_model.add_event_members(event_id, matched_ids)
+                model.add_event_members(event_id, learned_ids)
+                timer.lap('match')
+                
+                # CRITICAL: Classify based on face count
+                if face_count == 1:
+                    # INDIVIDUAL PHOTO - store ONLY in individual folder, NO watermark
+                    print(f"--- [PROCESS] Classifying as INDIVIDUAL photo")
+                    for pid in person_ids_in_image:
+                        person_dir = os.path.join(output_dir, pid)
+                        individual_dir = os.path.join(person_dir, "individual")
+                        os.makedirs(individual_dir, exist_ok=True)
+                        
+                        dest_path = os.path.join(individual_dir, filename)
+                        shutil.copy(image_path, dest_path)
+                        print(f"--- [PROCESS] Saved to: {pid}/individual/{filename}")
+                else:
+                    # GROUP PHOTO - store ONLY in group folder, WITH watermark prefix
+                    print(f"--- [PROCESS] Classifying as GROUP photo")
+                    watermarked_filename = f"watermarked_{filename}"
+                    for pid in person_ids_in_image:
+                        person_dir = os.path.join(output_dir, pid)
+                        group_dir = os.path.join(person_dir, "group")
+                        os.makedirs(group_dir, exist_ok=True)
+                        
+                        dest_path = os.path.join(group_dir, watermarked_filename)
+                        shutil.copy(image_path, dest_path)
+                        print(f"--- [PROCESS] Saved to: {pid}/group/{watermarked_filename}")
+                
+                manifest.record(filename, image_path, STATUS_PROCESSED, face_count=face_count,
+                                person_ids=person_ids_in_image, method=detection_method)
+                timer.lap('file_io')
+                outcome = STATUS_PROCESSED
+                processed_count += 1
+                print(f"--- [PROCESS] ✓ Successfully processed {filename}")
+                
+            except Exception as e:
+                print(f"--- [PROCESS] ERROR processing {filename}: {e}")
+                traceback.print_exc()
+                try:
+                    manifest.record(filename, image_path, STATUS_ERROR)
+                except OSError:
+                    pass
+                skipped_count += 1
+            finally:
+                processing_status.photo_done(event_id, outcome, analysis['timings'])
         
         model.save_model()
+        try:
+            cascade_policy.save()
+        except OSError as e:
+            print(f"--- [PROCESS] Could not save detector cascade statistics: {e} ---")
         print(f"--- [PROCESS] Finished for event: {event_id} ---")
         print(f"--- [PROCESS] Processed: {processed_count}, Skipped: {skipped_count} ---")
-        if USE_ROBUST_DETECTION:
+        meter.report()
+        processing_status.finish_run(event_id, run_state)
+        if robust_detector:
             print(f"--- [PROCESS] Robust detection successful: {robust_success_count}/{processed_count} ---")
-            if robust_detector:
+            # Worker processes keep their own statistics
+            if workers <= 1:
                 robust_detector.print_stats()
     except Exception as e:
         print(f"--- [PROCESS] FATAL ERROR during processing for event {event_id}: {e}")
         traceback.print_exc()
+        processing_status.finish_run(event_id, RUN_FAILED)
+
+
+# One pending run per event, a bounded number of events at a time
+processing_queue = ProcessingQueue(process_images, max_events=PROCESSING_MAX_EVENTS)
+
+# Progress and per-stage timings of each event's latest run
+processing_status = ProcessingStatusBoard()
+
+
+_event_manifests = {}
+_event_manifests_lock = threading.Lock()
+
+
+def get_event_manifest(event_id):
+    """The event's processing manifest, shared by every thread that processes it."""
+    with _event_manifests_lock:
+        manifest = _event_manifests.get(event_id)
+        if manifest is None:
+            manifest = ProcessingManifest(os.path.join(app.config['PROCESSED_FOLDER'], event_id))
+            _event_manifests[event_id] = manifest
+        return manifest
+
+
+def scan_filed_photos(event_dir):
+    """
+    One walk of processed/<event_id>: filename -> {'individual': person IDs, 'group': person IDs}.
+    Only used to seed the manifest of events processed before it existed.
+    """
+    filed = {}
+    if not os.path.isdir(event_dir):
+        return filed
+    for person_id in os.listdir(event_dir):
+        for kind in ('individual', 'group'):
+            kind_dir = os.path.join(event_dir, person_id, kind)
+            if not os.path.isdir(kind_dir):
+                continue
+            for name in os.listdir(kind_dir):
+                if kind == 'group':
+                    if not name.startswith('watermarked_'):
+                        continue
+                    name = name[len('watermarked_'):]
+                filed.setdefault(name, {'individual': set(), 'group': set()})[kind].add(person_id)
+    return filed
+
+
+def remove_filed_copies(event_dir, filename, person_ids):
+    """Remove an upload's individual/group copies from the given person folders."""
+    for person_id in person_ids:
+        for path in (os.path.join(event_dir, person_id, "individual", filename),
+                     os.path.join(event_dir, person_id, "group", f"watermarked_{filename}")):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def index_filed_persons(event_id, person_ids):
+    """
+    Adds persons filed under processed/<event_id> to the event membership of
+    the gallery (or galleries) that know them. A folder name does not say
+    which gallery learned the person, as both use person_NNNN IDs, so an ID
+    both know joins both: at worst one extra candidate per gallery, and a
+    match still has to have photos in that folder to be returned.
+    """
+    if person_ids:
+        get_face_model().add_event_members(event_id, person_ids)
+        get_multi_angle_model().add_event_members(event_id, person_ids)
+
+
+def get_event_person_ids(event_id):
+    """
+    The legacy gallery's persons known to appear in an event (the multi-angle
+    gallery restricts itself given the event ID). Events processed before the
+    membership index existed are indexed once from their
+    processed/<event_id>/<person_id> folders.
+    """
+    model, multi_angle_model = get_face_model(), get_multi_angle_model()
+    person_ids = model.event_members(event_id)
+    if not person_ids and not multi_angle_model.event_members(event_id):
+        event_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
+        if os.path.isdir(event_dir):
+            index_filed_persons(event_id, {name for name in os.listdir(event_dir)
+                                           if os.path.isdir(os.path.join(event_dir, name))})
+            person_ids = model.event_members(event_id)
+    return person_ids
 
 
 def allowed_file(filename):
@@ -439,62 +589,70 @@ def recognize_face():
         
         print(f"--- [RECOGNIZE] Multi-angle mode: {multi_angle}, Encodings received: {len(all_encodings)} ---")
         
-        # Decode and process the primary image
-        img_bytes = base64.b64decode(image_data)
-        np_arr = np.frombuffer(img_bytes, np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        # Loaded on the first scan unless start_model_loading() got there first
+        face_recognition = model_registry.get('face_recognition')
+        model, multi_angle_model = get_face_model(), get_multi_angle_model()
+        robust_detector = get_robust_detector() if multi_angle and len(all_encodings) == 3 else None
+        
+        # Decode the primary image once; its RGB view is shared below
+        image_context = ImageContext.from_bytes(base64.b64decode(image_data))
         
         # Use robust detection for better accuracy
         face_encodings_to_match = []
+        # Faces found in the primary image, reused by the enhanced matching below
+        primary_face_locations = None
         
-        if USE_ROBUST_DETECTION and robust_detector and multi_angle and len(all_encodings) == 3:
+        if robust_detector and multi_angle and len(all_encodings) == 3:
             # Process all three angle images with robust detection
             print("--- [RECOGNIZE] Using ROBUST multi-angle recognition ---")
+            angle_contexts = []
+            angle_locations = []
             for enc_data in all_encodings:
                 angle = enc_data.get('angle')
                 angle_image_data = enc_data.get('image')
                 
                 try:
-                    angle_img_bytes = base64.b64decode(angle_image_data)
-                    angle_np_arr = np.frombuffer(angle_img_bytes, np.uint8)
-                    angle_img = cv2.imdecode(angle_np_arr, cv2.IMREAD_COLOR)
+                    angle_context = ImageContext.from_bytes(base64.b64decode(angle_image_data))
                     
-                    # Use robust detection
+                    # Use robust detection; scans keep cascade statistics apart from event photos
                     face_detections, method = robust_detector.detect_faces_robust(
-                        angle_img,
+                        angle_context,
                         use_preprocessing=True,
-                        enhancement_level='medium'
+                        enhancement_level='medium',
+                        profile='scan'
                     )
                     
                     if face_detections:
-                        # Get encodings from detected faces
-                        encodings = robust_detector.get_face_encodings_from_detections(
-                            angle_img,
-                            face_detections
-                        )
-                        if encodings:
-                            face_encodings_to_match.extend(encodings)
-                            print(f"--- [RECOGNIZE] {angle} angle: Found encoding via {method} ---")
+                        locations = [box_to_location(detection['box'], angle_context.shape) for detection in face_detections]
                     else:
                         # Fallback to standard detection
-                        rgb_img = cv2.cvtColor(angle_img, cv2.COLOR_BGR2RGB)
-                        face_locations = face_recognition.face_locations(rgb_img)
-                        if face_locations:
-                            encodings = face_recognition.face_encodings(rgb_img, face_locations)
-                            if encodings:
-                                face_encodings_to_match.extend(encodings)
-                                print(f"--- [RECOGNIZE] {angle} angle: Found encoding via standard detection ---")
+                        method = 'standard detection'
+                        locations = face_recognition.face_locations(angle_context.rgb)
+                    if locations:
+                        angle_contexts.append((angle, method, angle_context))
+                        angle_locations.append(locations)
                 except Exception as e:
                     print(f"--- [RECOGNIZE] Error processing {angle} angle: {e} ---")
                     continue
+            
+            # Encode the faces of all angles in one batch
+            for (angle, method, _), encodings in zip(
+                angle_contexts,
+                encode_faces_across_images([context for _, _, context in angle_contexts], angle_locations)
+            ):
+                encodings = [encoding for encoding in encodings if encoding is not None]
+                if encodings:
+                    face_encodings_to_match.extend(encodings)
+                    print(f"--- [RECOGNIZE] {angle} angle: Found encoding via {method} ---")
         else:
             # Standard single-image recognition
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_img)
-            if not face_locations: 
+            rgb_img = image_context.rgb
+            primary_face_locations = face_recognition.face_locations(rgb_img)
+            if not primary_face_locations: 
                 return jsonify({"success": False, "error": "No face detected in scan."}), 400
             
-            scanned_encodings = face_recognition.face_encodings(rgb_img, face_locations)
+            # Only the first face is matched
+            scanned_encodings = face_recognition.face_encodings(rgb_img, primary_face_locations[:1])
             if scanned_encodings:
                 face_encodings_to_match = [scanned_encodings[0]]
         
@@ -503,21 +661,31 @@ def recognize_face():
         
         print(f"--- [RECOGNIZE] Total encodings to match: {len(face_encodings_to_match)} ---")
         
+        # Only people filed under this event can have photos here; search them
+        # first (the global gallery is the fallback for unindexed events)
+        event_person_ids = get_event_person_ids(event_id)
+        print(f"--- [RECOGNIZE] Event candidates: {len(event_person_ids) or 'all (none indexed)'} ---")
+        
         # Multi-angle matching: Try to match with ANY of the captured encodings
         best_person_id = None
         best_distance = float('inf')
         
         for encoding in face_encodings_to_match:
-            person_id = model.recognize_face(encoding)
-            if person_id:
-                # Calculate distance to get confidence
-                if model.known_encodings:
-                    distances = face_recognition.face_distance(model.known_encodings, encoding)
-                    min_distance = np.min(distances)
-                    if min_distance < best_distance:
-                        best_distance = min_distance
-                        best_person_id = person_id
-                        print(f"--- [RECOGNIZE] Better match found: {person_id} with distance {min_distance:.2f} ---")
+            person_id, distance = model.recognize_face(encoding, candidate_ids=event_person_ids)
+            if person_id and distance < best_distance:
+                best_distance = distance
+                best_person_id = person_id
+                print(f"--- [RECOGNIZE] Better match found: {person_id} with distance {distance:.2f} ---")
+        
+        # A person the legacy gallery knows from other events is no new person
+        if multi_angle and len(face_encodings_to_match) >= 3 and not best_person_id and event_person_ids:
+            for encoding in face_encodings_to_match:
+                person_id, distance = model.recognize_face(encoding)
+                if person_id and distance < best_distance:
+                    best_distance = distance
+                    best_person_id = person_id
+            if best_person_id:
+                print(f"--- [RECOGNIZE] Known from another event: {best_person_id} ---")
         
         # If multi-angle scan, store the encodings in multi-angle model
         if multi_angle and len(face_encodings_to_match) >= 3 and not best_person_id:
@@ -543,17 +711,21 @@ def recognize_face():
             print("--- [RECOGNIZE] Trying ENHANCED multi-angle model recognition ---")
             
             # Detect orientation and quality from the primary image
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            face_locations = face_recognition.face_locations(rgb_img)
+            rgb_img = image_context.rgb
+            face_locations = primary_face_locations
+            if face_locations is None:
+                face_locations = face_recognition.face_locations(rgb_img)
             
             orientation = 'unknown'
             has_accessories = False
             quality_score = 0.8
             
             if face_locations:
-                orientation = detect_face_orientation(rgb_img, face_locations[0])
-                has_accessories = detect_sunglasses(rgb_img, face_locations[0])
-                quality_score = assess_image_quality(rgb_img, face_locations[0])
+                from multi_angle_face_model import analyze_face
+                analysis = analyze_face(rgb_img, face_locations[0], gray=image_context.gray)
+                orientation = analysis['orientation']
+                has_accessories = analysis['has_sunglasses']
+                quality_score = analysis['quality_score']
                 print(f"--- [RECOGNIZE] Detected: orientation={orientation}, accessories={has_accessories}, quality={quality_score:.2f} ---")
             
             for encoding in face_encodings_to_match:
@@ -562,7 +734,8 @@ def recognize_face():
                     adaptive_tolerance=True,
                     photo_orientation=orientation,
                     has_accessories=has_accessories,
-                    quality_score=quality_score
+                    quality_score=quality_score,
+                    event_id=event_id
                 )
                 if person_id and distance < best_distance:
                     best_person_id = person_id
@@ -675,7 +848,7 @@ def upload_event_photos(event_id):
                 file_path = os.path.join(event_dir, filename)
                 file.save(file_path)
                 uploaded_files.append(filename)
-        threading.Thread(target=process_images, args=(event_id,)).start()
+        processing_queue.submit(event_id, priority=PRIORITY_UPLOAD)
 
         if os.path.exists(EVENTS_DATA_PATH):
             with open(EVENTS_DATA_PATH, 'r') as f:
@@ -706,6 +879,20 @@ def api_get_all_events():
         print(f"Error loading events: {e}")
         return jsonify([])
 
+def remove_event_data(event_id):
+    """Delete an event's uploads, filed photos, manifest, status, cascade statistics and membership."""
+    event_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], event_id)
+    event_processed_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
+    if os.path.exists(event_upload_dir): shutil.rmtree(event_upload_dir)
+    if os.path.exists(event_processed_dir): shutil.rmtree(event_processed_dir)
+    with _event_manifests_lock:
+        _event_manifests.pop(event_id, None)
+    processing_status.forget(event_id)
+    cascade_policy.forget(event_id)
+    get_face_model().remove_event(event_id)
+    get_multi_angle_model().remove_event(event_id)
+    print(f"--- [DELETE] Removed the data of event {event_id} ---")
+
 @app.route('/api/events/<event_id>', methods=['DELETE'])
 @login_required
 def delete_event(event_id):
@@ -717,15 +904,41 @@ def delete_event(event_id):
             with open(EVENTS_DATA_PATH, 'w') as f:
                 json.dump(events_data, f, indent=2)
         
-        event_upload_dir = os.path.join(app.config['UPLOAD_FOLDER'], event_id)
-        event_processed_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
-        if os.path.exists(event_upload_dir): shutil.rmtree(event_upload_dir)
-        if os.path.exists(event_processed_dir): shutil.rmtree(event_processed_dir)
+        # A running processing run would recreate the folders and membership:
+        # its files go once it has stopped, without holding up this request
+        if not processing_queue.cancel(event_id, on_stopped=lambda: remove_event_data(event_id)):
+            print(f"--- [DELETE] Processing run for {event_id} still finishing; files removed when it stops ---")
+            return jsonify({"success": True, "message": "Event deleted; its photos are removed once processing stops."}), 202
         return jsonify({"success": True, "message": "Event deleted successfully."})
     except Exception as e:
         print(f"Error deleting event: {e}")
         return jsonify({"success": False, "error": "Failed to delete event"}), 500
 
+@app.route('/api/events/<event_id>/processing', methods=['GET'])
+@login_required
+def get_event_processing_status(event_id):
+    """
+    Processing status of an event: queue state, photo counts of the latest
+    run (done / in flight / queued), photos/sec, ETA and per-stage latency.
+    """
+    try:
+        queue_state = processing_queue.state(event_id)
+        run = processing_status.snapshot(event_id, chunk_size=PIPELINE_CHUNK_SIZE)
+        if queue_state:
+            state = queue_state
+        else:
+            state = run['state'] if run else 'idle'
+        return jsonify({
+            "success": True,
+            "event_id": event_id,
+            "state": state,
+            # A queued follow-up run shows the previous run's figures until it starts
+            "run": run
+        })
+    except Exception as e:
+        print(f"Error getting processing status: {e}")
+        return jsonify({"success": False, "error": "Failed to get processing status"}), 500
+
 # --- FILE SERVING ROUTES ---
 
 # NEW: Get ALL uploaded photos for an event (including unprocessed)
@@ -738,6 +951,7 @@ def get_all_event_photos(event_id):
         processed_dir = os.path.join(app.config['PROCESSED_FOLDER'], event_id)
         
         photos = []
+        manifest = get_event_manifest(event_id) if os.path.exists(processed_dir) else None
         
         # Get all uploaded photos
         if os.path.exists(upload_dir):
@@ -749,7 +963,12 @@ def get_all_event_photos(event_id):
                     # Check if processed
                     is_processed = False
                     face_count = 0
-                    if os.path.exists(processed_dir):
+                    entry = manifest.get(filename) if manifest else None
+                    if entry:
+                        is_processed = entry['status'] == STATUS_PROCESSED
+                        face_count = entry['face_count'] if is_processed else 0
+                    elif manifest and not manifest.exists():
+                        # Event not indexed yet: look for the filed copies
                         for person_folder in os.listdir(processed_dir):
                             person_path = os.path.join(processed_dir, person_folder)
                             if os.path.isdir(person_path):
@@ -825,6 +1044,9 @@ def delete_photo(event_id, filename):
                         os.remove(group_path)
                         deleted_files.append(f"processed/{event_id}/{person_folder}/group/watermarked_{filename}")
         
+        if os.path.exists(processed_dir):
+            get_event_manifest(event_id).forget(filename)
+        
         # Update event photo count
         if os.path.exists(EVENTS_DATA_PATH):
             with open(EVENTS_DATA_PATH, 'r') as f:
@@ -922,13 +1144,90 @@ def get_private_photo(event_id, person_id, photo_type, filename):
     photo_path = os.path.join(app.config['PROCESSED_FOLDER'], event_id, person_id, photo_type)
     return send_from_directory(photo_path, filename)
 
+# --- MODEL LOADING AND HEALTH ---
+# Models the app serves with, in loading order. The robust detector is
+# optional: detection falls back to face_recognition without it
+APP_MODELS = ('face_recognition', 'face_model', 'multi_angle_model') + (('robust_detector',) if USE_ROBUST_DETECTION else ())
+REQUIRED_MODELS = ('face_recognition', 'face_model', 'multi_angle_model')
+
+# Cold start, in seconds since APP_IMPORT_STARTED: until the app can serve
+# requests, and until it serves them without loading a model first
+startup_times = {'mode': MODEL_LOADING, 'serving_seconds': None, 'ready_seconds': None}
+_models_warmed = threading.Event()
+
+
+def _seconds_since_start():
+    return round(time.perf_counter() - APP_IMPORT_STARTED, 3)
+
+
+def warm_app_models():
+    """Load every app model now, then record when the app became ready"""
+    model_registry.warm(APP_MODELS)
+    startup_times['ready_seconds'] = _seconds_since_start()
+    _models_warmed.set()
+    print(f"--- [INIT] Models ready {startup_times['ready_seconds']:.2f}s after start ({MODEL_LOADING} loading) ---")
+
+
+def start_model_loading(mode=MODEL_LOADING):
+    """Load the models as MODEL_LOADING says: 'eager', 'background' or 'lazy'"""
+    if mode == 'eager':
+        warm_app_models()
+    elif mode == 'background':
+        threading.Thread(target=warm_app_models, name='model-warmup', daemon=True).start()
+    else:
+        # Nothing to wait for: each model loads with the first request needing it
+        startup_times['ready_seconds'] = _seconds_since_start()
+        _models_warmed.set()
+
+
+def model_readiness():
+    """Readiness: models loaded as MODEL_LOADING requires and none of the required ones failed"""
+    states = model_registry.readiness(APP_MODELS)
+    ready = _models_warmed.is_set() and all(states[name] != 'failed' for name in REQUIRED_MODELS)
+    return ready, states
+
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Liveness: the process answers requests (models may still be loading)"""
+    return jsonify({"status": "alive", "uptime_seconds": _seconds_since_start()})
+
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Readiness: 200 once requests no longer wait for model loading, 503 before"""
+    ready, states = model_readiness()
+    stats = model_registry.stats()
+    return jsonify({
+        "ready": ready,
+        "startup": startup_times,
+        "models": {
+            name: {
+                "state": states[name],
+                "load_seconds": stats[name]['load_seconds'],
+                "warmup_seconds": stats[name]['warmup_seconds'],
+                "memory_mb": stats[name]['memory_mb'],
+                "error": stats[name]['error']
+            }
+            for name in APP_MODELS
+        }
+    }), 200 if ready else 503
+
+
+# Pipeline worker processes re-import this file when it runs as __main__;
+# they load their own detector and need none of these models
+if multiprocessing.current_process().name == 'MainProcess':
+    start_model_loading()
+    startup_times['serving_seconds'] = _seconds_since_start()
+    print(f"--- [INIT] App ready to serve {startup_times['serving_seconds']:.2f}s after start ({MODEL_LOADING} model loading) ---")
+
 # --- MAIN EXECUTION BLOCK ---
 def process_existing_uploads_on_startup():
     print("--- [LOG] Checking for existing photos on startup... ---")
     if os.path.exists(UPLOAD_FOLDER):
         for event_id in os.listdir(UPLOAD_FOLDER):
             if os.path.isdir(os.path.join(UPLOAD_FOLDER, event_id)):
-                threading.Thread(target=process_images, args=(event_id,)).start()
+                processing_queue.submit(event_id, priority=PRIORITY_BACKFILL)
 
 if __name__ == '__main__':
     if not os.path.exists(EVENTS_DATA_PATH):
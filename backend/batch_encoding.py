@@ -0,0 +1,123 @@
+"""
+Batched Face Encoding
+One descriptor-network pass for every face of one or more images
+
+face_recognition.face_encodings(image, [location]) called once per face
+validates its input, runs the landmark predictor and the descriptor network
+separately for each face. Here each face is aligned once (the 5-point
+predictor, as face_recognition does, then a 150px chip with 0.25 padding)
+and all chips - of one image or of several - go through the dlib descriptor
+network in a single call. Locations are used as given, as face_encodings()
+uses them, so encodings are identical to face_encodings() (boxes reaching
+past the image included; box_to_location() clips detector boxes first).
+
+Features:
+- Results aligned with the input locations; None marks a face that could
+  not be encoded (alignment failure)
+- Cross-image batching (e.g. the three angle shots of a scan)
+- Falls back to per-face face_recognition.face_encodings() when dlib
+  internals are unavailable
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from image_context import ImageContext
+
+# (top, right, bottom, left), as face_recognition uses
+FaceLocation = Tuple[int, int, int, int]
+
+# Chip geometry of dlib's compute_face_descriptor(image, shape)
+CHIP_SIZE = 150
+CHIP_PADDING = 0.25
+
+
+def box_to_location(box, shape=None) -> FaceLocation:
+    """
+    Robust-detector box (x1, y1, x2, y2) -> (top, right, bottom, left),
+    clipped to an image of the given shape (height, width[, ...]) if any
+    """
+    x1, y1, x2, y2 = (int(v) for v in box)
+    if shape is not None:
+        h, w = shape[:2]
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+    return (y1, x2, y2, x1)
+
+
+def _rgb(image):
+    """ImageContexts give their RGB view; arrays are taken as RGB already"""
+    return image.rgb if isinstance(image, ImageContext) else image
+
+
+def _dlib_api():
+    """face_recognition's loaded dlib models, or None (e.g. a stripped install)"""
+    try:
+        import dlib
+        from face_recognition import api
+        api.pose_predictor_5_point, api.face_encoder
+        return dlib, api
+    except (ImportError, AttributeError):
+        return None
+
+
+def encode_faces_across_images(
+    images: Sequence,
+    locations_per_image: Sequence[Sequence[FaceLocation]],
+    num_jitters: int = 1
+) -> List[List[Optional[np.ndarray]]]:
+    """
+    Encode every face of several images with one descriptor-network call
+
+    Args:
+        images: ImageContexts, or RGB arrays as face_recognition takes them
+        locations_per_image: (top, right, bottom, left) locations per image
+        num_jitters: Re-samples per face (as in face_recognition.face_encodings)
+
+    Returns:
+        Per image, a list aligned with its locations: the 128D encoding, or
+        None for a face that could not be encoded
+    """
+    results = [[None] * len(locations) for locations in locations_per_image]
+    models = _dlib_api()
+
+    chips = []
+    owners = []
+    for i, (image, locations) in enumerate(zip(images, locations_per_image)):
+        if not locations:
+            continue
+        rgb = _rgb(image)
+        for j, location in enumerate(locations):
+            location = tuple(int(v) for v in location)
+            try:
+                if models is None:
+                    import face_recognition
+                    encodings = face_recognition.face_encodings(rgb, [location], num_jitters=num_jitters)
+                    results[i][j] = encodings[0] if encodings else None
+                    continue
+                dlib, api = models
+                shape = api.pose_predictor_5_point(rgb, api._css_to_rect(location))
+                chips.append(dlib.get_face_chip(rgb, shape, size=CHIP_SIZE, padding=CHIP_PADDING))
+                owners.append((i, j))
+            except Exception as e:
+                print(f"--- [ENCODE] Could not align face {j} of image {i}: {e} ---")
+
+    if chips:
+        try:
+            descriptors = models[1].face_encoder.compute_face_descriptor(chips, num_jitters)
+            for (i, j), descriptor in zip(owners, descriptors):
+                results[i][j] = np.array(descriptor)
+        except Exception as e:
+            print(f"--- [ENCODE] Batched encoding of {len(chips)} faces failed: {e} ---")
+    return results
+
+
+def encode_faces(image, face_locations: Sequence[FaceLocation], num_jitters: int = 1) -> List[Optional[np.ndarray]]:
+    """
+    Encode every face of one image in one batch
+
+    Returns:
+        Encodings aligned with face_locations; None where a face failed
+    """
+    return encode_faces_across_images([image], [face_locations], num_jitters)[0]
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Recall vs latency benchmark: ANN encoding index against brute force
+
+Builds a synthetic face-like gallery (clustered 128D encodings with the
+same inter/intra-person distance profile as dlib encodings), then compares
+every index backend with the exhaustive scan on:
+- Build time
+- Mean / p95 query latency for a 0.6-tolerance match decision
+- Recall@1 (same nearest encoding as brute force)
+- Decision agreement (same matched person / same no-match at 0.6)
+
+Usage:
+    python benchmark_ann_index.py [gallery_size ...]
+"""
+
+import sys
+import time
+import numpy as np
+
+from ann_index import BruteForceEncodingIndex, IVFEncodingIndex, create_encoding_index
+
+TOLERANCE = 0.6
+QUERIES = 300
+
+
+def make_gallery(rng, encodings):
+    """Persons with 3 angle encodings each"""
+    persons = encodings // 3
+    mean = rng.normal(0, 0.08, 128)
+    bases = mean + rng.normal(0, 0.055, (persons, 128))
+    return np.repeat(bases, 3, axis=0) + rng.normal(0, 0.02, (persons * 3, 128))
+
+
+def make_queries(rng, gallery):
+    """Two thirds genuine (noisy copies of stored faces), one third impostors"""
+    genuine = QUERIES * 2 // 3
+    picks = rng.choice(len(gallery), genuine, replace=False)
+    queries = list(gallery[picks] + rng.normal(0, 0.02, (genuine, 128)))
+    mean = gallery.mean(axis=0)
+    queries += list(mean + rng.normal(0, 0.055, (QUERIES - genuine, 128)))
+    return queries
+
+
+def decide(index, query):
+    """Nearest encoding within tolerance, as a match decision would need it"""
+    keys, distances = index.range_search(query, TOLERANCE)
+    if keys:
+        return keys[0] // 3, distances[0]
+    return None, None
+
+
+def run(gallery_size, seed=0):
+    rng = np.random.default_rng(seed)
+    gallery = make_gallery(rng, gallery_size)
+    queries = make_queries(rng, gallery)
+
+    backends = [
+        ('brute force', BruteForceEncodingIndex()),
+        ('ivf n_probe=4', IVFEncodingIndex(n_probe=4)),
+        ('ivf n_probe=8', IVFEncodingIndex(n_probe=8)),
+        ('ivf n_probe=16', IVFEncodingIndex(n_probe=16)),
+    ]
+    for ef_search in (64, 128):
+        try:
+            backends.append((f'hnsw ef={ef_search}', create_encoding_index('hnsw', ef_search=ef_search)))
+        except ImportError:
+            print("hnswlib not installed, skipping HNSW backend")
+            break
+
+    print(f"\nGallery: {len(gallery)} encodings ({len(gallery) // 3} persons), {len(queries)} queries")
+    print(f"{'backend':<16} {'build s':>8} {'mean ms':>8} {'p95 ms':>8} {'recall@1':>9} {'decisions':>10}")
+
+    reference_nearest = None
+    reference_decisions = None
+    for name, index in backends:
+        start = time.perf_counter()
+        for key, vector in enumerate(gallery):
+            index.add(key, vector)
+        index.search(queries[0], k=1)  # triggers lazy IVF training
+        build_seconds = time.perf_counter() - start
+
+        latencies = []
+        decisions = []
+        for query in queries:
+            start = time.perf_counter()
+            decisions.append(decide(index, query)[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+        nearest = [index.search(query, k=1)[0][0] for query in queries]
+
+        if reference_nearest is None:
+            reference_nearest, reference_decisions = nearest, decisions
+        recall = np.mean([a == b for a, b in zip(nearest, reference_nearest)])
+        agreement = np.mean([a == b for a, b in zip(decisions, reference_decisions)])
+
+        print(f"{name:<16} {build_seconds:>8.2f} {np.mean(latencies):>8.2f} "
+              f"{np.percentile(latencies, 95):>8.2f} {recall:>9.3f} {agreement:>10.3f}")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [20000, 100000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: time until app.py serves requests, and until it is ready
+
+Starts a fresh interpreter per run and model loading mode (MODEL_LOADING),
+imports app.py there and reports, in seconds since the interpreter started:
+- serving: import of app.py done, Flask can answer (the login page is fetched)
+- ready: /api/health/ready answers 200 (models loaded as the mode requires)
+- first scan: the models of a face scan are available to its request (in
+  'lazy' mode that request loads them; the time it waits is shown separately)
+and the per-model load times reported by /api/health/ready.
+
+Usage:
+    python benchmark_cold_start.py [mode ...] [--runs N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs in the child interpreter: argv[1] = mode, argv[2] = parent's time.time() at spawn
+CHILD = r'''
+import json, sys, time
+started = float(sys.argv[2])
+since = lambda: time.time() - started
+result = {'interpreter': since()}
+
+import face_recognition_config
+face_recognition_config.MODEL_LOADING = sys.argv[1]
+import app
+result['serving'] = since()
+client = app.app.test_client()
+assert client.get('/login').status_code == 200
+assert client.get('/api/health/live').status_code == 200
+result['first_page'] = since()
+
+while client.get('/api/health/ready').status_code != 200:
+    time.sleep(0.01)
+result['ready'] = since()
+
+# What a face scan needs before it can match
+waited = time.perf_counter()
+app.model_registry.get('face_recognition')
+app.get_face_model()
+app.get_multi_angle_model()
+app.get_robust_detector()
+result['scan_wait'] = time.perf_counter() - waited
+result['first_scan'] = since()
+result['models'] = client.get('/api/health/ready').get_json()['models']
+print('RESULT ' + json.dumps(result))
+'''
+
+
+def run_once(mode):
+    """One cold start in a new interpreter; the child's RESULT line"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get('PYTHONPATH')])))
+    started = time.time()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD, mode, repr(started)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=600
+    )
+    for line in output.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+    raise RuntimeError(f"{mode} run failed:\n{output.stdout[-2000:]}\n{output.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('modes', nargs='*', default=['eager', 'background', 'lazy'])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    columns = ('interpreter', 'serving', 'first_page', 'ready', 'first_scan', 'scan_wait')
+    print(f"\nMedian of {args.runs} cold starts, seconds since the interpreter was launched\n")
+    print(f"{'mode':<11}" + ''.join(f"{name:>12}" for name in columns))
+    last = {}
+    for mode in args.modes:
+        results = [run_once(mode) for _ in range(args.runs)]
+        print(f"{mode:<11}" + ''.join(f"{np.median([r[name] for r in results]):>12.2f}" for name in columns))
+        last[mode] = results[-1]['models']
+
+    print("\nModel load times (last run; seconds, MB of resident memory)")
+    for mode, models in last.items():
+        loads = ', '.join(
+            f"{name} {m['load_seconds']:.2f}s" + (f" +{m['memory_mb']:.0f}MB" if m['memory_mb'] is not None else '')
+            for name, m in models.items()
+        )
+        print(f"  {mode}: {loads}")
+
+
+if __name__ == '__main__':
+    main()
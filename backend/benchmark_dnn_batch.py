@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: batched DNN face detection against one forward pass per image
+
+Runs the res10 SSD face detector of RobustFaceDetector over the size-capped
+copies of the upload set (repeated up to --images), as event processing
+feeds it, and reports images/sec for:
+- per image: the previous detect_faces_dnn (blobFromImage, forward() and a
+  Python loop over the detections for every image)
+- batch N: detect_faces_dnn_batch with N images per blobFromImages() blob and
+  forward() call
+Batched detections are checked against the per-image ones.
+
+Usage:
+    python benchmark_dnn_batch.py [batch_size ...] [--images N] [--photos DIR]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+from image_context import ImageContext
+from robust_face_detector import RobustFaceDetector, detection_scale
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+REPEATS = 3
+
+
+def detect_per_image(detector, image):
+    """detect_faces_dnn as it was before batching"""
+    image = ImageContext.wrap(image).bgr
+    h, w = image.shape[:2]
+    blob = cv2.dnn.blobFromImage(cv2.resize(image, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
+    detector.dnn_detector.setInput(blob)
+    detections = detector.dnn_detector.forward()
+    faces = []
+    for i in range(detections.shape[2]):
+        confidence = detections[0, 0, i, 2]
+        if confidence > 0.3:
+            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
+            (x1, y1, x2, y2) = box.astype("int")
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            faces.append({'box': (x1, y1, x2, y2), 'confidence': float(confidence), 'method': 'dnn'})
+    return faces
+
+
+def images_per_second(run, images):
+    """Median images/sec of REPEATS runs over the images, and the last run's faces"""
+    rates = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        faces = run(images)
+        rates.append(len(images) / (time.perf_counter() - start))
+    return float(np.median(rates)), faces
+
+
+def same_faces(a, b):
+    """Same boxes (1px rounding) and confidences for every image"""
+    for faces_a, faces_b in zip(a, b):
+        if len(faces_a) != len(faces_b):
+            return False
+        for fa, fb in zip(sorted(faces_a, key=lambda f: f['box']), sorted(faces_b, key=lambda f: f['box'])):
+            if np.abs(np.subtract(fa['box'], fb['box'])).max() > 1 or abs(fa['confidence'] - fb['confidence']) > 1e-4:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('batch_sizes', nargs='*', type=int, default=[1, 8, 32])
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--photos', default=UPLOADS_DIR)
+    args = parser.parse_args()
+
+    photos = sorted(
+        path for path in glob.glob(os.path.join(args.photos, '**', '*'), recursive=True)
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+    if not photos:
+        print(f"No photos under {args.photos}")
+        return
+
+    detector = RobustFaceDetector()
+    if not detector.models_loaded.get('dnn'):
+        print("DNN detector not loaded (models/res10_300x300_ssd_iter_140000.caffemodel missing)")
+        return
+
+    # The capped copies detect_faces_robust runs on, decoded outside the timing
+    contexts = [ImageContext.from_file(path) for path in photos]
+    copies = [context.scaled(detection_scale(context.shape)).bgr for context in contexts]
+    images = [copies[i % len(copies)] for i in range(args.images)]
+    print(f"\n{len(images)} images ({len(photos)} photos repeated), OpenCV {cv2.__version__}, "
+          f"{cv2.getNumThreads()} OpenCV threads, {os.cpu_count()} CPUs")
+
+    # Warm-up (first forward pass allocates the network)
+    detector.detect_faces_dnn_batch(images[:2], 2)
+
+    baseline, reference = images_per_second(lambda batch: [detect_per_image(detector, image) for image in batch], images)
+    print(f"{'mode':<12} {'images/s':>9} {'ms/image':>9} {'speedup':>8} {'same':>5}")
+    print(f"{'per image':<12} {baseline:>9.1f} {1000 / baseline:>9.1f} {1.0:>8.2f} {'-':>5}")
+    for batch_size in args.batch_sizes:
+        rate, faces = images_per_second(lambda batch: detector.detect_faces_dnn_batch(batch, batch_size), images)
+        same = 'yes' if same_faces(reference, faces) else 'NO'
+        print(f"{'batch ' + str(batch_size):<12} {rate:>9.1f} {1000 / rate:>9.1f} {rate / baseline:>8.2f} {same:>5}")
+    print(f"\nFaces found: {sum(len(f) for f in reference)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Latency vs recall benchmark: size-capped robust detection against full resolution
+
+Runs RobustFaceDetector.detect_faces_robust on every photo of the upload set
+at full resolution (max_side=0, the original behaviour) and with the longest
+side capped at each given size, and reports:
+- Mean / p95 / total detection latency per photo (decode excluded, the
+  downscale included)
+- Faces found
+- Recall: fraction of full-resolution faces matched by a capped detection
+  (IoU >= 0.5 after mapping boxes back to full resolution)
+- Recall >= min: the same, over full-resolution faces at least
+  DETECTION_MIN_FACE_FRACTION of the photo's shorter side wide
+- Extra: capped detections that match no full-resolution face
+
+Usage:
+    python benchmark_downscale_detection.py [max_side ...] [--photos DIR]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+from image_context import ImageContext
+from robust_face_detector import RobustFaceDetector, DETECTION_MIN_FACE_FRACTION, box_iou as iou
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+REPEATS = 3
+IOU_MATCH = 0.5
+
+
+def match_count(reference, boxes):
+    """Reference boxes matched one-to-one by a box with IoU >= IOU_MATCH"""
+    unused = list(boxes)
+    matched = 0
+    for ref in reference:
+        best = max(unused, key=lambda box: iou(ref, box), default=None)
+        if best is not None and iou(ref, best) >= IOU_MATCH:
+            unused.remove(best)
+            matched += 1
+    return matched
+
+
+def detect(detector, path, max_side):
+    """Median detection latency and the boxes of one photo"""
+    latencies = []
+    for _ in range(REPEATS):
+        context = ImageContext.from_file(path)
+        context.bgr  # decode outside the timed region
+        start = time.perf_counter()
+        faces, _ = detector.detect_faces_robust(context, use_preprocessing=True, max_side=max_side)
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)), [tuple(int(v) for v in face['box']) for face in faces]
+
+
+def expected_faces(path, boxes):
+    """Boxes at least the smallest expected face size of the photo"""
+    min_face = DETECTION_MIN_FACE_FRACTION * min(ImageContext.from_file(path).shape)
+    return [box for box in boxes if box[2] - box[0] >= min_face]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('max_sides', nargs='*', type=int, default=[1600, 1024])
+    parser.add_argument('--photos', default=UPLOADS_DIR)
+    args = parser.parse_args()
+
+    photos = sorted(
+        path for path in glob.glob(os.path.join(args.photos, '**', '*'), recursive=True)
+        if path.lower().endswith(('.jpg', '.jpeg', '.png'))
+    )
+    if not photos:
+        print(f"No photos under {args.photos}")
+        return
+
+    detector = RobustFaceDetector()
+    loaded = [name for name, ok in detector.models_loaded.items() if ok]
+    print(f"\n{len(photos)} photos, detectors: {', '.join(loaded)}")
+
+    modes = [0] + args.max_sides
+    results = {mode: [detect(detector, path, mode) for path in photos] for mode in modes}
+    reference = [boxes for _, boxes in results[0]]
+    reference_expected = [expected_faces(path, boxes) for path, boxes in zip(photos, reference)]
+    total_reference = sum(len(boxes) for boxes in reference)
+    total_expected = sum(len(boxes) for boxes in reference_expected)
+
+    print(f"{'max_side':<12} {'mean ms':>8} {'p95 ms':>8} {'total s':>8} {'faces':>6} {'recall':>7} "
+          f"{'>= min':>7} {'extra':>6}")
+    for mode in modes:
+        latencies = np.array([latency for latency, _ in results[mode]]) * 1000
+        boxes = [found for _, found in results[mode]]
+        found = sum(len(b) for b in boxes)
+        matched = sum(match_count(ref, b) for ref, b in zip(reference, boxes))
+        recall = matched / total_reference if total_reference else 1.0
+        matched_expected = sum(match_count(ref, b) for ref, b in zip(reference_expected, boxes))
+        recall_expected = matched_expected / total_expected if total_expected else 1.0
+        label = 'full res' if mode == 0 else str(mode)
+        print(f"{label:<12} {latencies.mean():>8.1f} {np.percentile(latencies, 95):>8.1f} "
+              f"{latencies.sum() / 1000:>8.2f} {found:>6} {recall:>7.3f} {recall_expected:>7.3f} "
+              f"{found - matched:>6}")
+
+    print("\nPer photo (ms / faces):")
+    for i, path in enumerate(photos):
+        row = "  ".join(f"{results[mode][i][0] * 1000:>8.1f} / {len(results[mode][i][1]):<2}" for mode in modes)
+        print(f"  {os.path.basename(path)[:40]:<40} {row}")
+
+
+if __name__ == '__main__':
+    main()
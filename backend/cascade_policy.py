@@ -0,0 +1,201 @@
+"""
+Cost-Aware Detector Cascade Policy
+Orders and skips face detectors by their measured cost and hit rate
+
+A detector cascade stops at the first detector that finds a face, so the
+expected time to a detection is smallest when detectors run in increasing
+order of cost / P(hit) (mean seconds per attempt over the share of attempts
+that found a face). The policy keeps these statistics per profile - an event
+ID, so an outdoor event where Haar keeps missing and MTCNN always wins gets
+its own order - and for all events together ('*'), which an event falls
+back to for detectors it has not measured yet.
+
+Hit rates are those observed inside the cascade: a detector that only runs
+after others missed sees the harder photos. The statistics decay, so the
+order follows a drifting event instead of its whole history.
+
+Features:
+- order(): detectors in expected-cost order; unmeasured detectors first (so
+  each gets measured once), the given default order when nothing is known
+- Skips a detector that keeps missing, except on every Nth photo (exploration)
+- record() per attempt; drain()/merge() carry attempts from worker processes
+  to the coordinator's policy
+- Persisted to a JSON file (atomic replace), so backfills start tuned
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+try:
+    from face_recognition_config import (
+        CASCADE_POLICY_DECAY,
+        CASCADE_SKIP_HIT_RATE,
+        CASCADE_SKIP_MIN_ATTEMPTS,
+        CASCADE_EXPLORE_INTERVAL,
+    )
+except ImportError:
+    CASCADE_POLICY_DECAY = 0.98
+    CASCADE_SKIP_HIT_RATE = 0.02
+    CASCADE_SKIP_MIN_ATTEMPTS = 30
+    CASCADE_EXPLORE_INTERVAL = 20
+
+# Profile holding the statistics of every event
+GLOBAL_PROFILE = '*'
+
+
+class CascadePolicy:
+    """
+    Per-profile detector statistics and the cascade order they imply
+
+    Usage:
+        policy = CascadePolicy.load('cascade_policy.json')
+        for name in policy.order(event_id, ['haar', 'hog', 'dnn', 'mtcnn']):
+            start = time.perf_counter()
+            faces = detect[name](image)
+            policy.record(event_id, name, time.perf_counter() - start, bool(faces))
+            if faces:
+                break
+        policy.save()
+    """
+
+    def __init__(self, path: Optional[str] = None, decay: float = CASCADE_POLICY_DECAY,
+                 skip_hit_rate: float = CASCADE_SKIP_HIT_RATE,
+                 skip_min_attempts: int = CASCADE_SKIP_MIN_ATTEMPTS,
+                 explore_interval: int = CASCADE_EXPLORE_INTERVAL, keep_trace: bool = False):
+        self.path = path
+        self.decay = decay
+        self.skip_hit_rate = skip_hit_rate
+        self.skip_min_attempts = skip_min_attempts
+        self.explore_interval = explore_interval
+        # profile -> detector -> [attempts, hits, seconds], decayed sums
+        self._stats: Dict[str, Dict[str, List[float]]] = {}
+        # Attempts since the last drain(), kept in worker processes only
+        self.keep_trace = keep_trace
+        self._trace: List[tuple] = []
+        self._calls: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'CascadePolicy':
+        """Policy with the statistics saved at path (empty if missing or unreadable)"""
+        policy = cls(path, **kwargs)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            policy._stats = {
+                profile: {name: [float(v) for v in values] for name, values in detectors.items()}
+                for profile, detectors in stats.items()
+            }
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            print(f"--- [CASCADE] Ignoring unreadable policy file {path}: {e} ---")
+        return policy
+
+    def save(self):
+        """Write the statistics to the policy file"""
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self._stats, indent=1, sort_keys=True)
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(temp_path, self.path)
+
+    def _add(self, profile: str, name: str, seconds: float, hit: bool):
+        entry = self._stats.setdefault(profile, {}).setdefault(name, [0.0, 0.0, 0.0])
+        entry[0] = entry[0] * self.decay + 1.0
+        entry[1] = entry[1] * self.decay + (1.0 if hit else 0.0)
+        entry[2] = entry[2] * self.decay + seconds
+
+    def _record(self, profile, name, seconds, hit):
+        self._add(GLOBAL_PROFILE, name, seconds, hit)
+        if profile is not None:
+            self._add(str(profile), name, seconds, hit)
+
+    def record(self, profile: Optional[str], name: str, seconds: float, hit: bool):
+        """Record one detector attempt for a profile (None = global only)"""
+        with self._lock:
+            self._record(profile, name, seconds, hit)
+            if self.keep_trace:
+                self._trace.append((profile, name, seconds, hit))
+
+    def drain(self) -> List[tuple]:
+        """Attempts recorded since the last drain (for merge() elsewhere)"""
+        with self._lock:
+            trace, self._trace = self._trace, []
+        return trace
+
+    def merge(self, trace: Sequence[Sequence]):
+        """Record attempts drained from another process's policy"""
+        with self._lock:
+            for profile, name, seconds, hit in trace:
+                self._record(profile, name, float(seconds), bool(hit))
+
+    def forget(self, profile: str):
+        """Drop a profile's statistics (e.g. its event was deleted)"""
+        with self._lock:
+            self._stats.pop(str(profile), None)
+
+    def _entry(self, profile: Optional[str], name: str) -> Optional[List[float]]:
+        """The profile's statistics for a detector, else the global ones"""
+        if profile is not None:
+            entry = self._stats.get(str(profile), {}).get(name)
+            if entry and entry[0] > 0:
+                return entry
+        entry = self._stats.get(GLOBAL_PROFILE, {}).get(name)
+        return entry if entry and entry[0] > 0 else None
+
+    def expected_cost(self, profile: Optional[str], name: str) -> float:
+        """Mean seconds per attempt over the hit rate (0.0 while unmeasured)"""
+        entry = self._entry(profile, name)
+        if entry is None:
+            return 0.0
+        attempts, hits, seconds = entry
+        # Laplace prior: one miss and one hit before any observation
+        return (seconds / attempts) / ((hits + 1.0) / (attempts + 2.0))
+
+    def _skippable(self, profile: Optional[str], name: str) -> bool:
+        entry = self._entry(profile, name)
+        if entry is None:
+            return False
+        attempts, hits, _ = entry
+        return attempts >= self.skip_min_attempts and hits / attempts < self.skip_hit_rate
+
+    def order(self, profile: Optional[str], names: Sequence[str], allow_skip: bool = True) -> List[str]:
+        """
+        Detectors to try, cheapest expected time to a detection first
+
+        Args:
+            profile: Event ID (None = global statistics only)
+            names: Available detectors in their default order, which is
+                   kept for ties
+            allow_skip: Leave out detectors that keep missing, except on
+                        every explore_interval-th call for the profile
+        """
+        with self._lock:
+            ordered = sorted(names, key=lambda name: self.expected_cost(profile, name))
+            if allow_skip:
+                key = GLOBAL_PROFILE if profile is None else str(profile)
+                self._calls[key] = self._calls.get(key, 0) + 1
+                explore = not self.explore_interval or self._calls[key] % self.explore_interval == 0
+                kept = [name for name in ordered if explore or not self._skippable(profile, name)]
+                if kept:
+                    ordered = kept
+        return ordered
+
+    def stats(self, profile: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+        """Attempts, hit rate and mean seconds per detector of a profile"""
+        with self._lock:
+            detectors = self._stats.get(GLOBAL_PROFILE if profile is None else str(profile), {})
+            return {
+                name: {
+                    'attempts': round(attempts, 2),
+                    'hit_rate': round(hits / attempts, 3) if attempts else 0.0,
+                    'mean_seconds': round(seconds / attempts, 4) if attempts else 0.0,
+                }
+                for name, (attempts, hits, seconds) in detectors.items()
+            }
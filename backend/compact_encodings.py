@@ -0,0 +1,94 @@
+"""
+Compact Representations for 128D Face Encodings
+
+dlib produces single-precision descriptors, so storing them as float64
+doubles the resident gallery without adding information. Galleries keep
+encodings in a compact dtype (float32 by default) and do arithmetic in
+float64, so distances are exact for the stored values.
+
+Optionally an int8 scalar-quantized copy is scanned first. Each code keeps
+the norm of its quantization error, which turns every approximate distance
+into a guaranteed [lower, upper] interval; only candidates whose interval
+can still reach the best match are re-scored at full precision.
+
+Features:
+- Resolve configured encoding dtypes ('float32', 'float64')
+- Int8 scalar quantizer with per-code error bounds
+- Exact distance intervals from int8 codes
+"""
+
+import numpy as np
+from typing import Tuple
+
+ENCODING_DTYPES = {
+    'float32': np.float32,
+    'float64': np.float64,
+}
+
+# dlib descriptor components stay well inside +-0.5; anything outside is
+# clipped, which only widens that code's error bound
+INT8_RANGE = 0.5
+
+# Slack on squared approximate distances for float32 rounding in the scan
+INT8_SQUARED_SLACK = 1e-4
+
+
+def resolve_dtype(name) -> np.dtype:
+    """Numpy dtype for a configured encoding dtype name (or dtype)"""
+    if isinstance(name, str):
+        if name not in ENCODING_DTYPES:
+            raise ValueError(f"Unknown encoding dtype '{name}', expected one of {sorted(ENCODING_DTYPES)}")
+        return np.dtype(ENCODING_DTYPES[name])
+    return np.dtype(name)
+
+
+class Int8Quantizer:
+    """
+    Symmetric int8 scalar quantizer with per-code error norms
+
+    Usage:
+        quantizer = Int8Quantizer()
+        codes, squared_norms, errors = quantizer.encode(vectors)
+        lower, upper = quantizer.distance_bounds(query, codes, squared_norms, errors)
+    """
+
+    def __init__(self, value_range: float = INT8_RANGE):
+        self.scale = value_range / 127.0
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Quantize vectors along the last axis
+
+        Returns:
+            Tuple of (int8 codes, squared norms of the codes in code units,
+            upper bounds on |vector - decoded code|)
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        codes = np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+        decoded = codes.astype(np.float64) * self.scale
+        errors = np.linalg.norm(vectors - decoded, axis=-1)
+        squared_norms = np.einsum('...d,...d->...', codes.astype(np.float64), codes.astype(np.float64))
+        # Round the error bound up so it stays a bound after any later cast
+        return codes, squared_norms, np.nextafter(errors, np.inf)
+
+    def distance_bounds(self, query: np.ndarray, codes: np.ndarray, squared_norms: np.ndarray,
+                        errors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Guaranteed bounds on the exact distance from query to each encoded vector
+
+        Args:
+            query: 128D query
+            codes: (..., 128) int8 codes
+            squared_norms: (...) squared code norms from encode()
+            errors: (...) quantization error bounds from encode()
+
+        Returns:
+            Tuple of (lower, upper) distance arrays shaped like squared_norms
+        """
+        query = np.asarray(query, dtype=np.float64)
+        flat = codes.reshape(-1, codes.shape[-1])
+        dots = (flat.astype(np.float32) @ query.astype(np.float32)).reshape(squared_norms.shape)
+        squared = query @ query - 2.0 * self.scale * dots + self.scale * self.scale * squared_norms
+        approx_low = np.sqrt(np.maximum(squared - INT8_SQUARED_SLACK, 0.0))
+        approx_high = np.sqrt(np.maximum(squared + INT8_SQUARED_SLACK, 0.0))
+        return np.maximum(approx_low - errors, 0.0), approx_high + errors
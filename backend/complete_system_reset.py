@@ -70,12 +70,18 @@ def complete_reset():
         'multi_angle_model.pkl',
         'face_recognition_model.pkl',
         'known_faces.dat',
-        'multi_angle_faces.dat'
+        'multi_angle_faces.dat',
+        'known_faces.store',
+        'multi_angle_faces.store'
     ]
     
     for model_file in model_files:
         try:
-            if os.path.exists(model_file):
+            if os.path.isdir(model_file):
+                shutil.rmtree(model_file)
+                deleted_items.append(f"Deleted {model_file}")
+                print(f"✓ Deleted {model_file}")
+            elif os.path.exists(model_file):
                 os.remove(model_file)
                 deleted_items.append(f"Deleted {model_file}")
                 print(f"✓ Deleted {model_file}")
@@ -0,0 +1,83 @@
+"""
+convert_to_encoding_store.py
+
+One-shot migration of the pickled galleries (known_faces.dat,
+multi_angle_faces.dat) to the memory-mapped encoding store.
+
+The .dat files are left in place as backups. The models also convert
+automatically on first load; this script does it ahead of deployment and
+can re-convert from the pickles with --force. A store the models refuse to
+load (unreadable) is moved aside to <store>.unreadable first, not deleted.
+
+Usage:
+    python convert_to_encoding_store.py [--force] [data_file ...]
+"""
+
+import os
+import pickle
+import sys
+
+from encoding_store import EncodingStoreError, store_path_for
+from face_model import FaceRecognitionModel
+from multi_angle_face_model import MultiAngleFaceModel
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_FILES = [
+    os.path.join(BASE_DIR, 'known_faces.dat'),
+    os.path.join(BASE_DIR, 'multi_angle_faces.dat')
+]
+
+
+def convert(data_file, force=False):
+    """
+    Convert one pickle to an encoding store
+
+    Returns:
+        Number of persons written, or None if nothing was converted
+    """
+    if not os.path.exists(data_file):
+        print(f"  {data_file} doesn't exist (skipped)")
+        return None
+
+    with open(data_file, 'rb') as f:
+        contents = pickle.load(f)
+    # Legacy model pickles an (encodings, ids) tuple, the multi-angle model a dict
+    model_class = MultiAngleFaceModel if isinstance(contents, dict) else FaceRecognitionModel
+
+    store_path = store_path_for(data_file)
+    if os.path.exists(store_path) and not force:
+        print(f"  {store_path} already exists (use --force to rebuild from the pickle)")
+        return None
+
+    # Constructing the model converts a pickle that has no store yet
+    try:
+        model = model_class(data_file=data_file)
+    except EncodingStoreError:
+        if not force:
+            raise
+        aside = store_path + '.unreadable'
+        print(f"  {store_path} is unreadable, moved to {aside}")
+        os.replace(store_path, aside)
+        model = model_class(data_file=data_file)
+    if force:
+        model.load_pickle()
+        model.save_model()
+
+    count = len(model.known_faces) if model_class is MultiAngleFaceModel else len(model.known_ids)
+    print(f"✓ {data_file} -> {store_path} ({count} persons)")
+    return count
+
+
+def main(argv):
+    force = '--force' in argv
+    data_files = [arg for arg in argv if arg != '--force'] or DEFAULT_DATA_FILES
+
+    print("=" * 70)
+    print("CONVERT PICKLED GALLERIES TO ENCODING STORE")
+    print("=" * 70)
+    for data_file in data_files:
+        convert(data_file, force=force)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,282 @@
+"""
+Memory-Mapped Encoding Store
+On-disk format for face galleries, replacing whole-gallery pickles
+
+Layout of a store directory:
+- <name>-<generation>.npy : fixed-stride arrays (encodings, angle masks)
+- store.json              : sidecar with the current generation, array files
+                            and compact metadata (person IDs, quality scores)
+- wal-<generation>.log    : append-only log of mutations made since that
+                            generation's snapshot
+
+Arrays are opened with np.load(mmap_mode=...), so loading costs one mmap
+per array regardless of gallery size, and worker processes opening the
+same store share the page cache read-only.
+
+Snapshots are atomic: a new generation of array files is written first and
+the sidecar is swapped in with os.replace, so readers always see a complete
+generation. Each generation has its own log, so a crash between the swap and
+the cleanup never replays mutations already in the snapshot.
+
+Log records are length-prefixed and CRC32-checksummed; replay stops at (and
+truncates) a torn or corrupt tail left by an interrupted append.
+
+A store that exists but cannot be read is an error for its gallery
+(EncodingStoreError), never a reason to fall back to an older copy and save
+over it.
+"""
+
+import base64
+import json
+import logging
+import os
+import struct
+import zlib
+import numpy as np
+from typing import Dict, List, Tuple
+
+try:
+    from face_recognition_config import WAL_COMPACT_MIN_RECORDS, WAL_COMPACT_RATIO, WAL_FSYNC
+except ImportError:
+    WAL_COMPACT_MIN_RECORDS = 1000
+    WAL_COMPACT_RATIO = 0.5
+    WAL_FSYNC = True
+
+STORE_FORMAT_VERSION = 1
+STORE_SUFFIX = '.store'
+SIDECAR_NAME = 'store.json'
+
+logger = logging.getLogger(__name__)
+
+# Log record header: payload length, CRC32 of payload
+_RECORD_HEADER = struct.Struct('<II')
+
+
+class EncodingStoreError(RuntimeError):
+    """An existing store could not be loaded; it has been left untouched"""
+
+
+def store_path_for(data_file: str) -> str:
+    """Store directory that replaces a legacy .dat pickle (faces.dat -> faces.store)"""
+    return os.path.splitext(data_file)[0] + STORE_SUFFIX
+
+
+def _json_default(value):
+    """Serialize the numpy scalars/arrays that end up in face metadata"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _record_default(value):
+    """Log records keep arrays bit-exact (raw bytes, base64)"""
+    if isinstance(value, np.ndarray):
+        array = np.ascontiguousarray(value)
+        return {
+            '__ndarray__': base64.b64encode(array.tobytes()).decode('ascii'),
+            'dtype': str(array.dtype),
+            'shape': list(array.shape)
+        }
+    return _json_default(value)
+
+
+def _record_object_hook(obj):
+    if '__ndarray__' in obj:
+        data = base64.b64decode(obj['__ndarray__'])
+        return np.frombuffer(data, dtype=obj['dtype']).reshape(obj['shape']).copy()
+    return obj
+
+
+def _fsync_replace(tmp_path: str, path: str):
+    os.replace(tmp_path, path)
+    if hasattr(os, 'O_DIRECTORY'):
+        # Persist the rename itself (POSIX only)
+        fd = os.open(os.path.dirname(path), os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+class EncodingStore:
+    """
+    Directory of memory-mapped arrays, a JSON sidecar and a write-ahead log
+
+    Usage:
+        store = EncodingStore('multi_angle_faces.store')
+        store.save({'gallery': gallery, 'mask': mask}, {'persons': [...]})
+        store.append({'op': 'put', 'id': 'person_0001', ...})
+        arrays, meta = store.load(mmap_mode='r')
+        records = store.replay()
+    """
+
+    def __init__(self, path: str, fsync: bool = WAL_FSYNC):
+        self.path = path
+        self.sidecar_path = os.path.join(path, SIDECAR_NAME)
+        self.fsync = fsync
+        self.generation = 0  # 0 = no snapshot yet
+        self.log_records = 0
+        if self.exists():
+            # Log appends must target the current snapshot's log even before load()
+            try:
+                self.generation = self._read_sidecar()['generation']
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def exists(self) -> bool:
+        return os.path.exists(self.sidecar_path)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, f"wal-{self.generation:06d}.log")
+
+    def _read_sidecar(self) -> dict:
+        with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get('format_version') != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported encoding store format: {sidecar.get('format_version')}")
+        return sidecar
+
+    def load(self, mmap_mode: str = 'r') -> Tuple[Dict[str, np.ndarray], dict]:
+        """
+        Open the current generation
+
+        Args:
+            mmap_mode: 'r' for shared read-only pages, 'c' for copy-on-write
+                       (writes stay private to the process), None to read into memory
+
+        Returns:
+            Tuple of (arrays by name, metadata dict)
+        """
+        sidecar = self._read_sidecar()
+        arrays = {}
+        for name, info in sidecar['arrays'].items():
+            array = np.load(os.path.join(self.path, info['file']), mmap_mode=mmap_mode, allow_pickle=False)
+            if list(array.shape) != info['shape'] or str(array.dtype) != info['dtype']:
+                raise ValueError(f"Encoding store array '{name}' does not match its sidecar entry")
+            # Plain ndarray view: arithmetic returns ordinary arrays, the mmap stays alive as base
+            arrays[name] = array.view(np.ndarray)
+        self.generation = sidecar['generation']
+        return arrays, sidecar.get('meta', {})
+
+    def save(self, arrays: Dict[str, np.ndarray], meta: dict):
+        """
+        Write a new snapshot generation and atomically make it current
+
+        The write-ahead log starts empty for the new generation.
+
+        Args:
+            arrays: Fixed-stride arrays by name
+            meta: JSON-serializable metadata (numpy scalars are converted)
+        """
+        os.makedirs(self.path, exist_ok=True)
+        generation = self.generation + 1
+        if self.exists():
+            try:
+                generation = max(generation, self._read_sidecar()['generation'] + 1)
+            except (ValueError, KeyError):
+                pass
+
+        entries = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            file_name = f"{name}-{generation:06d}.npy"
+            tmp_path = os.path.join(self.path, file_name + '.tmp')
+            with open(tmp_path, 'wb') as f:
+                np.save(f, array, allow_pickle=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, os.path.join(self.path, file_name))
+            entries[name] = {'file': file_name, 'dtype': str(array.dtype), 'shape': list(array.shape)}
+
+        sidecar = {
+            'format_version': STORE_FORMAT_VERSION,
+            'generation': generation,
+            'arrays': entries,
+            'meta': meta
+        }
+        tmp_path = self.sidecar_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sidecar, f, default=_json_default)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_replace(tmp_path, self.sidecar_path)
+
+        self.generation = generation
+        self.log_records = 0
+        self._remove_stale_files({entry['file'] for entry in entries.values()})
+
+    def append(self, record: dict):
+        """
+        Append one mutation record to the current generation's log
+
+        Args:
+            record: JSON-serializable dict; numpy arrays are stored bit-exact
+        """
+        os.makedirs(self.path, exist_ok=True)
+        payload = json.dumps(record, default=_record_default).encode('utf-8')
+        with open(self.log_path, 'ab') as f:
+            f.write(_RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        self.log_records += 1
+
+    def replay(self) -> List[dict]:
+        """
+        Records logged since the current snapshot, in append order
+
+        A torn or corrupt tail (interrupted append) is truncated away so
+        later appends continue from the last intact record.
+        """
+        self.log_records = 0
+        if not os.path.exists(self.log_path):
+            return []
+
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+
+        records = []
+        offset = 0
+        while offset + _RECORD_HEADER.size <= len(data):
+            length, checksum = _RECORD_HEADER.unpack_from(data, offset)
+            start = offset + _RECORD_HEADER.size
+            payload = data[start:start + length]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                break
+            records.append(json.loads(payload.decode('utf-8'), object_hook=_record_object_hook))
+            offset = start + length
+
+        if offset < len(data):
+            logger.warning(f"--- [ENCODING STORE] Discarding {len(data) - offset} bytes of torn log tail in {self.log_path} ---")
+            with open(self.log_path, 'r+b') as f:
+                f.truncate(offset)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.log_records = len(records)
+        return records
+
+    def needs_compaction(self, live_count: int) -> bool:
+        """
+        Whether the log should be folded into a new snapshot
+
+        The threshold grows with the gallery, so snapshot cost stays
+        amortized O(1) per mutation.
+        """
+        return self.log_records >= max(WAL_COMPACT_MIN_RECORDS, WAL_COMPACT_RATIO * live_count)
+
+    def _remove_stale_files(self, current_files):
+        """Delete array files and logs of older generations"""
+        current_files = set(current_files) | {SIDECAR_NAME, os.path.basename(self.log_path)}
+        for file_name in os.listdir(self.path):
+            if file_name in current_files:
+                continue
+            if file_name.endswith(('.npy', '.tmp', '.log')):
+                try:
+                    os.remove(os.path.join(self.path, file_name))
+                except OSError:
+                    # Still mapped by this process on Windows; retried on the next save
+                    pass
@@ -16,6 +16,8 @@ Features:
 import numpy as np
 from typing import Dict, List, Optional, Tuple
 from multi_angle_database import MultiAngleFaceDatabase
+from ann_index import create_encoding_index, MIN_INDEX_SIZE
+from compact_encodings import resolve_dtype
 import time
 
 class EnhancedMatchingEngine:
@@ -32,19 +34,39 @@ class EnhancedMatchingEngine:
         'right_90': 0.6
     }
     
-    def __init__(self, database: MultiAngleFaceDatabase, threshold: float = 0.6):
+    # Distances are multiplied by this when the stored angle equals the hint
+    SAME_ANGLE_BOOST = 0.9
+    
+    # Batch candidates this close to the best matrix-product distance are
+    # re-scored exactly (the product misorders near-ties in any dtype)
+    BATCH_RESCORE_MARGIN = 1e-3
+    
+    def __init__(self, database: MultiAngleFaceDatabase, threshold: float = 0.6,
+                 index_backend: str = 'ivf', min_index_size: int = MIN_INDEX_SIZE,
+                 encoding_dtype: str = 'float32'):
         """
         Initialize matching engine
         
         Args:
             database: MultiAngleFaceDatabase instance
             threshold: Match distance threshold (default 0.6)
+            index_backend: ANN backend for large databases ('auto', 'hnsw', 'ivf', 'brute')
+            min_index_size: Encodings needed before the ANN index replaces the linear scan
+            encoding_dtype: dtype of the cached encoding matrix ('float32' or 'float64')
         """
         self.database = database
         self.threshold = threshold
         self.encoding_cache = {}
         self.cache_timestamp = 0
         self.cache_ttl = 300  # Cache time-to-live in seconds (5 minutes)
+        self.encoding_matrix = None  # (N x 128) view of encoding_cache
+        self.encoding_dtype = resolve_dtype(encoding_dtype)
+        self.encoding_angles = None
+        self.index_backend = index_backend
+        self.min_index_size = min_index_size
+        self.encoding_index = None  # ANN index keyed by encoding id
+        self._indexed_matrix = None  # encoding_matrix the index was last synced to
+        self._index_rows = {}  # encoding id -> encoding_matrix row
         
         print("=" * 70)
         print("INITIALIZING ENHANCED MATCHING ENGINE")
@@ -82,25 +104,35 @@ class EnhancedMatchingEngine:
                 'message': 'No encodings in database'
             }
         
-        # Calculate distances to all encodings
-        best_match = None
-        best_distance = float('inf')
+        # Exact distances to every encoding (or to the ANN candidates that
+        # could fall under the threshold)
+        matrix, stored_angles = self._get_cached_matrix()
+        rows = self._candidate_rows(encoding, self.threshold / self.SAME_ANGLE_BOOST)
+        distances = np.linalg.norm(matrix[rows] - encoding, axis=1)
         
-        for enc_record in all_encodings:
-            # Calculate Euclidean distance
-            stored_encoding = enc_record['encoding_array']
-            distance = np.linalg.norm(encoding - stored_encoding)
-            
-            # Apply angle weight if angle hint provided
-            if angle and enc_record['angle'] == angle:
-                # Boost matches with same angle
-                distance *= 0.9
-            
-            # Track best match
-            if distance < best_distance:
-                best_distance = distance
-                best_match = enc_record
+        # Apply angle weight if angle hint provided
+        if angle:
+            # Boost matches with same angle
+            distances = np.where(stored_angles[rows] == angle, distances * self.SAME_ANGLE_BOOST, distances)
         
+        # Track best match (first minimum, in database order)
+        best = int(np.argmin(distances))
+        best_distance = distances[best]
+        best_match = all_encodings[best if isinstance(rows, slice) else rows[best]]
+        
+        return self._build_match_result(best_distance, best_match)
+    
+    def _build_match_result(self, best_distance: float, best_match: Optional[Dict]) -> Dict:
+        """
+        Turn the best (distance, encoding record) pair into a match result
+        
+        Args:
+            best_distance: Distance to the closest stored encoding
+            best_match: Closest encoding record
+            
+        Returns:
+            Match result with person_id, confidence, distance
+        """
         # Check if match is below threshold
         if best_distance < self.threshold and best_match:
             # Calculate confidence score
@@ -259,24 +291,66 @@ class EnhancedMatchingEngine:
         # Return average weighted score
         return float(np.mean(weighted_scores))
     
-    def batch_match(self, encodings: List[np.ndarray], angles: Optional[List[str]] = None) -> List[Dict]:
+    def batch_match(self, encodings, angles: Optional[List[str]] = None) -> List[Dict]:
         """
         Match multiple encodings in batch
         
+        All query-to-database distances are computed in one matrix-matrix
+        product instead of one match_face call per encoding.
+        
         Args:
-            encodings: List of 128D encodings
+            encodings: (M x 128) matrix or list of 128D encodings
             angles: Optional list of angle hints
             
         Returns:
-            List of match results
+            List of match results, same format as match_face
         """
-        results = []
+        queries = np.atleast_2d(np.asarray(encodings, dtype=np.float64))
+        if queries.size == 0:
+            return []
+        if queries.shape[1] != 128:
+            raise ValueError(f"Encoding must be 128D, got {queries.shape[1]}D")
+        
+        all_encodings = self._get_cached_encodings()
+        
+        if not all_encodings:
+            return [{
+                'matched': False,
+                'person_id': None,
+                'confidence': 0.0,
+                'distance': float('inf'),
+                'message': 'No encodings in database'
+            } for _ in range(len(queries))]
+        
+        matrix, stored_angles = self._get_cached_matrix()
+        compact = queries.astype(matrix.dtype, copy=False)
+        
+        # |q - g|^2 = |q|^2 + |g|^2 - 2 q.g, in the matrix dtype
+        squared = (
+            np.einsum('ij,ij->i', compact, compact)[:, None] +
+            np.einsum('ij,ij->i', matrix, matrix)[None, :] -
+            2.0 * (compact @ matrix.T)
+        )
+        distances = np.sqrt(np.maximum(squared, 0.0))
         
-        for i, encoding in enumerate(encodings):
-            angle = angles[i] if angles and i < len(angles) else None
-            result = self.match_face(encoding, angle)
-            results.append(result)
+        # Boost matches with the same angle as the hint
+        hints = np.array([angles[i] if angles and i < len(angles) else None for i in range(len(queries))],
+                         dtype=object)
+        same_angle = (stored_angles[None, :] == hints[:, None]) & (hints != None)[:, None]
+        distances = np.where(same_angle, distances * self.SAME_ANGLE_BOOST, distances)
         
+        results = []
+        for i, query in enumerate(queries):
+            best = int(np.argmin(distances[i]))
+            best_distance = distances[i, best]
+            # Re-score the near-best rows exactly (float64 arithmetic), for
+            # every dtype: the expansion above carries cancellation error
+            near = np.flatnonzero(distances[i] <= distances[i, best] + self.BATCH_RESCORE_MARGIN)
+            exact = np.linalg.norm(matrix[near] - query, axis=1)
+            exact = np.where(same_angle[i, near], exact * self.SAME_ANGLE_BOOST, exact)
+            best_distance = exact[int(np.argmin(exact))]
+            best = int(near[int(np.argmin(exact))])
+            results.append(self._build_match_result(best_distance, all_encodings[best]))
         return results
     
     def find_similar_faces(self, encoding: np.ndarray, top_k: int = 5) -> List[Dict]:
@@ -295,24 +369,28 @@ class EnhancedMatchingEngine:
         if not all_encodings:
             return []
         
-        # Calculate distances to all encodings
-        matches = []
+        # Exact distances to every encoding (or to the ANN candidates)
+        matrix, stored_angles = self._get_cached_matrix()
+        rows = slice(None)
+        if self._get_encoding_index() is not None:
+            keys, _ = self.encoding_index.search(encoding, k=top_k)
+            rows = np.sort([self._index_rows[key] for key in keys]).astype(np.int64)
+        row_ids = np.arange(len(all_encodings))[rows]
+        distances = np.linalg.norm(matrix[rows] - encoding, axis=1)
         
-        for enc_record in all_encodings:
-            stored_encoding = enc_record['encoding_array']
-            distance = np.linalg.norm(encoding - stored_encoding)
-            
+        # Sort by distance and return top K
+        matches = []
+        for i in np.argsort(distances, kind='stable')[:top_k]:
+            enc_record = all_encodings[row_ids[i]]
             matches.append({
                 'person_id': enc_record['person_id'],
-                'distance': distance,
-                'confidence': self._distance_to_confidence(distance),
+                'distance': distances[i],
+                'confidence': self._distance_to_confidence(distances[i]),
                 'angle': enc_record['angle'],
                 'quality_score': float(enc_record['quality_score'])
             })
         
-        # Sort by distance and return top K
-        matches.sort(key=lambda x: x['distance'])
-        return matches[:top_k]
+        return matches
     
     def _distance_to_confidence(self, distance: float) -> float:
         """
@@ -345,13 +423,90 @@ class EnhancedMatchingEngine:
         # Refresh cache
         self.encoding_cache = self.database.get_all_encodings()
         self.cache_timestamp = current_time
+        self.encoding_matrix = None
+        self.encoding_angles = None
         
         return self.encoding_cache
     
+    def _get_cached_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get all cached encodings stacked as a matrix
+        
+        Returns:
+            Tuple of ((N x 128) encoding matrix, (N,) angle array), rows in cache order
+        """
+        all_encodings = self._get_cached_encodings()
+        
+        if self.encoding_matrix is None:
+            self.encoding_matrix = np.vstack([enc['encoding_array'] for enc in all_encodings]).astype(self.encoding_dtype)
+            self.encoding_angles = np.array([enc['angle'] for enc in all_encodings], dtype=object)
+            # Cached records share the compact matrix rows instead of keeping
+            # their own float64 arrays and raw database blobs
+            for row, enc in enumerate(all_encodings):
+                enc['encoding_array'] = self.encoding_matrix[row]
+                enc.pop('encoding_vector', None)
+        
+        return self.encoding_matrix, self.encoding_angles
+    
+    def _get_encoding_index(self):
+        """
+        Get the ANN index over the cached encodings
+        
+        The index is keyed by encoding id and kept across cache refreshes:
+        only encodings added or deleted since the last refresh are inserted
+        into or removed from it.
+        
+        Returns:
+            Index, or None while the database is small
+        """
+        matrix, _ = self._get_cached_matrix()
+        
+        if len(matrix) < self.min_index_size:
+            return None
+        
+        if self.encoding_index is None:
+            self.encoding_index = create_encoding_index(self.index_backend, matrix.shape[1])
+        
+        if self._indexed_matrix is not matrix:
+            start = time.time()
+            rows = {enc['id']: row for row, enc in enumerate(self._get_cached_encodings())}
+            stale = [key for key in self._index_rows if key not in rows]
+            for key in stale:
+                self.encoding_index.remove(key)
+            added = [key for key in rows if key not in self._index_rows]
+            for key in added:
+                self.encoding_index.add(key, matrix[rows[key]])
+            self._index_rows = rows
+            self._indexed_matrix = matrix
+            print(f"✓ Encoding index synced: +{len(added)} / -{len(stale)} encodings in {time.time() - start:.1f}s")
+        
+        return self.encoding_index
+    
+    def _candidate_rows(self, encoding: np.ndarray, radius: float):
+        """
+        Rows that must be scored exactly to decide a match within radius
+        
+        Returns:
+            Sorted row indices, or a full slice when no index is in use
+        """
+        if self._get_encoding_index() is None:
+            return slice(None)
+        
+        keys, _ = self.encoding_index.range_search(encoding, radius)
+        if not keys:
+            # No match possible; keep the nearest encoding for the message
+            keys, _ = self.encoding_index.search(encoding, k=1)
+        return np.sort([self._index_rows[key] for key in keys]).astype(np.int64)
+    
     def clear_cache(self):
         """Clear encoding cache"""
         self.encoding_cache = {}
         self.cache_timestamp = 0
+        self.encoding_matrix = None
+        self.encoding_angles = None
+        self.encoding_index = None
+        self._indexed_matrix = None
+        self._index_rows = {}
         print("✓ Encoding cache cleared")
     
     def get_statistics(self) -> Dict:
@@ -3,79 +3,210 @@ import numpy as np
 import os
 import pickle
 
+from encoding_store import EncodingStore, EncodingStoreError, store_path_for
+from gallery_lock import ReadWriteLock, reads_gallery, writes_gallery
+
+ENCODING_DIM = 128
+
 class FaceRecognitionModel:
     def __init__(self, data_file='known_faces.dat'):
         """
         Initializes the model, loading known faces from a file if it exists.
         """
         self.data_file = data_file
-        self.known_encodings = []
+        self.store = EncodingStore(store_path_for(data_file))
+        self._encodings = np.empty((0, ENCODING_DIM))  # rows [0, len(known_ids)) are in use
         self.known_ids = []
+        self._id_positions = {}  # person ID -> index, extended lazily (known_ids is append-only)
+        self._event_members = {}  # event ID -> IDs of this gallery's persons filed under it
+        # Shared for recognition, exclusive for learning and saving
+        self.lock = ReadWriteLock()
         self.load_model()
 
+    @property
+    def known_encodings(self):
+        """(N x 128) view of the learned encodings, parallel to known_ids."""
+        return self._encodings[:len(self.known_ids)]
+
+    def _set_faces(self, encodings, ids):
+        """Replaces all known faces. The array is used as-is until the first append grows it."""
+        self._encodings = np.asarray(encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+        self.known_ids = list(ids)
+        self._id_positions = {}
+
+    def _append_face(self, new_id, new_encoding):
+        """Appends one face, doubling the encoding buffer when it is full (amortized O(1))."""
+        count = len(self.known_ids)
+        if count >= self._encodings.shape[0]:
+            grown = np.empty((max(2 * self._encodings.shape[0], 16), ENCODING_DIM))
+            grown[:count] = self._encodings[:count]
+            self._encodings = grown
+        self._encodings[count] = new_encoding
+        self.known_ids.append(new_id)
+
+    @writes_gallery
     def load_model(self):
-        """Loads the known faces and IDs from the data file."""
+        """
+        Loads the known faces and IDs, preferring the memory-mapped encoding store.
+        A legacy pickle is converted to the store on first load and kept as a backup.
+        An existing store that cannot be loaded raises EncodingStoreError and is
+        left untouched (falling back to the pickle would save over it).
+        """
+        self._set_faces([], [])
+        self._event_members = {}
+        if self.store.exists():
+            try:
+                arrays, meta = self.store.load(mmap_mode='c')
+                # The copy-on-write mapping is the buffer, no copy at startup
+                self._set_faces(arrays['encodings'], meta['ids'])
+                self._event_members = {event_id: set(ids) for event_id, ids in meta.get('events', {}).items()}
+                replayed = self._replay_log()
+            except Exception as e:
+                print(f"--- [ML MODEL] Error loading encoding store: {e}. ---")
+                raise EncodingStoreError(
+                    f"Encoding store {self.store.path} could not be loaded ({e}); "
+                    f"left untouched: restore it, or rebuild it from the pickle with convert_to_encoding_store.py --force"
+                ) from e
+            print(f"--- [ML MODEL] Loaded {len(self.known_ids)} known faces from encoding store "
+                  f"({replayed} logged changes). ---")
+            return
+
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'rb') as f:
-                    self.known_encodings, self.known_ids = pickle.load(f)
+                self.load_pickle()
                 print(f"--- [ML MODEL] Loaded {len(self.known_ids)} known faces. ---")
+                print(f"--- [ML MODEL] Converting {self.data_file} to encoding store. ---")
+                self.save_model()
             except Exception as e:
                 print(f"--- [ML MODEL] Error loading model data: {e}. Starting fresh. ---")
+        elif self._replay_log():
+            # Faces learned before the first snapshot only exist in the log
+            print(f"--- [ML MODEL] Recovered {len(self.known_ids)} known faces from log. ---")
+
+    def _replay_log(self):
+        """Applies faces logged since the loaded snapshot. Returns the record count."""
+        records = self.store.replay()
+        for record in records:
+            op = record.get('op')
+            if op == 'add':
+                self._append_face(record['id'], record['encoding'])
+            elif op == 'event_add':
+                self._event_members.setdefault(record['event'], set()).update(record['ids'])
+            elif op == 'event_remove':
+                self._event_members.pop(record['event'], None)
+        return len(records)
+
+    def _log_face(self, new_id, new_encoding):
+        """Appends a learned face to the store's log, compacting it when it grows too long."""
+        self._log_record({'op': 'add', 'id': new_id, 'encoding': np.asarray(new_encoding, dtype=np.float64)})
+
+    def _log_record(self, record):
+        """Appends a change to the store's log, compacting it when it grows too long."""
+        try:
+            self.store.append(record)
+        except Exception as e:
+            print(f"--- [ML MODEL] Error logging {record.get('op')}: {e}. Saving snapshot. ---")
+            self.save_model()
+            return
+        if self.store.needs_compaction(len(self.known_ids)):
+            self.save_model()
 
+    def load_pickle(self):
+        """Loads the legacy pickled (encodings, ids) tuple from the data file."""
+        with open(self.data_file, 'rb') as f:
+            self._set_faces(*pickle.load(f))
+
+    @writes_gallery
     def save_model(self):
-        """Saves the current known faces and IDs to the data file."""
-        with open(self.data_file, 'wb') as f:
-            pickle.dump((self.known_encodings, self.known_ids), f)
+        """Saves the current known faces and IDs to the encoding store as a new snapshot with an empty log."""
+        events = {event_id: sorted(members) for event_id, members in self._event_members.items()}
+        self.store.save({'encodings': self.known_encodings}, {'ids': list(self.known_ids), 'events': events})
         print(f"--- [ML MODEL] Model saved with {len(self.known_ids)} faces. ---")
 
+    @writes_gallery
     def learn_face(self, new_encoding):
         """
         Learns a new face. If the face is already known, it returns the existing ID.
         If the face is new, it assigns a new ID and returns it.
         """
-        if not self.known_encodings:
-            # This is the first face ever.
-            new_id = f"person_{len(self.known_ids) + 1:04d}"
-            self.known_encodings.append(new_encoding)
-            self.known_ids.append(new_id)
-            print(f"--- [ML MODEL] Learned first face. Assigned ID: {new_id} ---")
-            return new_id
-
-        # See if this face is already in our known faces
-        face_distances = face_recognition.face_distance(self.known_encodings, new_encoding)
-        best_match_index = np.argmin(face_distances)
+        if self.known_ids:
+            # See if this face is already in our known faces
+            face_distances = face_recognition.face_distance(self.known_encodings, new_encoding)
+            best_match_index = np.argmin(face_distances)
 
-        # A very strict tolerance to decide if this is an existing person
-        if face_distances[best_match_index] < 0.5:
-            # This is an existing person
-            return self.known_ids[best_match_index]
-        else:
-            # This is a new person
-            new_id = f"person_{len(self.known_ids) + 1:04d}"
-            self.known_encodings.append(new_encoding)
-            self.known_ids.append(new_id)
-            print(f"--- [ML MODEL] Learned a new face. Assigned ID: {new_id} ---")
-            return new_id
-
-    def recognize_face(self, scanned_encoding):
+            # A very strict tolerance to decide if this is an existing person
+            if face_distances[best_match_index] < 0.5:
+                # This is an existing person
+                return self.known_ids[best_match_index]
+
+        # This is a new person (or the first face ever)
+        new_id = f"person_{len(self.known_ids) + 1:04d}"
+        self._append_face(new_id, new_encoding)
+        print(f"--- [ML MODEL] Learned {'first' if len(self.known_ids) == 1 else 'a new'} face. Assigned ID: {new_id} ---")
+        self._log_face(new_id, new_encoding)
+        return new_id
+
+    @writes_gallery
+    def add_event_members(self, event_id, person_ids):
+        """
+        Records that these persons of this gallery appear in an event's photos.
+        IDs this gallery does not know are ignored (the multi-angle gallery
+        uses the same person_NNNN format for different persons).
+        """
+        self._index_ids()
+        members = self._event_members.get(event_id, set())
+        new_ids = sorted({pid for pid in person_ids if pid in self._id_positions} - members)
+        if not new_ids:
+            return
+        self._event_members.setdefault(event_id, set()).update(new_ids)
+        self._log_record({'op': 'event_add', 'event': event_id, 'ids': new_ids})
+
+    @writes_gallery
+    def remove_event(self, event_id):
+        """Forgets an event's membership (the persons themselves stay known)."""
+        if self._event_members.pop(event_id, None) is None:
+            return
+        self._log_record({'op': 'event_remove', 'event': event_id})
+
+    @reads_gallery
+    def event_members(self, event_id):
+        """IDs of this gallery's persons known to appear in an event (empty set if unindexed)."""
+        return set(self._event_members.get(event_id, ()))
+
+    def _index_ids(self):
+        """Extends _id_positions to the faces learned since it was last used."""
+        for position in range(len(self._id_positions), len(self.known_ids)):
+            self._id_positions[self.known_ids[position]] = position
+
+    def _positions_of(self, person_ids):
+        """Indices of the given person IDs in known_ids (unknown IDs are skipped)."""
+        self._index_ids()
+        return sorted(self._id_positions[pid] for pid in person_ids if pid in self._id_positions)
+
+    @reads_gallery
+    def recognize_face(self, scanned_encoding, candidate_ids=None):
         """
-        Recognizes a face using a strict tolerance. Returns the person's ID on a
-        confident match, otherwise returns None.
+        Recognizes a face using a strict tolerance. Returns (person_id, distance):
+        the person's ID on a confident match, otherwise None, together with the
+        best distance found (inf when there is nothing to compare against).
+        If candidate_ids is given (e.g. an event's attendees), only those people are compared.
         """
-        if not self.known_encodings:
-            return None
+        if not self.known_ids:
+            return None, float('inf')
 
-        face_distances = face_recognition.face_distance(self.known_encodings, scanned_encoding)
+        positions = self._positions_of(candidate_ids) if candidate_ids else None
+        candidates = self._encodings[positions] if positions else self.known_encodings
+        face_distances = face_recognition.face_distance(candidates, scanned_encoding)
         best_match_index = np.argmin(face_distances)
+        best_distance = float(face_distances[best_match_index])
 
         # HIGH-ACCURACY THRESHOLD: Only a very close match is accepted.
         STRICT_TOLERANCE = 0.54
 
-        if face_distances[best_match_index] <= STRICT_TOLERANCE:
-            person_id = self.known_ids[best_match_index]
-            print(f"--- [ML MODEL] Confident match for {person_id} with distance {face_distances[best_match_index]:.2f} ---")
-            return person_id
+        if best_distance <= STRICT_TOLERANCE:
+            person_id = self.known_ids[positions[best_match_index] if positions else best_match_index]
+            print(f"--- [ML MODEL] Confident match for {person_id} with distance {best_distance:.2f} ---")
+            return person_id, best_distance
         else:
-            print(f"--- [ML MODEL] No confident match. Best distance was {face_distances[best_match_index]:.2f} (Threshold: {STRICT_TOLERANCE}) ---")
-            return None
+            print(f"--- [ML MODEL] No confident match. Best distance was {best_distance:.2f} (Threshold: {STRICT_TOLERANCE}) ---")
+            return None, best_distance
@@ -83,6 +83,82 @@ USE_ROBUST_DETECTION = True
 # Options: 'low', 'medium', 'high'
 ENHANCEMENT_LEVEL = 'medium'
 
+# Longest side (pixels) of the copy the robust detectors run on; boxes are
+# mapped back and encodings computed at full resolution (0 = detect at full
+# resolution). Off until the tiled DNN fallback is shown to recover the small
+# faces a 1600px copy loses on group photos (22 -> 17 on a 4000x3000 photo).
+# See DOWNSCALE_DETECTION_BENCHMARK.md
+DETECTION_MAX_SIDE = 0
+
+# Smallest face expected in a photo, as a fraction of its shorter side. The
+# copy is never shrunk so far that such a face falls below the Haar/MTCNN
+# minimum, and HOG only upsamples when it would fall below HOG's minimum
+DETECTION_MIN_FACE_FRACTION = 0.025
+
+# Smallest face (pixels) each detector finds without upsampling; for the DNN,
+# at its 300x300 input (a whole 1600px frame: 20 * 1600 / 300 = 107px faces)
+DETECTOR_MIN_FACE_SIZE = {'haar': 30, 'hog': 80, 'mtcnn': 20, 'dnn': 20}
+
+# Run every loaded detector at once on a thread pool and fuse their boxes,
+# instead of stopping at the first detector that finds a face. Latency is
+# that of the slowest detector given enough cores; the cascade is cheaper on one
+DETECTION_CONCURRENT = False
+
+# Boxes overlapping by at least this IoU are fused into one face
+DETECTION_FUSION_IOU = 0.4
+
+# When the DNN finds no face in a whole large frame, detect on overlapping
+# tiles sized so the smallest expected face reaches its minimum, all tiles in
+# one forward pass, instead of escalating to slower detectors
+DETECTION_TILED = True
+
+# Boxes of one face found in overlapping tiles: the most confident is kept
+# of boxes overlapping by at least this IoU
+DETECTION_NMS_IOU = 0.3
+
+# Photos whose DNN detection shares one forward pass. Event processing then
+# decodes this many photos at a time (budget their memory), runs the DNN on
+# all of them at once and starts each photo's cascade with its DNN result.
+# 1 = per photo: batching gained nothing on a single core, measure with
+# benchmark_dnn_batch.py before raising it. See DNN_BATCH_BENCHMARK.md
+DNN_BATCH_SIZE = 1
+
+# Detector instances per process for concurrent API requests (model_registry).
+# 0 = every request shares one warmed-up instance; N = up to N instances are
+# built on demand and leased one per request, each costing its models' memory
+MODEL_POOL_SIZE = 0
+
+# When app.py loads face_recognition/dlib, the galleries and the detectors:
+# 'background' = a thread loads them while the server already answers (ready
+#   once done; requests arriving earlier wait for the model they need)
+# 'lazy' = each on the first request that needs it (ready at once; that
+#   request pays the load)
+# 'eager' = during import, before the server starts (the previous behaviour)
+# See COLD_START_BENCHMARK.md
+MODEL_LOADING = 'background'
+
+# Cost-aware cascade: per-event detector statistics (seconds per attempt, hit
+# rate) order the detectors by expected time to a detection. Kept in this
+# file next to the backend so later runs and backfills start tuned
+CASCADE_POLICY_FILE = 'cascade_policy.json'
+
+# The same statistics for the EnhancedFaceDetector of the API components
+# (its detectors differ from the robust detector's, so they are kept apart);
+# profiles are event IDs, 'scan' and 'search'
+ENHANCED_CASCADE_POLICY_FILE = 'enhanced_cascade_policy.json'
+
+# Weight of older attempts, per new attempt of the same detector (1.0 = never forget)
+CASCADE_POLICY_DECAY = 0.98
+
+# A detector hitting on fewer than this share of at least
+# CASCADE_SKIP_MIN_ATTEMPTS (decayed) attempts is skipped on the original image
+CASCADE_SKIP_HIT_RATE = 0.02
+CASCADE_SKIP_MIN_ATTEMPTS = 30
+
+# Every Nth photo of an event runs the skipped detectors anyway, so a
+# detector that starts to work again is noticed (0 = never skip)
+CASCADE_EXPLORE_INTERVAL = 20
+
 # ============================================================================
 # QUALITY THRESHOLDS
 # ============================================================================
@@ -115,6 +191,54 @@ ENABLE_DETAILED_LOGGING = True
 # Enable performance metrics tracking
 ENABLE_PERFORMANCE_METRICS = False
 
+# Worker processes for event photo processing (detection, encoding, face
+# analysis); 1 = serial in the app process, 0 = one per CPU core. Each worker
+# loads its own detectors, so budget their memory per process
+PIPELINE_WORKERS = 1
+
+# Photos handed to a worker at a time
+PIPELINE_CHUNK_SIZE = 4
+
+# Events processed at the same time by the job queue; further triggers wait
+PROCESSING_MAX_EVENTS = 2
+
+# CPU cores shared by all concurrently processed events (0 = all cores); each
+# event gets at most PROCESSING_CPU_BUDGET // PROCESSING_MAX_EVENTS workers
+PROCESSING_CPU_BUDGET = 0
+
+# Worker start method; 'spawn' avoids forking the threaded web server
+PIPELINE_START_METHOD = 'spawn'
+
+# Photos between throughput (photos/sec) progress reports
+PIPELINE_PROGRESS_INTERVAL = 100
+
+# Approximate nearest-neighbour index for large galleries
+# Backend: 'auto' (HNSW if hnswlib is installed, else NumPy IVF), 'hnsw', 'ivf', 'brute'
+# IVF is the default: see ANN_INDEX_BENCHMARK.md for recall vs latency
+ANN_INDEX_BACKEND = 'ivf'
+
+# Number of stored encodings before the index replaces the exact linear scan
+ANN_MIN_GALLERY_SIZE = 20000
+
+# Inverted lists probed per query (IVF backend)
+ANN_N_PROBE = 16
+
+# Graph candidates examined per query (HNSW backend)
+ANN_EF_SEARCH = 128
+
+# Dtype of resident and stored gallery encodings. dlib descriptors are single
+# precision, so 'float32' halves memory; distances are computed in float64
+ENCODING_DTYPE = 'float32'
+
+# Optional first-pass scan over int8-quantized encodings (None or 'int8').
+# Each code carries an error bound, so only persons that can still win are
+# re-scored at full precision and decisions stay exact
+QUANTIZED_SCAN = None
+
+# Persons scored before exact centroid/radius pruning kicks in; below this
+# the full distance matrix is cheaper than computing the bounds
+CENTROID_PRUNING_MIN_PERSONS = 256
+
 # ============================================================================
 # ORIENTATION DETECTION PARAMETERS
 # ============================================================================
@@ -181,6 +305,15 @@ LEGACY_DATA_FILE = 'known_faces.dat'
 # Enable automatic migration from legacy format
 AUTO_MIGRATE_LEGACY_DATA = True
 
+# Gallery mutations are appended to a write-ahead log inside the encoding store
+# and compacted into a new snapshot once the log holds
+# max(WAL_COMPACT_MIN_RECORDS, WAL_COMPACT_RATIO * persons) records
+WAL_COMPACT_MIN_RECORDS = 1000
+WAL_COMPACT_RATIO = 0.5
+
+# fsync every log append (disable to trade crash durability for speed)
+WAL_FSYNC = True
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
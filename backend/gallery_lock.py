@@ -0,0 +1,126 @@
+"""
+Readers-writer lock for the in-memory face galleries
+
+Recognition only reads the galleries and can run in any number of threads
+at once; learning a person, updating their encodings or saving a snapshot
+takes the lock exclusively. Writers are preferred: once a writer is waiting,
+new readers queue behind it so a steady stream of /recognize requests
+cannot starve process_images.
+
+Both sides are reentrant per thread, and a thread holding the write lock
+may also take the read lock (learning calls the matching helpers).
+"""
+
+import functools
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """
+    Writer-preferring, reentrant readers-writer lock
+
+    Usage:
+        lock = ReadWriteLock()
+        with lock.read_locked():
+            ...  # shared
+        with lock.write_locked():
+            ...  # exclusive
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0          # threads currently holding a read lock
+        self._writer = None        # ident of the thread holding the write lock
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def _read_depth(self) -> int:
+        return getattr(self._local, 'read_depth', 0)
+
+    def acquire_read(self):
+        depth = self._read_depth()
+        if depth or self._writer == threading.get_ident():
+            # Reentrant read, or read inside our own write: never block
+            self._local.read_depth = depth + 1
+            return
+        with self._cond:
+            while self._writer is not None or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        self._local.read_depth = 1
+
+    def release_read(self):
+        depth = self._read_depth()
+        if depth <= 0:
+            raise RuntimeError("release_read() without a matching acquire_read()")
+        self._local.read_depth = depth - 1
+        if depth > 1 or self._writer == threading.get_ident():
+            return
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if self._read_depth():
+            # Upgrading would deadlock against another upgrading reader
+            raise RuntimeError("Cannot acquire the write lock while holding a read lock")
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self):
+        if self._writer != threading.get_ident():
+            raise RuntimeError("release_write() by a thread that does not hold the write lock")
+        self._write_depth -= 1
+        if self._write_depth:
+            return
+        with self._cond:
+            self._writer = None
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reads_gallery(method):
+    """Run a model method under its gallery lock (shared)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.read_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def writes_gallery(method):
+    """Run a model method under its gallery lock (exclusive)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock.write_locked():
+            return method(self, *args, **kwargs)
+    return wrapper
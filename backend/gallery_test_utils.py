@@ -0,0 +1,78 @@
+"""
+Shared fixtures of the gallery and matching tests
+
+Fakes and synthetic galleries used by several test_*.py files, kept here
+instead of being copied into each of them.
+"""
+
+import os
+
+from multi_angle_face_model import MultiAngleFaceModel
+
+
+class InMemoryEncodingDatabase:
+    """Minimal stand-in exposing get_all_encodings() like MultiAngleFaceDatabase"""
+
+    def __init__(self, records):
+        self.records = records
+
+    def get_all_encodings(self):
+        return self.records
+
+
+def clustered_faces(rng, persons):
+    """
+    Persons whose angle encodings cluster around an identity, like real faces
+    (some persons miss the left or right angle)
+
+    Returns:
+        Tuple of (identities matrix, {person_id: {angle: encoding}})
+    """
+    identities = rng.normal(0, 0.12, (persons, 128))
+    faces = {}
+    for i, identity in enumerate(identities):
+        encodings = {'center': identity + rng.normal(0, 0.02, 128)}
+        if i % 3:
+            encodings['left'] = identity + rng.normal(0, 0.03, 128)
+        if i % 4:
+            encodings['right'] = identity + rng.normal(0, 0.03, 128)
+        faces[f"person_{i + 1:05d}"] = encodings
+    return identities, faces
+
+
+def gallery_from_faces(data_dir, faces, name='faces.dat', **kwargs):
+    """A MultiAngleFaceModel holding the given faces, built in memory (nothing logged)"""
+    model = MultiAngleFaceModel(data_file=os.path.join(data_dir, name), **kwargs)
+    model.store.fsync = False
+    for person_id, encodings in faces.items():
+        model.known_faces[person_id] = {'encodings': dict(encodings), 'metadata': {}}
+    model._rebuild_gallery()
+    return model
+
+
+def learned_gallery(rng, data_dir, persons, scale=0.1, all_angles=False, quality=50.0,
+                    name='faces.dat', **kwargs):
+    """
+    A MultiAngleFaceModel taught random persons through learn_face_multi_angle
+
+    Args:
+        scale: Standard deviation of the random encodings
+        all_angles: False = center only; True = center plus left and right
+                    (some persons miss one, to exercise the angle mask)
+
+    Returns:
+        Tuple of (model, encodings dict per person, person IDs)
+    """
+    model = MultiAngleFaceModel(data_file=os.path.join(data_dir, name), **kwargs)
+    model.store.fsync = False
+    learned, ids = [], []
+    for i in range(persons):
+        encodings = {'center': rng.normal(0, scale, 128)}
+        if all_angles:
+            if i % 3 != 0:
+                encodings['left'] = rng.normal(0, scale, 128)
+            if i % 4 != 0:
+                encodings['right'] = rng.normal(0, scale, 128)
+        ids.append(model.learn_face_multi_angle(encodings, {angle: quality for angle in encodings}))
+        learned.append(encodings)
+    return model, learned, ids
@@ -0,0 +1,132 @@
+"""
+Decode-Once Image Context
+One decoded photo shared by every stage of the per-photo pipeline
+
+Detection, encoding and face analysis each used to decode the photo or
+convert its colour space on their own (cv2.imread for robust detection,
+face_recognition.load_image_file for the fallback and again for analysis,
+a BGR->RGB conversion per detected face). An ImageContext decodes the photo
+once and derives the other views lazily, caching each on first use:
+
+- bgr: decoded pixels (OpenCV order)
+- rgb: for dlib / face_recognition / MTCNN
+- gray: for Haar cascades and preprocessing
+- scaled(factor) / level(n): downscaled copies, themselves ImageContexts
+
+The cached arrays are shared, so stages must treat them as read-only.
+"""
+
+import threading
+
+import cv2
+import numpy as np
+
+
+class ImageContext:
+    """
+    Lazily derived views of one decoded photo
+
+    Usage:
+        context = ImageContext.from_file(image_path)
+        faces, method = detector.detect_faces_robust(context)
+        encodings = face_recognition.face_encodings(context.rgb, locations)
+    """
+
+    def __init__(self, bgr=None, rgb=None, path=None):
+        self.path = path
+        self._bgr = bgr
+        self._rgb = rgb
+        self._gray = None
+        self._scaled = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path):
+        """Context for a photo on disk; nothing is decoded until a view is used"""
+        return cls(path=path)
+
+    @classmethod
+    def from_bgr(cls, image):
+        """Context for an already decoded BGR image"""
+        return cls(bgr=image)
+
+    @classmethod
+    def from_rgb(cls, image):
+        """Context for an already decoded RGB image"""
+        return cls(rgb=image)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Context for encoded image bytes (e.g. a base64-decoded upload)"""
+        return cls.from_bgr(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR))
+
+    @classmethod
+    def wrap(cls, image):
+        """Pass contexts through; wrap a bare BGR array"""
+        return image if isinstance(image, cls) else cls.from_bgr(image)
+
+    def _decode(self):
+        bgr = cv2.imread(self.path, cv2.IMREAD_COLOR)
+        if bgr is not None:
+            return bgr, None
+        # Formats OpenCV cannot read (e.g. GIF) go through PIL
+        import face_recognition
+        return None, face_recognition.load_image_file(self.path)
+
+    @property
+    def bgr(self):
+        if self._bgr is None:
+            with self._lock:
+                if self._bgr is None:
+                    if self._rgb is None and self.path is not None:
+                        self._bgr, self._rgb = self._decode()
+                    if self._bgr is None:
+                        if self._rgb is None:
+                            raise ValueError(f"Could not decode image {self.path}")
+                        self._bgr = cv2.cvtColor(self._rgb, cv2.COLOR_RGB2BGR)
+        return self._bgr
+
+    @property
+    def rgb(self):
+        if self._rgb is None:
+            bgr = self.bgr
+            with self._lock:
+                if self._rgb is None:
+                    self._rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+        return self._rgb
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            bgr = self.bgr
+            with self._lock:
+                if self._gray is None:
+                    self._gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def shape(self):
+        """(height, width) of the photo"""
+        return (self._bgr if self._bgr is not None else self.rgb).shape[:2]
+
+    def scaled(self, factor):
+        """
+        Downscaled copy of the photo (factor < 1), cached per factor
+
+        Returns self for factor >= 1. The copy is resized from BGR with
+        INTER_AREA and is itself a context with lazy views.
+        """
+        if factor >= 1.0:
+            return self
+        context = self._scaled.get(factor)
+        if context is None:
+            height, width = self.shape
+            size = (max(int(round(width * factor)), 1), max(int(round(height * factor)), 1))
+            context = ImageContext.from_bgr(cv2.resize(self.bgr, size, interpolation=cv2.INTER_AREA))
+            with self._lock:
+                context = self._scaled.setdefault(factor, context)
+        return context
+
+    def level(self, n):
+        """Pyramid level n: the photo downscaled by 2**n"""
+        return self.scaled(0.5 ** n)
@@ -17,10 +17,9 @@ import numpy as np
 from typing import Dict, List, Optional
 import time
 
-from enhanced_face_detector import EnhancedFaceDetector
-from deep_feature_extractor import DeepFeatureExtractor
 from multi_angle_database import MultiAngleFaceDatabase
 from enhanced_matching_engine import EnhancedMatchingEngine
+from model_registry import model_registry
 
 
 class LiveFaceScanner:
@@ -28,12 +27,16 @@ class LiveFaceScanner:
     Live face scanner for webcam-based face capture and matching
     """
     
-    def __init__(self, db_config: Optional[Dict] = None, min_quality: float = 0.5):
+    def __init__(self, db_config: Optional[Dict] = None, min_quality: float = 0.5,
+                 detector=None, extractor=None, database=None):
         """
         Initialize live face scanner
         
         Args:
             db_config: Optional database configuration
+            detector, extractor: Shared model instances (default: the
+                process-wide ones of model_registry)
+            database: Shared database connection (default: a new one)
             min_quality: Minimum quality threshold for capture (default 0.5)
         """
         print("=" * 70)
@@ -44,11 +47,13 @@ class LiveFaceScanner:
         
         # Initialize components
         print("\nLoading components...")
-        self.detector = EnhancedFaceDetector()
-        self.extractor = DeepFeatureExtractor()
+        self.detector = detector or model_registry.get('enhanced_detector')
+        self.extractor = extractor or model_registry.get('feature_extractor')
         
         # Initialize database
-        if db_config:
+        if database is not None:
+            self.database = database
+        elif db_config:
             self.database = MultiAngleFaceDatabase(**db_config)
         else:
             self.database = MultiAngleFaceDatabase()
@@ -128,7 +133,7 @@ class LiveFaceScanner:
                 
                 # Detect faces (check every 5 frames for performance)
                 if frame_count % 5 == 0:
-                    detections = self.detector.detect_faces(frame)
+                    detections = self.detector.detect_faces(frame, profile='scan')
                     
                     if len(detections) > 0:
                         # Get first face
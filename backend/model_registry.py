@@ -0,0 +1,333 @@
+"""
+Shared Model Registry
+Process-wide, load-once instances of the face detection and encoding models
+
+Building an EnhancedFaceDetector loads MTCNN (TensorFlow), the Caffe DNN,
+Haar cascades and dlib; a DeepFeatureExtractor runs a test encoding. Request
+handlers and components take their instances from here instead, so each
+model is loaded and warmed up once per process.
+
+Features:
+- get(): the shared instance, loaded and warmed up on first use (one loader
+  per model even when requests race for it)
+- lease(): an instance for one request from a bounded pool, for models
+  registered with pool_size > 0 (the shared instance otherwise)
+- Load time, warm-up time and resident-memory growth per model (stats())
+- warm() / readiness(): load models ahead of their first request (e.g. from a
+  background thread while the server already answers) and report which are
+  loaded, loading or failed
+- Default registrations: 'face_recognition', 'robust_detector',
+  'enhanced_detector', 'feature_extractor'
+- The enhanced detectors share one persisted CascadePolicy
+  (enhanced_cascade_policy), saved again when the process exits
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from cascade_policy import CascadePolicy
+
+try:
+    from face_recognition_config import MODEL_POOL_SIZE, ENHANCED_CASCADE_POLICY_FILE
+except ImportError:
+    MODEL_POOL_SIZE = 0
+    ENHANCED_CASCADE_POLICY_FILE = 'enhanced_cascade_policy.json'
+
+
+def current_rss_mb() -> Optional[float]:
+    """Resident memory of this process in MB (None where it cannot be read)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # Peak rather than current, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if peak > 1 << 30 else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+class _Model:
+    """Factory, instances and accounting of one registered model"""
+
+    def __init__(self, factory, warmup, pool_size):
+        self.factory = factory
+        self.warmup = warmup
+        self.pool_size = max(int(pool_size), 0)
+        self.shared = None
+        # Instances built for the lease() pool (the shared one not included)
+        self.pooled = 0
+        self.pool = queue.LifoQueue()
+        self.load_seconds = []
+        self.warmup_seconds = []
+        self.memory_mb = []
+        self.leases = 0
+        self.loading = False
+        self.error = None
+        self.lock = threading.Lock()
+
+    @property
+    def instances(self) -> int:
+        return self.pooled + (self.shared is not None)
+
+
+class ModelRegistry:
+    """
+    Load-once model instances shared by a process
+
+    Usage:
+        registry = ModelRegistry()
+        registry.register('enhanced_detector', EnhancedFaceDetector,
+                          warmup=lambda d: d.detect_faces(blank), pool_size=2)
+        detector = registry.get('enhanced_detector')        # shared
+        with registry.lease('enhanced_detector') as detector:  # one request
+            detector.detect_faces(image)
+        print(registry.stats())
+    """
+
+    def __init__(self):
+        self._models: Dict[str, _Model] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any],
+                 warmup: Optional[Callable[[Any], Any]] = None, pool_size: int = 0):
+        """
+        Register (or re-register, while not loaded yet) how to build a model
+
+        Args:
+            name: Model name for get() / lease()
+            factory: Builds one instance
+            warmup: Called once on every new instance (e.g. a dummy inference)
+            pool_size: Instances lease() may hand out at a time; 0 = lease()
+                       returns the one shared instance
+        """
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None and model.instances:
+                raise RuntimeError(f"Model '{name}' is already loaded")
+            self._models[name] = _Model(factory, warmup, pool_size)
+
+    def _model(self, name: str) -> _Model:
+        with self._lock:
+            if name not in self._models:
+                raise KeyError(f"No model registered as '{name}'")
+            return self._models[name]
+
+    def _build(self, name: str, model: _Model):
+        """One new warmed-up instance, with its load accounting"""
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        model.loading = True
+        try:
+            instance = model.factory()
+        except Exception as e:
+            model.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            model.loading = False
+        model.error = None
+        loaded = time.perf_counter()
+        if model.warmup is not None:
+            try:
+                model.warmup(instance)
+            except Exception as e:
+                print(f"--- [MODELS] Warm-up of {name} failed: {e} ---")
+        warmed = time.perf_counter()
+        rss_after = current_rss_mb()
+
+        model.load_seconds.append(loaded - start)
+        model.warmup_seconds.append(warmed - loaded)
+        if rss_before is not None and rss_after is not None:
+            model.memory_mb.append(rss_after - rss_before)
+        print(f"--- [MODELS] Loaded {name} in {loaded - start:.2f}s "
+              f"(warm-up {warmed - loaded:.2f}s) ---")
+        return instance
+
+    def get(self, name: str):
+        """The shared instance of a model, loaded on first use"""
+        model = self._model(name)
+        if model.shared is None:
+            with model.lock:
+                if model.shared is None:
+                    model.shared = self._build(name, model)
+        return model.shared
+
+    @contextmanager
+    def lease(self, name: str, timeout: Optional[float] = None):
+        """
+        An instance for the duration of one request
+
+        Models with a pool hand out an idle pooled instance, build one while
+        fewer than pool_size exist, and otherwise wait for one to be returned
+        (queue.Empty after timeout seconds). Without a pool this is get().
+        """
+        model = self._model(name)
+        if not model.pool_size:
+            with model.lock:
+                model.leases += 1
+            yield self.get(name)
+            return
+
+        instance = None
+        with model.lock:
+            model.leases += 1
+            try:
+                instance = model.pool.get_nowait()
+            except queue.Empty:
+                if model.pooled < model.pool_size:
+                    model.pooled += 1
+                    build = True
+                else:
+                    build = False
+        if instance is None:
+            if build:
+                try:
+                    instance = self._build(name, model)
+                except Exception:
+                    with model.lock:
+                        model.pooled -= 1
+                    raise
+            else:
+                instance = model.pool.get(timeout=timeout)
+        try:
+            yield instance
+        finally:
+            model.pool.put(instance)
+
+    def is_loaded(self, name: str) -> bool:
+        """Whether any instance of a model has been built"""
+        return self._model(name).instances > 0
+
+    def warm(self, names=None) -> bool:
+        """
+        Load the shared instance of the named (default: every) model now
+        
+        Returns:
+            True when all of them loaded; failures are logged and kept for
+            readiness() (a later get() tries again)
+        """
+        if names is None:
+            with self._lock:
+                names = list(self._models)
+        ok = True
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                ok = False
+                print(f"--- [MODELS] Could not load {name}: {e} ---")
+        return ok
+
+    def readiness(self, names=None) -> Dict[str, str]:
+        """State of the named (default: every) model: loaded, loading, failed or not loaded"""
+        with self._lock:
+            models = {name: self._models[name] for name in (names or self._models)}
+        states = {}
+        for name, model in models.items():
+            if model.instances:
+                states[name] = 'loaded'
+            elif model.loading:
+                states[name] = 'loading'
+            elif model.error:
+                states[name] = 'failed'
+            else:
+                states[name] = 'not loaded'
+        return states
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per model: instances, pool size, leases, load/warm-up seconds, memory"""
+        with self._lock:
+            models = dict(self._models)
+        return {
+            name: {
+                'loaded': model.instances > 0,
+                'instances': model.instances,
+                'pool_size': model.pool_size,
+                'leases': model.leases,
+                'load_seconds': round(sum(model.load_seconds), 3),
+                'warmup_seconds': round(sum(model.warmup_seconds), 3),
+                'memory_mb': round(sum(model.memory_mb), 1) if model.memory_mb else None,
+                'error': model.error,
+            }
+            for name, model in models.items()
+        }
+
+
+def _face_recognition():
+    # Importing face_recognition.api loads dlib's detector, landmark and
+    # encoding models: its load time is that import
+    import face_recognition
+    return face_recognition
+
+
+def _robust_detector():
+    from robust_face_detector import RobustFaceDetector
+    return RobustFaceDetector()
+
+
+def _blank_frame_detection(detector, detect):
+    """
+    Run detect on a blank frame, which misses everywhere so every loaded
+    detector runs once, without counting it in the detector's statistics
+    or cascade policy
+    """
+    import numpy as np
+    stats = dict(detector.detection_stats)
+    policy, detector.cascade_policy = detector.cascade_policy, None
+    try:
+        detect(np.zeros((120, 160, 3), dtype=np.uint8))
+    finally:
+        detector.cascade_policy = policy
+        detector.detection_stats.update(stats)
+
+
+def warm_robust_detector(detector):
+    _blank_frame_detection(detector, lambda image: detector.detect_faces_robust(image, use_preprocessing=False))
+
+
+def _enhanced_detector():
+    from enhanced_face_detector import EnhancedFaceDetector
+    return EnhancedFaceDetector(cascade_policy=enhanced_cascade_policy)
+
+
+def warm_enhanced_detector(detector):
+    _blank_frame_detection(detector, detector.detect_faces)
+
+
+def save_enhanced_cascade_policy():
+    """Write the enhanced detectors' cascade statistics, if they were used"""
+    if not model_registry.is_loaded('enhanced_detector'):
+        return
+    try:
+        enhanced_cascade_policy.save()
+    except OSError as e:
+        print(f"--- [CASCADE] Could not save detector cascade statistics: {e} ---")
+
+
+def _feature_extractor():
+    # Its constructor already runs a test encoding
+    from deep_feature_extractor import DeepFeatureExtractor
+    return DeepFeatureExtractor()
+
+
+# Detector cascade statistics of every enhanced detector instance (pooled
+# ones included) of this process
+enhanced_cascade_policy = CascadePolicy.load(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ENHANCED_CASCADE_POLICY_FILE)
+)
+atexit.register(save_enhanced_cascade_policy)
+
+# The registry of this process
+model_registry = ModelRegistry()
+model_registry.register('face_recognition', _face_recognition)
+model_registry.register('robust_detector', _robust_detector, warm_robust_detector, MODEL_POOL_SIZE)
+model_registry.register('enhanced_detector', _enhanced_detector, warm_enhanced_detector, MODEL_POOL_SIZE)
+model_registry.register('feature_extractor', _feature_extractor)
@@ -11,6 +11,7 @@ Features:
 - Photo association management
 - Transaction handling
 - Query optimization
+- One connection per thread (safe to share between request threads)
 """
 
 import mysql.connector
@@ -21,6 +22,7 @@ import uuid
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 from contextlib import contextmanager
+import threading
 
 class MultiAngleFaceDatabase:
     """
@@ -41,7 +43,8 @@ class MultiAngleFaceDatabase:
         self.user = user
         self.password = password
         self.database = database
-        self.connection = None
+        # MySQL connections are not thread-safe: each thread opens its own
+        self._local = threading.local()
         
         print("=" * 70)
         print("INITIALIZING MULTI-ANGLE FACE DATABASE")
@@ -54,10 +57,17 @@ class MultiAngleFaceDatabase:
         print("=" * 70)
         print()
     
+    @property
+    def connection(self):
+        """The calling thread's connection, opened on its first use"""
+        if getattr(self._local, 'connection', None) is None:
+            self._connect()
+        return self._local.connection
+    
     def _connect(self):
-        """Establish database connection"""
+        """Establish the calling thread's database connection"""
         try:
-            self.connection = mysql.connector.connect(
+            self._local.connection = mysql.connector.connect(
                 host=self.host,
                 user=self.user,
                 password=self.password,
@@ -88,18 +98,20 @@ class MultiAngleFaceDatabase:
     
     def commit(self):
         """Commit current transaction"""
-        if self.connection:
-            self.connection.commit()
+        if getattr(self._local, 'connection', None):
+            self._local.connection.commit()
     
     def rollback(self):
         """Rollback current transaction"""
-        if self.connection:
-            self.connection.rollback()
+        if getattr(self._local, 'connection', None):
+            self._local.connection.rollback()
     
     def close(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
+        """Close the calling thread's database connection"""
+        connection = getattr(self._local, 'connection', None)
+        self._local.connection = None
+        if connection and connection.is_connected():
+            connection.close()
             print("✓ Database connection closed")
     
     # ========================================================================
@@ -15,8 +15,15 @@ import numpy as np
 import os
 import pickle
 import logging
+import threading
 import cv2
 
+from ann_index import create_encoding_index
+from batch_encoding import encode_faces
+from compact_encodings import Int8Quantizer, resolve_dtype
+from encoding_store import EncodingStore, EncodingStoreError, store_path_for
+from gallery_lock import ReadWriteLock, reads_gallery, writes_gallery
+
 # Import configuration
 try:
     from face_recognition_config import (
@@ -27,11 +34,25 @@ try:
         TOLERANCE_SIDE_PROFILE,
         TOLERANCE_PARTIAL_FACE,
         get_tolerance_for_conditions,
-        get_weights_for_orientation
+        get_weights_for_orientation,
+        ANN_INDEX_BACKEND,
+        ANN_MIN_GALLERY_SIZE,
+        ANN_N_PROBE,
+        ANN_EF_SEARCH,
+        CENTROID_PRUNING_MIN_PERSONS,
+        ENCODING_DTYPE,
+        QUANTIZED_SCAN
     )
     USE_CONFIG = True
 except ImportError:
     USE_CONFIG = False
+    ANN_INDEX_BACKEND = 'ivf'
+    ANN_MIN_GALLERY_SIZE = 20000
+    ANN_N_PROBE = 16
+    ANN_EF_SEARCH = 128
+    CENTROID_PRUNING_MIN_PERSONS = 256
+    ENCODING_DTYPE = 'float32'
+    QUANTIZED_SCAN = None
     logger.warning("Configuration file not found, using default values")
 
 # Setup logging
@@ -39,6 +60,31 @@ logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+# Angle slots of the vectorized gallery, in column order
+GALLERY_ANGLES = ('center', 'left', 'right')
+ENCODING_DIM = 128
+
+# Slack on centroid lower bounds for floating-point rounding, and persons
+# scored exactly to seed the upper bound
+PRUNING_EPSILON = 1e-9
+PRUNING_SEEDS = 8
+
+# The |q|^2 + |g|^2 - 2 q.g expansion can misorder near-ties (about this much
+# in a compact dtype, ~1e-8 relative even in float64); batch candidates within
+# it of the best are re-scored exactly, as the single-query path scores them
+BATCH_RESCORE_MARGIN = 1e-3
+
+# Orientation -> (angle column, weight) terms, primary angle first.
+# Orientations not listed are "unknown": minimum distance + plain mean
+ORIENTATION_MATCH_WEIGHTS = {
+    'center': ((0, 0.6), (1, 0.2), (2, 0.2)),
+    'left': ((1, 0.6), (0, 0.3), (2, 0.1)),
+    'angle_left': ((1, 0.6), (0, 0.3), (2, 0.1)),
+    'right': ((2, 0.6), (0, 0.3), (1, 0.1)),
+    'angle_right': ((2, 0.6), (0, 0.3), (1, 0.1)),
+}
+
+
 class MultiAngleFaceModel:
     """
     Enhanced face recognition model with multi-angle encoding support
@@ -69,10 +115,16 @@ class MultiAngleFaceModel:
             'partial_face': 0.68
         }
     
-    def __init__(self, data_file='multi_angle_faces.dat'):
+    def __init__(self, data_file='multi_angle_faces.dat', encoding_dtype=ENCODING_DTYPE,
+                 quantized_scan=QUANTIZED_SCAN):
         """
         Initialize the multi-angle face model
         
+        Args:
+            data_file: Legacy pickle path; the encoding store lives next to it
+            encoding_dtype: Gallery dtype ('float32' halves memory; 'float64')
+            quantized_scan: 'int8' to pre-scan int8 codes before exact scoring
+        
         Data structure:
         {
             'person_0001': {
@@ -89,36 +141,419 @@ class MultiAngleFaceModel:
         }
         """
         self.data_file = data_file
+        self.store = EncodingStore(store_path_for(data_file))
         self.known_faces = {}  # person_id -> {encodings, metadata}
+        
+        # Recognition holds the lock shared, learning/saving exclusive.
+        # Person numbers come from a counter so IDs are never reused
+        self.lock = ReadWriteLock()
+        self._next_person_number = 1
+        
+        # Event membership: event_id -> person IDs filed under that event.
+        # Lets recognition for one event score only its attendees
+        self._event_members = {}
+        self._event_rows = {}  # event_id -> cached gallery rows of its members
+        
+        # Vectorized gallery mirroring known_faces (same row order):
+        # _gallery[row, angle] holds the encoding, _gallery_mask marks stored angles.
+        # Stored compactly; distances are always computed in float64
+        self._dtype = resolve_dtype(encoding_dtype)
+        self._gallery_ids = []
+        self._gallery_rows = {}  # person_id -> row
+        
+        # Per-person centroid of the stored angles and covering radius
+        # (_centroids, _radii): |q - e| >= |q - centroid| - radius for every
+        # stored angle e, so whole persons can be skipped exactly
+        # (radius -inf = nothing stored)
+        
+        # Optional int8 codes of the gallery with per-code error bounds
+        # (_codes, _code_norms, _code_errors), scanned before exact scoring
+        if quantized_scan not in (None, 'int8'):
+            raise ValueError(f"Unknown quantized scan '{quantized_scan}', expected None or 'int8'")
+        self._quantizer = Int8Quantizer() if quantized_scan == 'int8' else None
+        self._resize_gallery(0)
+        
+        # ANN index over gallery slots (key = row * angles + column), built
+        # once the gallery holds ANN_MIN_GALLERY_SIZE encodings
+        self._ann_index = None
+        # Every encoding that could pass the loosest adaptive tolerance
+        # (accessories + low quality) lies within this radius of the query
+        self._ann_radius = max(self.TOLERANCE_SETTINGS.values()) + 0.05 + 0.01
+        # Index searches mutate lazy state (quantizer training), so concurrent
+        # readers take turns on the index; exact scoring stays parallel
+        self._ann_lock = threading.Lock()
+        
         self.load_model()
     
+    @writes_gallery
     def load_model(self):
-        """Load multi-angle face data from file"""
+        """
+        Load multi-angle face data
+        
+        Prefers the memory-mapped encoding store; a legacy pickle is loaded
+        once and converted in place (the .dat file is kept as a backup).
+        
+        Raises:
+            EncodingStoreError: The store exists but cannot be loaded. Neither
+                the backup pickle nor an empty gallery replaces it: saving
+                either would overwrite every person in the store and its log
+        """
+        if self.store.exists():
+            try:
+                converted = self._load_store()
+                replayed = self._replay_log()
+            except Exception as e:
+                logger.error(f"--- [MULTI-ANGLE MODEL] Error loading encoding store: {e} ---")
+                raise EncodingStoreError(
+                    f"Encoding store {self.store.path} could not be loaded ({e}); "
+                    f"left untouched: restore it, or rebuild it from the pickle with convert_to_encoding_store.py --force"
+                ) from e
+            if converted:
+                # Persist the configured dtype so the next start maps it directly
+                self.save_model()
+            logger.info(f"--- [MULTI-ANGLE MODEL] Loaded {len(self.known_faces)} known faces from encoding store "
+                        f"({replayed} logged changes) ---")
+            return
+        
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'rb') as f:
-                    self.known_faces = pickle.load(f)
+                self.load_pickle()
                 logger.info(f"--- [MULTI-ANGLE MODEL] Loaded {len(self.known_faces)} known faces ---")
                 
                 # Log encoding counts
                 for person_id, data in self.known_faces.items():
                     angle_count = len(data.get('encodings', {}))
                     logger.debug(f"  {person_id}: {angle_count} angle encodings")
+                
+                logger.info(f"--- [MULTI-ANGLE MODEL] Converting {self.data_file} to encoding store ---")
+                self.save_model()
             except Exception as e:
                 logger.error(f"--- [MULTI-ANGLE MODEL] Error loading: {e}. Starting fresh ---")
                 self.known_faces = {}
+                self._rebuild_gallery()
         else:
-            logger.info("--- [MULTI-ANGLE MODEL] No existing data file. Starting fresh ---")
+            # Persons learned before the first snapshot only exist in the log
+            replayed = self._replay_log()
+            if replayed:
+                logger.info(f"--- [MULTI-ANGLE MODEL] Recovered {len(self.known_faces)} known faces from log ---")
+            else:
+                logger.info("--- [MULTI-ANGLE MODEL] No existing data file. Starting fresh ---")
     
+    def load_pickle(self):
+        """Load the legacy pickled known_faces dict from data_file"""
+        with open(self.data_file, 'rb') as f:
+            self.known_faces = pickle.load(f)
+        self._rebuild_gallery()
+    
+    def _load_store(self):
+        """Map the stored gallery and rebuild known_faces as views into it"""
+        arrays, meta = self.store.load(mmap_mode='c')
+        if tuple(meta.get('angles', GALLERY_ANGLES)) != GALLERY_ANGLES:
+            raise ValueError(f"Encoding store angles {meta.get('angles')} do not match {GALLERY_ANGLES}")
+        gallery, mask = arrays['gallery'], arrays['mask']
+        converted = gallery.dtype != self._dtype
+        if converted:
+            logger.info(f"--- [MULTI-ANGLE MODEL] Converting stored gallery {gallery.dtype} -> {self._dtype} ---")
+            gallery = gallery.astype(self._dtype)
+        
+        known_faces = {}
+        for row, person in enumerate(meta['persons']):
+            encodings = {angle: gallery[row, col] for col, angle in enumerate(GALLERY_ANGLES) if mask[row, col]}
+            for angle, encoding in person.get('extra_encodings', {}).items():
+                encodings[angle] = np.array(encoding, dtype=np.float64)
+            known_faces[person['id']] = {'encodings': encodings, 'metadata': person.get('metadata', {})}
+        
+        self.known_faces = known_faces
+        # Copy-on-write mapping: untouched pages stay shared with other processes
+        self._gallery = gallery
+        self._gallery_mask = mask
+        self._gallery_ids = [person['id'] for person in meta['persons']]
+        self._gallery_rows = {person_id: row for row, person_id in enumerate(self._gallery_ids)}
+        self._centroids, self._radii = self._person_bounds(gallery, mask)
+        if self._quantizer is not None:
+            self._codes, self._code_norms, self._code_errors = self._quantizer.encode(gallery)
+        self._ann_index = None
+        self._event_members = {event_id: set(person_ids) for event_id, person_ids in meta.get('events', {}).items()}
+        self._event_rows = {}
+        return converted
+    
+    def _replay_log(self):
+        """
+        Apply mutations logged since the loaded snapshot
+        
+        Returns:
+            Number of records applied
+        """
+        records = self.store.replay()
+        for record in records:
+            op = record.get('op')
+            if op == 'put':
+                self.known_faces[record['id']] = {
+                    'encodings': record['encodings'],
+                    'metadata': record.get('metadata', {})
+                }
+                self._sync_gallery_row(record['id'])
+            elif op == 'event_add':
+                self._event_members.setdefault(record['event'], set()).update(record['ids'])
+            elif op == 'event_remove':
+                self._event_members.pop(record['event'], None)
+        self._event_rows = {}
+        return len(records)
+    
+    def _log_person(self, person_id):
+        """
+        Persist one person's current state as a log record
+        
+        O(1) disk I/O per mutation instead of rewriting the whole store; the
+        log is folded into a new snapshot once it outgrows the gallery.
+        """
+        data = self.known_faces[person_id]
+        self._log_record({
+            'op': 'put',
+            'id': person_id,
+            'encodings': dict(data.get('encodings', {})),
+            'metadata': data.get('metadata', {})
+        })
+    
+    def _log_record(self, record):
+        """Append a mutation record, compacting the log when due"""
+        try:
+            self.store.append(record)
+        except Exception as e:
+            logger.error(f"--- [MULTI-ANGLE MODEL] Error logging {record.get('op')}: {e}. Saving snapshot ---")
+            self.save_model()
+            return
+        
+        if self.store.needs_compaction(len(self.known_faces)):
+            logger.info(f"--- [MULTI-ANGLE MODEL] Compacting {self.store.log_records} logged changes ---")
+            self.save_model()
+    
+    @writes_gallery
     def save_model(self):
-        """Save multi-angle face data to file"""
+        """Save multi-angle face data to the encoding store (snapshot + empty log)"""
         try:
-            with open(self.data_file, 'wb') as f:
-                pickle.dump(self.known_faces, f)
+            if len(self._gallery_ids) != len(self.known_faces):
+                # known_faces was edited directly; bring the gallery back in line
+                self._rebuild_gallery()
+            count = len(self._gallery_ids)
+            persons = []
+            for person_id in self._gallery_ids:
+                data = self.known_faces[person_id]
+                person = {'id': person_id, 'metadata': data.get('metadata', {})}
+                # Angles outside the gallery columns (e.g. live-scan angles) go in the sidecar
+                extra = {angle: np.asarray(encoding).tolist()
+                         for angle, encoding in data.get('encodings', {}).items()
+                         if angle not in GALLERY_ANGLES}
+                if extra:
+                    person['extra_encodings'] = extra
+                persons.append(person)
+            
+            events = {event_id: sorted(members) for event_id, members in self._event_members.items()}
+            self.store.save(
+                {'gallery': self._gallery[:count], 'mask': self._gallery_mask[:count]},
+                {'angles': list(GALLERY_ANGLES), 'dim': ENCODING_DIM, 'persons': persons, 'events': events}
+            )
             logger.info(f"--- [MULTI-ANGLE MODEL] Saved {len(self.known_faces)} faces ---")
         except Exception as e:
             logger.error(f"--- [MULTI-ANGLE MODEL] Error saving: {e} ---")
     
+    def _rebuild_gallery(self):
+        """Rebuild the vectorized gallery from known_faces"""
+        self._gallery_ids = []
+        self._gallery_rows = {}
+        self._resize_gallery(max(len(self.known_faces), 1))
+        self._ann_index = None
+        self._event_rows = {}
+        for person_id in self.known_faces:
+            self._sync_gallery_row(person_id)
+    
+    def _sync_gallery_row(self, person_id):
+        """Copy a person's stored angle encodings into their gallery row"""
+        row = self._gallery_rows.get(person_id)
+        if row is None:
+            row = len(self._gallery_ids)
+            if row >= self._gallery.shape[0]:
+                # Amortized growth: double capacity
+                self._resize_gallery(max(2 * self._gallery.shape[0], 1))
+            self._gallery_ids.append(person_id)
+            self._gallery_rows[person_id] = row
+            self._event_rows = {}  # a member may just have gained a row
+        
+        encodings = self.known_faces[person_id].get('encodings', {})
+        for col, angle in enumerate(GALLERY_ANGLES):
+            encoding = encodings.get(angle)
+            if encoding is None:
+                self._gallery[row, col] = 0.0
+                self._gallery_mask[row, col] = False
+            else:
+                self._gallery[row, col] = encoding
+                self._gallery_mask[row, col] = True
+            
+            if self._ann_index is not None:
+                key = row * len(GALLERY_ANGLES) + col
+                if self._gallery_mask[row, col]:
+                    self._ann_index.add(key, self._gallery[row, col])
+                else:
+                    self._ann_index.remove(key)
+        
+        centroids, radii = self._person_bounds(self._gallery[row:row + 1], self._gallery_mask[row:row + 1])
+        self._centroids[row], self._radii[row] = centroids[0], radii[0]
+        if self._quantizer is not None:
+            codes, norms, errors = self._quantizer.encode(self._gallery[row])
+            self._codes[row], self._code_norms[row], self._code_errors[row] = codes, norms, errors
+    
+    def _resize_gallery(self, capacity):
+        """(Re)allocate every per-row array, keeping the rows in use"""
+        count = len(self._gallery_ids)
+        angles = len(GALLERY_ANGLES)
+        arrays = {
+            '_gallery': np.zeros((capacity, angles, ENCODING_DIM), dtype=self._dtype),
+            '_gallery_mask': np.zeros((capacity, angles), dtype=bool),
+            '_centroids': np.zeros((capacity, ENCODING_DIM), dtype=self._dtype),
+            '_radii': np.full(capacity, -np.inf),
+        }
+        if self._quantizer is not None:
+            arrays.update({
+                '_codes': np.zeros((capacity, angles, ENCODING_DIM), dtype=np.int8),
+                '_code_norms': np.zeros((capacity, angles)),
+                '_code_errors': np.zeros((capacity, angles)),
+            })
+        for name, array in arrays.items():
+            if count:
+                array[:count] = getattr(self, name)[:count]
+            setattr(self, name, array)
+    
+    def _person_bounds(self, gallery, mask):
+        """
+        Centroid and covering radius of each person's stored angles
+        
+        Args:
+            gallery: (persons x angles x 128) encodings
+            mask: (persons x angles) stored-angle flags
+        
+        Returns:
+            Tuple of (persons x 128 centroids, persons radii; -inf if nothing stored)
+        """
+        counts = mask.sum(axis=1)
+        sums = np.einsum('pa,pad->pd', mask.astype(np.float64), gallery.astype(np.float64))
+        # Radii are measured from the centroid as stored, so the bound holds exactly
+        centroids = (sums / np.maximum(counts, 1)[:, None]).astype(self._dtype)
+        spread = np.linalg.norm(gallery.astype(np.float64) - centroids[:, None, :].astype(np.float64), axis=-1)
+        radii = np.where(mask, spread, -np.inf).max(axis=1)
+        return centroids, radii
+    
+    def _prune_rows(self, encoding, rows, photo_orientation=None, limit=None):
+        """
+        Drop persons whose centroid lower bound rules them out, exactly
+        
+        Every final (weighted or primary) distance of a person is at least
+        |q - centroid| - radius. Exact scores of the few most promising
+        persons give an upper bound on the best match; anyone whose lower
+        bound exceeds it (or limit, e.g. the tolerance) cannot win.
+        
+        Args:
+            encoding: Query encoding
+            rows: Gallery rows to consider (None: all persons)
+            photo_orientation: Orientation used for the final distance
+            limit: Optional extra cut-off; rows above it are dropped too
+        
+        Returns:
+            Sorted surviving rows (None: not worth pruning, scan rows as given)
+        """
+        count = len(self._gallery_ids) if rows is None else len(rows)
+        if count < CENTROID_PRUNING_MIN_PERSONS:
+            return rows
+        candidates = np.arange(count) if rows is None else np.asarray(rows)
+        
+        query = np.asarray(encoding, dtype=np.float64)
+        lower = np.linalg.norm(self._centroids[candidates] - query, axis=1) - self._radii[candidates]
+        
+        seed_count = min(PRUNING_SEEDS, count)
+        seeds = candidates[np.argpartition(lower, seed_count - 1)[:seed_count]]
+        seed_distances = self._gallery_distances(query, seeds)
+        bound = float(self._final_distances(seed_distances, photo_orientation)[0].min())
+        if limit is not None:
+            bound = min(bound, limit)
+        
+        return candidates[lower <= bound + PRUNING_EPSILON]
+    
+    def _build_ann_index(self):
+        """Index every stored gallery slot for approximate candidate search"""
+        count = len(self._gallery_ids)
+        index = create_encoding_index(ANN_INDEX_BACKEND, ENCODING_DIM, n_probe=ANN_N_PROBE, ef_search=ANN_EF_SEARCH)
+        for row, col in np.argwhere(self._gallery_mask[:count]):
+            index.add(int(row) * len(GALLERY_ANGLES) + int(col), self._gallery[row, col])
+        self._ann_index = index
+        logger.info(f"--- [MULTI-ANGLE MODEL] Built {type(index).__name__} over {len(index)} encodings ---")
+    
+    def _candidate_rows(self, encoding):
+        """
+        Gallery rows worth scoring exactly for this encoding
+        
+        Returns:
+            Sorted row indices, or None to scan the whole gallery
+        """
+        if self._ann_index is None and len(self._gallery_ids) * len(GALLERY_ANGLES) < ANN_MIN_GALLERY_SIZE:
+            return None
+        
+        with self._ann_lock:
+            if self._ann_index is None:
+                count = len(self._gallery_ids)
+                if int(self._gallery_mask[:count].sum()) < ANN_MIN_GALLERY_SIZE:
+                    return None
+                self._build_ann_index()
+            
+            keys, _ = self._ann_index.range_search(encoding, self._ann_radius)
+            if not keys:
+                # Nobody can match; keep the nearest person for the no-match details
+                keys, _ = self._ann_index.search(encoding, k=1)
+        return np.unique(np.asarray(keys, dtype=np.int64) // len(GALLERY_ANGLES))
+    
+    def _quantized_rows(self, encoding, rows, photo_orientation=None, limit=None):
+        """
+        Drop persons ruled out by the int8 pre-scan, exactly
+        
+        The codes give each stored angle a guaranteed [lower, upper] distance
+        interval; orientation weighting is monotone, so a person whose lower
+        final distance exceeds the smallest upper one (or limit) cannot win.
+        
+        Returns:
+            Sorted surviving rows (rows unchanged when no quantizer is configured)
+        """
+        if self._quantizer is None:
+            return rows
+        candidates = np.arange(len(self._gallery_ids)) if rows is None else np.asarray(rows)
+        if len(candidates) == 0:
+            return candidates
+        
+        lower, upper = self._quantizer.distance_bounds(
+            encoding, self._codes[candidates], self._code_norms[candidates], self._code_errors[candidates])
+        mask = self._gallery_mask[candidates]
+        lower_final = self._final_distances(np.where(mask, lower, np.inf), photo_orientation)[0]
+        upper_final = self._final_distances(np.where(mask, upper, np.inf), photo_orientation)[0]
+        
+        bound = float(upper_final.min())
+        if limit is not None:
+            bound = min(bound, limit)
+        return candidates[lower_final <= bound + PRUNING_EPSILON]
+    
+    def _gallery_distances(self, encoding, rows=None):
+        """
+        Distances from one encoding to every stored angle
+        
+        Args:
+            encoding: Face encoding
+            rows: Optional gallery rows to restrict to (default: all persons)
+        
+        Returns:
+            (persons x angles) array, inf where an angle is not stored
+        """
+        if rows is None:
+            rows = slice(0, len(self._gallery_ids))
+        distances = np.linalg.norm(self._gallery[rows] - np.asarray(encoding, dtype=np.float64), axis=-1)
+        return np.where(self._gallery_mask[rows], distances, np.inf)
+    
+    @writes_gallery
     def learn_face_multi_angle(self, encodings_dict, quality_scores=None):
         """
         Learn a new face with multiple angle encodings
@@ -145,7 +580,7 @@ class MultiAngleFaceModel:
             return existing_person_id
         else:
             # Create new person
-            new_id = f"person_{len(self.known_faces) + 1:04d}"
+            new_id = self._allocate_person_id()
             self.known_faces[new_id] = {
                 'encodings': encodings_dict,
                 'metadata': {
@@ -153,10 +588,68 @@ class MultiAngleFaceModel:
                     'angle_count': len(encodings_dict)
                 }
             }
+            self._sync_gallery_row(new_id)
             logger.info(f"--- [MULTI-ANGLE MODEL] Created new person: {new_id} with {len(encodings_dict)} angles ---")
-            self.save_model()
+            self._log_person(new_id)
             return new_id
     
+    @writes_gallery
+    def add_event_members(self, event_id, person_ids):
+        """
+        Record that these persons appear in an event's photos
+        
+        Args:
+            event_id: Event the photos were filed under
+            person_ids: Person IDs found in one photo (or any batch); IDs
+                        this gallery does not know are ignored (the legacy
+                        gallery uses the same person_NNNN format)
+        """
+        members = self._event_members.get(event_id, set())
+        new_ids = sorted({person_id for person_id in person_ids if person_id in self.known_faces} - members)
+        if not new_ids:
+            return
+        self._event_members.setdefault(event_id, set()).update(new_ids)
+        self._event_rows.pop(event_id, None)
+        self._log_record({'op': 'event_add', 'event': event_id, 'ids': new_ids})
+    
+    @writes_gallery
+    def remove_event(self, event_id):
+        """Forget an event's membership (the persons themselves stay known)"""
+        if self._event_members.pop(event_id, None) is None:
+            return
+        self._event_rows.pop(event_id, None)
+        self._log_record({'op': 'event_remove', 'event': event_id})
+    
+    @reads_gallery
+    def event_members(self, event_id):
+        """Person IDs known to appear in an event (empty set if unindexed)"""
+        return set(self._event_members.get(event_id, ()))
+    
+    def _event_candidate_rows(self, event_id):
+        """
+        Gallery rows of an event's members, or None to search globally
+        
+        Falls back to the global gallery when the event has no membership
+        yet (e.g. processed before the index existed) or none of its members
+        are in this gallery.
+        """
+        if event_id is None or not self._event_members.get(event_id):
+            return None
+        rows = self._event_rows.get(event_id)
+        if rows is None:
+            rows = np.array(sorted(self._gallery_rows[person_id] for person_id in self._event_members[event_id]
+                                   if person_id in self._gallery_rows), dtype=np.int64)
+            self._event_rows[event_id] = rows
+        return rows if len(rows) else None
+    
+    def _allocate_person_id(self):
+        """Next unused person ID (call with the write lock held)"""
+        number = max(self._next_person_number, len(self.known_faces) + 1)
+        while f"person_{number:04d}" in self.known_faces:
+            number += 1
+        self._next_person_number = number + 1
+        return f"person_{number:04d}"
+    
     def _find_existing_person(self, encoding, tolerance=0.5):
         """
         Find if encoding matches an existing person
@@ -171,19 +664,17 @@ class MultiAngleFaceModel:
         if not self.known_faces:
             return None
         
-        best_match_id = None
-        best_distance = float('inf')
+        rows = self._prune_rows(encoding, self._candidate_rows(encoding), limit=tolerance)
+        rows = self._quantized_rows(encoding, rows, limit=tolerance)
+        distances = self._gallery_distances(encoding, rows)
+        if distances.size == 0:
+            return None
         
-        for person_id, data in self.known_faces.items():
-            encodings = data.get('encodings', {})
-            
-            # Compare against all stored angles
-            for angle, stored_encoding in encodings.items():
-                distance = face_recognition.face_distance([stored_encoding], encoding)[0]
-                
-                if distance < best_distance:
-                    best_distance = distance
-                    best_match_id = person_id
+        # First minimum in (person, angle) order, as the per-person loop did
+        best_flat = int(np.argmin(distances))
+        best_row, best_col = divmod(best_flat, distances.shape[1])
+        best_distance = distances[best_row, best_col]
+        best_match_id = self._gallery_ids[best_row if rows is None else rows[best_row]]
         
         if best_distance <= tolerance:
             logger.debug(f"Found existing person {best_match_id} with distance {best_distance:.2f}")
@@ -214,10 +705,12 @@ class MultiAngleFaceModel:
         if updated:
             self.known_faces[person_id]['encodings'] = current_encodings
             self.known_faces[person_id]['metadata']['quality_scores'] = current_quality
-            self.save_model()
+            self._sync_gallery_row(person_id)
+            self._log_person(person_id)
     
+    @reads_gallery
     def recognize_face_multi_angle(self, photo_encoding, adaptive_tolerance=True, photo_orientation=None, 
-                                   has_accessories=False, quality_score=1.0):
+                                   has_accessories=False, quality_score=1.0, event_id=None):
         """
         ENHANCED: Recognize face using intelligent cross-angle weighted matching
         
@@ -233,6 +726,7 @@ class MultiAngleFaceModel:
             photo_orientation: Detected orientation ('center', 'left', 'right', 'angle_left', 'angle_right', 'unknown')
             has_accessories: Whether photo shows accessories (sunglasses, mask, etc.)
             quality_score: Image quality score (0-1)
+            event_id: Optional event to restrict candidates to its members
         
         Returns:
             Tuple of (person_id, confidence, best_angle, distance, match_details)
@@ -241,79 +735,173 @@ class MultiAngleFaceModel:
             logger.warning("--- [MULTI-ANGLE MODEL] No known faces to match against ---")
             return None, 0.0, None, float('inf'), {}
         
+        # CRITICAL: Compare against ALL known faces in one vectorized pass
+        # over the (persons x angles) distance matrix
+        # Event members only when the event is indexed; otherwise with an
+        # ANN index only candidate persons are scored, exactly
+        rows = self._event_candidate_rows(event_id)
+        if rows is None:
+            rows = self._candidate_rows(photo_encoding)
+        # Exact centroid/radius pruning skips persons that cannot be the best
+        rows = self._prune_rows(photo_encoding, rows, photo_orientation)
+        rows = self._quantized_rows(photo_encoding, rows, photo_orientation)
+        distances = self._gallery_distances(photo_encoding, rows)
+        return self._decide_match(distances, photo_orientation, has_accessories, quality_score, rows)
+    
+    @reads_gallery
+    def recognize_faces_multi_angle_batch(self, photo_encodings, photo_orientations=None,
+                                          has_accessories=None, quality_scores=None, event_id=None):
+        """
+        Recognize many faces at once (all faces of a photo, or of many photos)
+        
+        Distances for every query against every stored angle are computed in a
+        single matrix-matrix product; the per-query weighting, adaptive tolerance
+        and 70% threshold are the same as recognize_face_multi_angle.
+        
+        Args:
+            photo_encodings: (M x 128) matrix or list of encodings
+            photo_orientations: Optional list of M orientations
+            has_accessories: Optional list of M accessory flags
+            quality_scores: Optional list of M quality scores (0-1)
+            event_id: Optional event to restrict candidates to its members
+        
+        Returns:
+            List of M tuples (person_id, confidence, best_angle, distance, match_details)
+        """
+        queries = np.asarray(photo_encodings, dtype=np.float64).reshape(-1, ENCODING_DIM)
+        count = queries.shape[0]
+        photo_orientations = photo_orientations if photo_orientations is not None else [None] * count
+        has_accessories = has_accessories if has_accessories is not None else [False] * count
+        quality_scores = quality_scores if quality_scores is not None else [1.0] * count
+        
+        if not self.known_faces:
+            logger.warning("--- [MULTI-ANGLE MODEL] No known faces to match against ---")
+            return [(None, 0.0, None, float('inf'), {}) for _ in range(count)]
+        
+        if count == 0:
+            return []
+        
+        rows = self._event_candidate_rows(event_id)
+        if rows is None:
+            candidates = [self._candidate_rows(query) for query in queries]
+            if candidates[0] is not None:
+                # Score the union of every query's candidates in one product
+                rows = np.unique(np.concatenate(candidates))
+        
+        # Union of each query's pruned rows: a superset of what every query
+        # needs, so each decision stays exact
+        pruned = [self._prune_rows(queries[i], rows, photo_orientations[i]) for i in range(count)]
+        if pruned[0] is not rows:
+            rows = np.unique(np.concatenate(pruned))
+        
+        distances = self._gallery_distances_batch(queries, rows)
+        results = []
+        for i in range(count):
+            query_distances, query_rows = distances[i], rows
+            # Re-score everything near the best exactly (for every dtype)
+            final = self._final_distances(query_distances, photo_orientations[i])[0]
+            if final.size and np.isfinite(final.min()):
+                near = np.flatnonzero(final <= final.min() + BATCH_RESCORE_MARGIN)
+                query_rows = near if rows is None else np.asarray(rows)[near]
+                query_distances = self._gallery_distances(queries[i], query_rows)
+            results.append(self._decide_match(query_distances, photo_orientations[i], bool(has_accessories[i]),
+                                              quality_scores[i], query_rows))
+        return results
+    
+    def _gallery_distances_batch(self, queries, rows=None):
+        """
+        Distances from M encodings to every stored angle via one matrix product
+        
+        Args:
+            queries: (M x 128) encoding matrix
+            rows: Optional gallery rows to restrict to (default: all persons)
+        
+        Returns:
+            (M x persons x angles) array, inf where an angle is not stored
+        """
+        if rows is None:
+            rows = slice(0, len(self._gallery_ids))
+        gallery = self._gallery[rows].reshape(-1, ENCODING_DIM)
+        # Product in the gallery dtype (no float64 copy of a compact gallery)
+        queries = queries.astype(self._dtype, copy=False)
+        
+        # |q - g|^2 = |q|^2 + |g|^2 - 2 q.g
+        squared = (
+            np.einsum('ij,ij->i', queries, queries)[:, None] +
+            np.einsum('ij,ij->i', gallery, gallery)[None, :] -
+            2.0 * (queries @ gallery.T)
+        )
+        distances = np.sqrt(np.maximum(squared, 0.0)).reshape(len(queries), -1, len(GALLERY_ANGLES))
+        return np.where(self._gallery_mask[rows], distances, np.inf)
+    
+    @staticmethod
+    def _final_distances(distances, photo_orientation):
+        """
+        Orientation-weighted distances per person
+        
+        Returns:
+            Tuple of (final, weighted, primary) distance vectors
+        """
+        distance_to_center = distances[:, 0]
+        distance_to_left = distances[:, 1]
+        distance_to_right = distances[:, 2]
+        
+        # SMART WEIGHTING: Apply orientation-aware weights
+        weight_terms = ORIENTATION_MATCH_WEIGHTS.get(photo_orientation)
+        if weight_terms is not None:
+            # Primary angle gets 60%, the rest is split by adjacency
+            (primary_col, primary_weight), (col_b, weight_b), (col_c, weight_c) = weight_terms
+            weighted_distance = (
+                distances[:, primary_col] * primary_weight +
+                distances[:, col_b] * weight_b +
+                distances[:, col_c] * weight_c
+            )
+            primary_distance = distances[:, primary_col]
+        else:
+            # Unknown orientation - use minimum distance approach
+            primary_distance = np.minimum(np.minimum(distance_to_center, distance_to_left), distance_to_right)
+            weighted_distance = (distance_to_center + distance_to_left + distance_to_right) / 3
+        
+        # Use the BEST (minimum) distance for final decision
+        return np.minimum(primary_distance, weighted_distance), weighted_distance, primary_distance
+    
+    def _decide_match(self, distances, photo_orientation, has_accessories, quality_score, rows=None):
+        """
+        Apply orientation weighting, adaptive tolerance and the 70% threshold
+        to one query's (persons x angles) distance matrix
+        
+        rows maps distance rows back to gallery rows when only candidate
+        persons were scored (None: distances cover the whole gallery).
+        """
         best_person_id = None
         best_weighted_distance = float('inf')
         best_match_details = {}
         
-        # CRITICAL: Compare against ALL known faces using weighted cross-angle matching
-        for person_id, data in self.known_faces.items():
-            encodings = data.get('encodings', {})
-            
-            # Calculate distances to ALL three stored angles
-            distance_to_center = float('inf')
-            distance_to_left = float('inf')
-            distance_to_right = float('inf')
-            
-            if 'center' in encodings:
-                distance_to_center = face_recognition.face_distance([encodings['center']], photo_encoding)[0]
-            if 'left' in encodings:
-                distance_to_left = face_recognition.face_distance([encodings['left']], photo_encoding)[0]
-            if 'right' in encodings:
-                distance_to_right = face_recognition.face_distance([encodings['right']], photo_encoding)[0]
-            
-            logger.debug(f"  {person_id} - Center: {distance_to_center:.3f}, Left: {distance_to_left:.3f}, Right: {distance_to_right:.3f}")
-            
-            # SMART WEIGHTING: Apply orientation-aware weights
-            if photo_orientation == 'center':
-                # Photo is frontal - prioritize center encoding
-                weighted_distance = (
-                    distance_to_center * 0.6 +  # 60% weight to center
-                    distance_to_left * 0.2 +     # 20% weight to left
-                    distance_to_right * 0.2      # 20% weight to right
-                )
-                primary_distance = distance_to_center
-                
-            elif photo_orientation == 'left' or photo_orientation == 'angle_left':
-                # Photo shows left profile - prioritize left encoding
-                weighted_distance = (
-                    distance_to_left * 0.6 +     # 60% weight to left
-                    distance_to_center * 0.3 +   # 30% weight to center
-                    distance_to_right * 0.1      # 10% weight to right
-                )
-                primary_distance = distance_to_left
-                
-            elif photo_orientation == 'right' or photo_orientation == 'angle_right':
-                # Photo shows right profile - prioritize right encoding
-                weighted_distance = (
-                    distance_to_right * 0.6 +    # 60% weight to right
-                    distance_to_center * 0.3 +   # 30% weight to center
-                    distance_to_left * 0.1       # 10% weight to left
-                )
-                primary_distance = distance_to_right
-                
-            else:
-                # Unknown orientation - use minimum distance approach
-                primary_distance = min(distance_to_center, distance_to_left, distance_to_right)
-                weighted_distance = (distance_to_center + distance_to_left + distance_to_right) / 3
-            
-            # Use the BEST (minimum) distance for final decision
-            final_distance = min(primary_distance, weighted_distance)
-            
-            if final_distance < best_weighted_distance:
-                best_weighted_distance = final_distance
-                best_person_id = person_id
+        distance_to_center = distances[:, 0]
+        distance_to_left = distances[:, 1]
+        distance_to_right = distances[:, 2]
+        
+        final_distance, weighted_distance, primary_distance = self._final_distances(distances, photo_orientation)
+        
+        if final_distance.size:
+            best_row = int(np.argmin(final_distance))
+            if final_distance[best_row] < best_weighted_distance:
+                best_weighted_distance = final_distance[best_row]
+                best_person_id = self._gallery_ids[best_row if rows is None else rows[best_row]]
                 best_match_details = {
-                    'person_id': person_id,
+                    'person_id': best_person_id,
                     'photo_orientation': photo_orientation or 'unknown',
-                    'distance_to_center': distance_to_center,
-                    'distance_to_left': distance_to_left,
-                    'distance_to_right': distance_to_right,
-                    'weighted_distance': weighted_distance,
-                    'primary_distance': primary_distance,
-                    'final_distance': final_distance,
+                    'distance_to_center': distance_to_center[best_row],
+                    'distance_to_left': distance_to_left[best_row],
+                    'distance_to_right': distance_to_right[best_row],
+                    'weighted_distance': weighted_distance[best_row],
+                    'primary_distance': primary_distance[best_row],
+                    'final_distance': final_distance[best_row],
                     'has_accessories': has_accessories,
                     'quality_score': quality_score
                 }
+                logger.debug(f"  {best_person_id} - Center: {distance_to_center[best_row]:.3f}, "
+                             f"Left: {distance_to_left[best_row]:.3f}, Right: {distance_to_right[best_row]:.3f}")
         
         # ADAPTIVE TOLERANCE based on photo conditions
         base_tolerance = self.TOLERANCE_SETTINGS['default']  # 0.6
@@ -364,6 +952,7 @@ class MultiAngleFaceModel:
             logger.info(f"    Distance: {best_weighted_distance:.3f} > Tolerance: {base_tolerance}")
             return None, 0.0, None, best_weighted_distance, best_match_details
     
+    @reads_gallery
     def get_all_encodings_flat(self):
         """
         Get all encodings as flat lists (for backward compatibility)
@@ -382,12 +971,14 @@ class MultiAngleFaceModel:
         
         return all_encodings, all_ids
     
+    @reads_gallery
     def get_person_encodings(self, person_id):
         """Get all encodings for a specific person"""
         if person_id in self.known_faces:
-            return self.known_faces[person_id].get('encodings', {})
+            return dict(self.known_faces[person_id].get('encodings', {}))
         return {}
     
+    @writes_gallery
     def migrate_from_old_model(self, old_encodings, old_ids):
         """
         Migrate data from old single-encoding model
@@ -408,6 +999,7 @@ class MultiAngleFaceModel:
                         'angle_count': 1
                     }
                 }
+                self._sync_gallery_row(person_id)
                 logger.debug(f"  Migrated {person_id} (center only)")
         
         self.save_model()
@@ -449,6 +1041,134 @@ def preprocess_image_for_recognition(image):
         return image
 
 
+def _face_gray(image, face_location, gray=None):
+    """Grayscale crop of a face, sliced from a whole-image grayscale if given"""
+    top, right, bottom, left = face_location
+    if gray is not None:
+        return gray[top:bottom, left:right]
+    face_region = image[top:bottom, left:right]
+    if face_region.size == 0:
+        return face_region[:, :, 0]
+    return cv2.cvtColor(face_region, cv2.COLOR_RGB2GRAY)
+
+
+def _face_landmarks(image, face_location):
+    """68-point landmarks of one face, or None"""
+    face_landmarks_list = face_recognition.face_landmarks(image, [face_location])
+    return face_landmarks_list[0] if face_landmarks_list else None
+
+
+def _sunglasses_from_gray(face_gray):
+    """Very dark face region -> likely wearing sunglasses"""
+    if face_gray.size == 0:
+        return False
+    mean_intensity = np.mean(face_gray)
+    is_dark = mean_intensity < 50
+    
+    if is_dark:
+        logger.debug(f"Sunglasses detected (intensity: {mean_intensity:.1f})")
+    
+    return bool(is_dark)
+
+
+def _orientation_from_landmarks(landmarks, face_location):
+    """Orientation from the visibility of left/right features and the nose offset"""
+    # Get key facial features
+    nose_bridge = landmarks.get('nose_bridge', [])
+    left_eye = landmarks.get('left_eye', [])
+    right_eye = landmarks.get('right_eye', [])
+    left_eyebrow = landmarks.get('left_eyebrow', [])
+    right_eyebrow = landmarks.get('right_eyebrow', [])
+    
+    if not nose_bridge or not left_eye or not right_eye:
+        return 'unknown'
+    
+    # Calculate visibility of left vs right features
+    top, right_bound, bottom, left_bound = face_location
+    face_width = right_bound - left_bound
+    face_center_x = (left_bound + right_bound) / 2
+    
+    # Count visible points for each side
+    left_features = left_eyebrow + left_eye
+    right_features = right_eyebrow + right_eye
+    
+    left_visibility = len([p for p in left_features if left_bound <= p[0] <= right_bound])
+    right_visibility = len([p for p in right_features if left_bound <= p[0] <= right_bound])
+    
+    # Calculate nose bridge angle
+    if len(nose_bridge) >= 2:
+        # Calculate horizontal offset of nose from face center
+        nose_center_x = np.mean([p[0] for p in nose_bridge])
+        nose_offset = nose_center_x - face_center_x
+        nose_offset_ratio = nose_offset / (face_width / 2) if face_width > 0 else 0
+    else:
+        nose_offset_ratio = 0
+    
+    # Determine orientation based on feature visibility and nose position
+    visibility_diff = left_visibility - right_visibility
+    
+    logger.debug(f"Orientation detection - Left vis: {left_visibility}, Right vis: {right_visibility}, "
+                f"Nose offset ratio: {nose_offset_ratio:.2f}")
+    
+    # Frontal face: both sides visible, nose centered
+    if abs(visibility_diff) <= 3 and abs(nose_offset_ratio) < 0.15:
+        return 'center'
+    
+    # Left profile: right side more visible, nose shifted left
+    elif visibility_diff < -3 or nose_offset_ratio < -0.15:
+        if abs(nose_offset_ratio) > 0.35 or visibility_diff < -6:
+            return 'left'  # Strong left profile
+        else:
+            return 'angle_left'  # Slight left turn
+    
+    # Right profile: left side more visible, nose shifted right
+    elif visibility_diff > 3 or nose_offset_ratio > 0.15:
+        if abs(nose_offset_ratio) > 0.35 or visibility_diff > 6:
+            return 'right'  # Strong right profile
+        else:
+            return 'angle_right'  # Slight right turn
+    
+    else:
+        return 'center'  # Default to center
+
+
+def _quality_from_gray(face_gray, face_location):
+    """Sharpness, brightness, contrast and resolution of a grayscale face crop"""
+    if face_gray.size == 0:
+        return 0.0
+    
+    # 1. Check sharpness using Laplacian variance
+    laplacian_var = cv2.Laplacian(face_gray, cv2.CV_64F).var()
+    sharpness_score = min(laplacian_var / 500, 1.0)  # Normalize
+    
+    # 2. Check brightness
+    mean_brightness = np.mean(face_gray)
+    brightness_score = 1.0 - abs(mean_brightness - 127) / 127  # Optimal at 127
+    
+    # 3. Check contrast
+    contrast = face_gray.std()
+    contrast_score = min(contrast / 50, 1.0)  # Normalize
+    
+    # 4. Check resolution
+    top, right, bottom, left = face_location
+    face_width = right - left
+    face_height = bottom - top
+    resolution_score = min(min(face_width, face_height) / 100, 1.0)
+    
+    # Combined quality score
+    quality_score = (
+        sharpness_score * 0.3 +
+        brightness_score * 0.25 +
+        contrast_score * 0.25 +
+        resolution_score * 0.2
+    )
+    
+    logger.debug(f"Quality assessment - Sharpness: {sharpness_score:.2f}, Brightness: {brightness_score:.2f}, "
+                f"Contrast: {contrast_score:.2f}, Resolution: {resolution_score:.2f}, Overall: {quality_score:.2f}")
+    
+    return quality_score
+
+
 def detect_sunglasses(image, face_location):
     """
     Detect if person is wearing sunglasses
@@ -461,29 +1181,9 @@ def detect_sunglasses(image, face_location):
         True if sunglasses detected
     """
     try:
-        # Get facial landmarks
-        landmarks = face_recognition.face_landmarks(image, [face_location])
-        
-        if not landmarks:
+        if _face_landmarks(image, face_location) is None:
             return False
-        
-        # Extract eye region
-        top, right, bottom, left = face_location
-        eye_region = image[top:bottom, left:right]
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(eye_region, cv2.COLOR_RGB2GRAY)
-        
-        # Calculate mean intensity in eye regions
-        mean_intensity = np.mean(gray)
-        
-        # If very dark, likely wearing sunglasses
-        is_dark = mean_intensity < 50
-        
-        if is_dark:
-            logger.debug(f"Sunglasses detected (intensity: {mean_intensity:.1f})")
-        
-        return is_dark
+        return _sunglasses_from_gray(_face_gray(image, face_location))
     except Exception as e:
         logger.error(f"Error detecting sunglasses: {e}")
         return False
@@ -501,77 +1201,11 @@ def detect_face_orientation(image, face_location):
         str: 'center', 'left', 'right', 'angle_left', 'angle_right', or 'unknown'
     """
     try:
-        # Get facial landmarks
-        face_landmarks_list = face_recognition.face_landmarks(image, [face_location])
-        
-        if len(face_landmarks_list) == 0:
+        landmarks = _face_landmarks(image, face_location)
+        if landmarks is None:
             logger.debug("No landmarks detected for orientation")
             return 'unknown'
-        
-        landmarks = face_landmarks_list[0]
-        
-        # Get key facial features
-        nose_bridge = landmarks.get('nose_bridge', [])
-        left_eye = landmarks.get('left_eye', [])
-        right_eye = landmarks.get('right_eye', [])
-        left_eyebrow = landmarks.get('left_eyebrow', [])
-        right_eyebrow = landmarks.get('right_eyebrow', [])
-        
-        if not nose_bridge or not left_eye or not right_eye:
-            return 'unknown'
-        
-        # Calculate visibility of left vs right features
-        top, right_bound, bottom, left_bound = face_location
-        face_width = right_bound - left_bound
-        face_center_x = (left_bound + right_bound) / 2
-        
-        # Count visible points for each side
-        left_features = left_eyebrow + left_eye
-        right_features = right_eyebrow + right_eye
-        
-        left_visibility = len([p for p in left_features if left_bound <= p[0] <= right_bound])
-        right_visibility = len([p for p in right_features if left_bound <= p[0] <= right_bound])
-        
-        # Calculate nose bridge angle
-        if len(nose_bridge) >= 2:
-            nose_start = np.array(nose_bridge[0])
-            nose_end = np.array(nose_bridge[-1])
-            nose_vector = nose_end - nose_start
-            
-            # Calculate horizontal offset of nose from face center
-            nose_center_x = np.mean([p[0] for p in nose_bridge])
-            nose_offset = nose_center_x - face_center_x
-            nose_offset_ratio = nose_offset / (face_width / 2) if face_width > 0 else 0
-        else:
-            nose_offset_ratio = 0
-        
-        # Determine orientation based on feature visibility and nose position
-        visibility_diff = left_visibility - right_visibility
-        
-        logger.debug(f"Orientation detection - Left vis: {left_visibility}, Right vis: {right_visibility}, "
-                    f"Nose offset ratio: {nose_offset_ratio:.2f}")
-        
-        # Frontal face: both sides visible, nose centered
-        if abs(visibility_diff) <= 3 and abs(nose_offset_ratio) < 0.15:
-            return 'center'
-        
-        # Left profile: right side more visible, nose shifted left
-        elif visibility_diff < -3 or nose_offset_ratio < -0.15:
-            if abs(nose_offset_ratio) > 0.35 or visibility_diff < -6:
-                return 'left'  # Strong left profile
-            else:
-                return 'angle_left'  # Slight left turn
-        
-        # Right profile: left side more visible, nose shifted right
-        elif visibility_diff > 3 or nose_offset_ratio > 0.15:
-            if abs(nose_offset_ratio) > 0.35 or visibility_diff > 6:
-                return 'right'  # Strong right profile
-            else:
-                return 'angle_right'  # Slight right turn
-        
-        else:
-            return 'center'  # Default to center
-    
+        return _orientation_from_landmarks(landmarks, face_location)
     except Exception as e:
         logger.error(f"Error detecting face orientation: {e}")
         return 'unknown'
@@ -589,50 +1223,63 @@ def assess_image_quality(image, face_location):
         float: Quality score from 0 (poor) to 1 (excellent)
     """
     try:
-        top, right, bottom, left = face_location
-        face_region = image[top:bottom, left:right]
-        
-        if face_region.size == 0:
-            return 0.0
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(face_region, cv2.COLOR_RGB2GRAY)
-        
-        # 1. Check sharpness using Laplacian variance
-        laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
-        sharpness_score = min(laplacian_var / 500, 1.0)  # Normalize
-        
-        # 2. Check brightness
-        mean_brightness = np.mean(gray)
-        brightness_score = 1.0 - abs(mean_brightness - 127) / 127  # Optimal at 127
-        
-        # 3. Check contrast
-        contrast = gray.std()
-        contrast_score = min(contrast / 50, 1.0)  # Normalize
-        
-        # 4. Check resolution
-        face_width = right - left
-        face_height = bottom - top
-        resolution_score = min(min(face_width, face_height) / 100, 1.0)
-        
-        # Combined quality score
-        quality_score = (
-            sharpness_score * 0.3 +
-            brightness_score * 0.25 +
-            contrast_score * 0.25 +
-            resolution_score * 0.2
-        )
-        
-        logger.debug(f"Quality assessment - Sharpness: {sharpness_score:.2f}, Brightness: {brightness_score:.2f}, "
-                    f"Contrast: {contrast_score:.2f}, Resolution: {resolution_score:.2f}, Overall: {quality_score:.2f}")
-        
-        return quality_score
-    
+        return _quality_from_gray(_face_gray(image, face_location), face_location)
     except Exception as e:
         logger.error(f"Error assessing image quality: {e}")
         return 0.5  # Return neutral score on error
 
 
+def analyze_face(image, face_location, gray=None, encode=False):
+    """
+    Orientation, sunglasses and quality of one face in a single pass
+    
+    detect_face_orientation and detect_sunglasses each run the 68-point
+    shape predictor, and detect_sunglasses and assess_image_quality each crop
+    and convert the face to grayscale. This runs the predictor once and
+    shares one grayscale crop; results are identical to the three calls.
+    
+    Args:
+        image: Image (RGB format)
+        face_location: Face bounding box (top, right, bottom, left)
+        gray: Optional grayscale of the whole image (e.g. ImageContext.gray);
+              the face crop is sliced from it instead of converted
+        encode: Also compute the face encoding. It keeps face_recognition's
+                5-point alignment, which every stored gallery was encoded
+                with; a 68-point-aligned encoding differs by ~0.16
+    
+    Returns:
+        Dict with 'orientation', 'has_sunglasses', 'quality_score',
+        'landmarks' (None if no landmarks were found) and 'encoding'
+        (None unless encode is set or if encoding failed)
+    """
+    analysis = {
+        'orientation': 'unknown',
+        'has_sunglasses': False,
+        'quality_score': 0.5,
+        'landmarks': None,
+        'encoding': None,
+    }
+    try:
+        analysis['landmarks'] = _face_landmarks(image, face_location)
+    except Exception as e:
+        logger.error(f"Error computing face landmarks: {e}")
+    
+    try:
+        if analysis['landmarks'] is not None:
+            analysis['orientation'] = _orientation_from_landmarks(analysis['landmarks'], face_location)
+        face_gray = _face_gray(image, face_location, gray)
+        if analysis['landmarks'] is not None:
+            analysis['has_sunglasses'] = _sunglasses_from_gray(face_gray)
+        analysis['quality_score'] = _quality_from_gray(face_gray, face_location)
+    except Exception as e:
+        logger.error(f"Error analyzing face: {e}")
+    
+    if encode:
+        analysis['encoding'] = encode_faces(image, [face_location])[0]
+    
+    return analysis
+
+
 def analyze_photo_all_faces_all_angles(photo_path):
     """
     CRITICAL FUNCTION: Extract encodings from ALL faces in photo with orientation detection
@@ -678,27 +1325,22 @@ def analyze_photo_all_faces_all_angles(photo_path):
         
         faces_data = []
         
+        # Encode all faces in one batch (aligned; None where a face failed)
+        face_encodings = encode_faces(image, face_locations)
+        
         # Process each detected face
-        for idx, face_location in enumerate(face_locations):
+        for idx, (face_location, face_encoding) in enumerate(zip(face_locations, face_encodings)):
             try:
-                # Generate encoding for this face
-                face_encodings = face_recognition.face_encodings(image, [face_location])
-                
-                if not face_encodings:
+                if face_encoding is None:
                     logger.warning(f"Could not generate encoding for face {idx}")
                     continue
                 
-                face_encoding = face_encodings[0]
-                
-                # Detect face orientation
-                orientation = detect_face_orientation(image, face_location)
-                
-                # Detect accessories
-                has_sunglasses = detect_sunglasses(image, face_location)
+                # Orientation, accessories and quality in one pass
+                analysis = analyze_face(image, face_location)
+                orientation = analysis['orientation']
+                has_sunglasses = analysis['has_sunglasses']
                 has_mask = False  # TODO: Implement mask detection if needed
-                
-                # Assess image quality
-                quality_score = assess_image_quality(image, face_location)
+                quality_score = analysis['quality_score']
                 
                 faces_data.append({
                     'face_index': idx,
@@ -0,0 +1,358 @@
+"""
+Parallel Photo Processing Pipeline
+Per-photo face analysis for event uploads, optionally spread over worker processes
+
+Detection, encoding and per-face analysis (orientation, accessories,
+quality) only read the photo, so they run in a pool of worker processes,
+each holding its own warm RobustFaceDetector. Gallery matching and writing
+results stay with a single coordinator (app.process_images), which consumes
+the analyses in photo order, so the person IDs assigned are the same as in
+a serial run.
+
+Each photo is decoded once into an ImageContext whose BGR, RGB and grayscale
+views are shared by detection, encoding and analysis. Every analysis carries
+its per-stage timings (decode, detect, encode, analyze) for the status API.
+
+Features:
+- analyze_photo(): everything for one photo that needs no gallery access
+- analyze_photos(): the same for a group of photos, their DNN face detection
+  batched into one forward pass
+- iter_photo_analyses(): analyses in input order, serially or from a pool
+- ThroughputMeter: photos/sec progress reporting
+- Detector cascade statistics: workers start from the saved CascadePolicy and
+  return each photo's detector attempts ('detector_trace') for the
+  coordinator to merge
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import face_recognition
+
+from image_context import ImageContext
+from processing_status import StageTimer
+from multi_angle_face_model import analyze_face
+from batch_encoding import box_to_location, encode_faces
+
+try:
+    from face_recognition_config import (
+        PIPELINE_WORKERS,
+        PIPELINE_CHUNK_SIZE,
+        PIPELINE_START_METHOD,
+        PIPELINE_PROGRESS_INTERVAL,
+        PROCESSING_CPU_BUDGET,
+        DETECTION_CONCURRENT,
+        DNN_BATCH_SIZE,
+    )
+except ImportError:
+    PIPELINE_WORKERS = 1
+    PIPELINE_CHUNK_SIZE = 4
+    PIPELINE_START_METHOD = 'spawn'
+    PIPELINE_PROGRESS_INTERVAL = 100
+    PROCESSING_CPU_BUDGET = 0
+    DETECTION_CONCURRENT = False
+    DNN_BATCH_SIZE = 1
+
+# Detector owned by this worker process, loaded once by _init_worker
+_worker_detector = None
+
+
+def resolve_workers(workers):
+    """Worker process count for a configured value (0 or None = one per CPU core)"""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(int(workers), 1)
+
+
+def workers_per_event(concurrent_events, workers=PIPELINE_WORKERS, cpu_budget=PROCESSING_CPU_BUDGET):
+    """Worker processes for one event's run when concurrent_events share the CPU budget"""
+    share = max(resolve_workers(cpu_budget) // max(int(concurrent_events), 1), 1)
+    return min(resolve_workers(workers), share)
+
+
+def _init_worker(use_robust, policy_path=None):
+    """Pool initializer: load a RobustFaceDetector once per worker process"""
+    global _worker_detector
+    if not use_robust:
+        return
+    try:
+        from robust_face_detector import RobustFaceDetector
+        policy = None
+        if policy_path:
+            from cascade_policy import CascadePolicy
+            policy = CascadePolicy.load(policy_path, keep_trace=True)
+        _worker_detector = RobustFaceDetector(cascade_policy=policy)
+    except Exception as e:
+        print(f"--- [PIPELINE] Worker {os.getpid()}: robust detector not available: {e} ---")
+        _worker_detector = None
+
+
+def _analyze_in_worker(image_paths, profile=None, batch_size=DNN_BATCH_SIZE):
+    results = analyze_photos(image_paths, _worker_detector, profile, batch_size)
+    policy = getattr(_worker_detector, 'cascade_policy', None)
+    if policy is not None and results:
+        results[-1]['detector_trace'] = policy.drain()
+    return results
+
+
+def analyze_photo(image_path, detector=None, profile=None, context=None, dnn_prefetch=None):
+    """
+    Detect, encode and analyze every face in one photo
+
+    Args:
+        image_path: Path to the photo
+        detector: Optional RobustFaceDetector; standard detection is the fallback
+        profile: Detector cascade profile (the event ID)
+        context: The photo already decoded (ImageContext)
+        dnn_prefetch: The photo's RobustFaceDetector.prefetch_dnn() result
+
+    Returns:
+        Dict with 'path', 'encodings', 'locations' ((top, right, bottom,
+        left) of each encoded face), 'method' ('robust_<algorithm>' or
+        'standard'), 'robust' (robust detection succeeded), per-face
+        'orientations', 'accessories' and 'quality_scores' (all None if the
+        analysis failed), 'error' (message if the photo could not be read)
+        and 'timings' (seconds per stage)
+    """
+    result = {
+        'path': image_path,
+        'encodings': [],
+        'locations': [],
+        'method': 'standard',
+        'robust': False,
+        'orientations': None,
+        'accessories': None,
+        'quality_scores': None,
+        'error': None,
+        'timings': {},
+    }
+    timer = StageTimer(result['timings'])
+    try:
+        face_encodings = []
+        # (top, right, bottom, left) of each encoded face, whichever path found it
+        face_locations = []
+        # Decoded once, shared by every stage below
+        if context is None:
+            context = ImageContext.from_file(image_path)
+            context.bgr
+            timer.lap('decode')
+
+        # Try ROBUST detection first
+        if detector is not None:
+            try:
+                # Use robust detection with preprocessing
+                face_detections, method = detector.detect_faces_robust(
+                    context,
+                    use_preprocessing=True,
+                    enhancement_level='medium',
+                    profile=profile,
+                    dnn_prefetch=dnn_prefetch
+                )
+                timer.lap('detect')
+
+                if face_detections:
+                    # Get encodings from detected faces (one batch, aligned
+                    # with the detections; None where a face failed)
+                    encoded = detector.get_face_encodings_from_detections(
+                        context,
+                        face_detections
+                    )
+                    face_locations = [box_to_location(d['box'], context.shape) for d, e in zip(face_detections, encoded)
+                                      if e is not None]
+                    face_encodings = [e for e in encoded if e is not None]
+                    timer.lap('encode')
+                    result['method'] = f'robust_{method}'
+                    result['robust'] = True
+                    print(f"--- [PROCESS] ROBUST detection ({method}): Found {len(face_encodings)} face(s)")
+            except Exception as e:
+                timer.lap('detect')
+                print(f"--- [PROCESS] Robust detection failed: {e}, falling back to standard ---")
+
+        # Fallback to standard detection if robust failed or not available
+        if not face_encodings:
+            # Detected once; the locations are carried through analysis
+            detected = face_recognition.face_locations(context.rgb)
+            timer.lap('detect')
+            encoded = encode_faces(context, detected)
+            face_locations = [loc for loc, e in zip(detected, encoded) if e is not None]
+            face_encodings = [e for e in encoded if e is not None]
+            timer.lap('encode')
+            result['method'] = 'standard'
+            print(f"--- [PROCESS] Standard detection: Found {len(face_encodings)} face(s)")
+
+        result['encodings'] = face_encodings
+        result['locations'] = face_locations
+        if not face_encodings:
+            return result
+    except Exception as e:
+        print(f"--- [PROCESS] ERROR processing {os.path.basename(image_path)}: {e}")
+        traceback.print_exc()
+        result['error'] = str(e)
+        return result
+
+    # Analyze photo for orientation and quality
+    try:
+        image_rgb = context.rgb
+
+        orientations = []
+        accessories = []
+        quality_scores = []
+        for face_location in face_locations:
+            # One landmark pass and one grayscale crop per face
+            analysis = analyze_face(image_rgb, face_location, gray=context.gray)
+            orientations.append(analysis['orientation'])
+            accessories.append(analysis['has_sunglasses'])
+            quality_scores.append(analysis['quality_score'])
+
+        result['orientations'] = orientations
+        result['accessories'] = accessories
+        result['quality_scores'] = quality_scores
+    except Exception as e:
+        print(f"--- [PROCESS] Error in face analysis: {e}, using basic matching ---")
+    timer.lap('analyze')
+    return result
+
+
+def analyze_photos(image_paths, detector=None, profile=None, batch_size=DNN_BATCH_SIZE):
+    """
+    analyze_photo() for a group of photos, DNN detection batched across them
+
+    The photos are decoded up front and the detector's DNN runs once on all
+    of their size-capped copies; each photo's cascade then starts from its
+    DNN result. Without a loaded DNN detector, in concurrent detection mode
+    or with batch_size 1 this is analyze_photo() per photo.
+
+    Returns:
+        analyze_photo() results in the order of image_paths; 'decode' and
+        'detect' timings include each photo's share of the batched work
+    """
+    image_paths = list(image_paths)
+    if (detector is None or batch_size <= 1 or len(image_paths) < 2 or DETECTION_CONCURRENT
+            or not detector.models_loaded.get('dnn')):
+        return [analyze_photo(image_path, detector, profile) for image_path in image_paths]
+
+    contexts = []
+    decode_seconds = []
+    for image_path in image_paths:
+        start = time.perf_counter()
+        try:
+            context = ImageContext.from_file(image_path)
+            context.bgr
+        except Exception:
+            # analyze_photo() tries again and reports the error
+            context = None
+        contexts.append(context)
+        decode_seconds.append(time.perf_counter() - start)
+
+    decoded = [context for context in contexts if context is not None]
+    prefetched = iter(detector.prefetch_dnn(decoded, batch_size=batch_size))
+
+    results = []
+    for i, image_path in enumerate(image_paths):
+        context, contexts[i] = contexts[i], None
+        if context is None:
+            results.append(analyze_photo(image_path, detector, profile))
+            continue
+        dnn_prefetch = next(prefetched)
+        result = analyze_photo(image_path, detector, profile, context=context, dnn_prefetch=dnn_prefetch)
+        result['timings']['decode'] = decode_seconds[i]
+        if dnn_prefetch is not None:
+            result['timings']['detect'] = result['timings'].get('detect', 0.0) + dnn_prefetch['seconds']
+        results.append(result)
+    return results
+
+
+def _groups(items, size):
+    size = max(int(size), 1)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def iter_photo_analyses(image_paths, detector=None, workers=PIPELINE_WORKERS,
+                        chunk_size=PIPELINE_CHUNK_SIZE, use_robust=True,
+                        profile=None, policy_path=None, batch_size=DNN_BATCH_SIZE):
+    """
+    Yield analyze_photo() results in the order of image_paths
+
+    With one worker the photos are analyzed in this process with the given
+    detector; otherwise a process pool is used and each worker loads its own
+    detector (when use_robust is set), starting from the cascade policy
+    saved at policy_path; their analyses carry a 'detector_trace' to merge
+    into the coordinator's policy. Photos are analyzed in groups of
+    batch_size (analyze_photos()), sharing a DNN forward pass.
+
+    Args:
+        image_paths: Photos to analyze
+        detector: Detector for in-process analysis
+        workers: Worker processes (1 = in-process, 0 = one per CPU core)
+        chunk_size: Photos handed to a worker at a time (rounded to whole
+                    groups of batch_size)
+        use_robust: Whether workers load a RobustFaceDetector
+        profile: Detector cascade profile (the event ID)
+        policy_path: Saved CascadePolicy for the workers (None = fixed order)
+        batch_size: Photos per batched DNN forward pass
+    """
+    image_paths = list(image_paths)
+    workers = min(resolve_workers(workers), len(image_paths))
+    if workers <= 1:
+        for group in _groups(image_paths, batch_size):
+            yield from analyze_photos(group, detector, profile, batch_size)
+        return
+
+    print(f"--- [PIPELINE] Analyzing {len(image_paths)} photos with {workers} worker processes "
+          f"(chunk size {chunk_size}) ---")
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(PIPELINE_START_METHOD),
+        initializer=_init_worker,
+        initargs=(use_robust, policy_path)
+    )
+    try:
+        # map() yields in submission order, whichever worker finishes first
+        groups = _groups(image_paths, batch_size)
+        for results in executor.map(_analyze_in_worker, groups, itertools.repeat(profile),
+                                    itertools.repeat(batch_size),
+                                    chunksize=max(int(chunk_size) // max(int(batch_size), 1), 1)):
+            yield from results
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ThroughputMeter:
+    """
+    Photos/sec reporting for a processing run
+
+    Usage:
+        meter = ThroughputMeter(total=len(photos))
+        for photo in photos:
+            ...
+            meter.tick()
+        meter.report()
+    """
+
+    def __init__(self, total=None, interval=PIPELINE_PROGRESS_INTERVAL):
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.started = time.perf_counter()
+
+    @property
+    def rate(self):
+        """Photos per second so far"""
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def tick(self, count=1):
+        """Count finished photos, reporting progress every `interval` photos"""
+        before = self.count
+        self.count += count
+        if self.interval and self.count // self.interval > before // self.interval:
+            self.report()
+
+    def report(self):
+        progress = f"{self.count}/{self.total}" if self.total is not None else f"{self.count}"
+        elapsed = time.perf_counter() - self.started
+        print(f"--- [PIPELINE] {progress} photos in {elapsed:.1f}s ({self.rate:.2f} photos/sec) ---")
@@ -22,10 +22,9 @@ import uuid
 from typing import Dict, List, Optional
 from datetime import datetime
 
-from enhanced_face_detector import EnhancedFaceDetector
-from deep_feature_extractor import DeepFeatureExtractor
 from multi_angle_database import MultiAngleFaceDatabase
 from enhanced_matching_engine import EnhancedMatchingEngine
+from model_registry import model_registry, save_enhanced_cascade_policy
 
 
 class PhotoProcessor:
@@ -33,12 +32,16 @@ class PhotoProcessor:
     Photo processor that orchestrates the complete face detection workflow
     """
     
-    def __init__(self, db_config: Optional[Dict] = None):
+    def __init__(self, db_config: Optional[Dict] = None,
+                 detector=None, extractor=None, database=None):
         """
         Initialize photo processor with all components
         
         Args:
             db_config: Optional database configuration
+            detector, extractor: Shared model instances (default: the
+                process-wide ones of model_registry)
+            database: Shared database connection (default: a new one)
         """
         print("=" * 70)
         print("INITIALIZING PHOTO PROCESSOR")
@@ -46,11 +49,13 @@ class PhotoProcessor:
         
         # Initialize all components
         print("\nLoading components...")
-        self.detector = EnhancedFaceDetector()
-        self.extractor = DeepFeatureExtractor()
+        self.detector = detector or model_registry.get('enhanced_detector')
+        self.extractor = extractor or model_registry.get('feature_extractor')
         
         # Initialize database
-        if db_config:
+        if database is not None:
+            self.database = database
+        elif db_config:
             self.database = MultiAngleFaceDatabase(**db_config)
         else:
             self.database = MultiAngleFaceDatabase()
@@ -113,7 +118,7 @@ class PhotoProcessor:
             
             # Step 3: Detect faces
             print("\n3. Detecting faces...")
-            detections = self.detector.detect_faces(image)
+            detections = self.detector.detect_faces(image, profile=event_id)
             result['faces_detected'] = len(detections)
             print(f"✓ Detected {len(detections)} face(s)")
             
@@ -257,7 +262,7 @@ class PhotoProcessor:
         )
         
         # Associate photo with person
-        is_group = len(self.detector.detect_faces(image)) > 1
+        is_group = len(self.detector.detect_faces(image, profile=event_id)) > 1
         self.database.associate_photo(
             person_id=person_id,
             photo_id=photo_id,
@@ -342,6 +347,7 @@ class PhotoProcessor:
                 print(f"\nProgress: {progress:.1f}% ({idx}/{len(photo_files)})")
             
             result['success'] = True
+            save_enhanced_cascade_policy()
             
             # Print summary
             print(f"\n{'=' * 70}")
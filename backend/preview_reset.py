@@ -61,12 +61,17 @@ def preview_reset():
         'multi_angle_model.pkl',
         'face_recognition_model.pkl',
         'known_faces.dat',
-        'multi_angle_faces.dat'
+        'multi_angle_faces.dat',
+        'known_faces.store',
+        'multi_angle_faces.store'
     ]
     
     found_models = []
     for model_file in model_files:
-        if os.path.exists(model_file):
+        if os.path.isdir(model_file):
+            size = sum(os.path.getsize(f) for f in glob.glob(os.path.join(model_file, '*')))
+            found_models.append(f"  • {model_file}/ ({size:,} bytes)")
+        elif os.path.exists(model_file):
             size = os.path.getsize(model_file)
             found_models.append(f"  • {model_file} ({size:,} bytes)")
     
@@ -0,0 +1,205 @@
+"""
+Per-Event Processing Manifest
+Indexed record of which uploads have been processed, replacing folder scans
+
+Each event keeps processed/<event_id>/processing_manifest.jsonl, an
+append-only file of JSON entries keyed by upload filename. An entry holds
+the upload's size, mtime and SHA-256 content hash plus the outcome: status,
+face count, person IDs and the detector used. The file is loaded into a
+dict, so "was this upload already processed?" is one lookup and one stat.
+The content hash is only recomputed when size or mtime changed, and an
+upload whose content really changed is processed again.
+
+Photos with no faces are recorded too, so they are not re-detected on every
+run. Failed photos are recorded with status 'error' and retried.
+
+The latest entry for a filename wins. The file is rewritten compactly once it
+holds more than twice as many lines as live entries; a torn last line from
+an interrupted append is truncated on load.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+MANIFEST_NAME = 'processing_manifest.jsonl'
+
+STATUS_PROCESSED = 'processed'
+STATUS_NO_FACES = 'no_faces'
+STATUS_ERROR = 'error'
+
+# Outcomes that are not retried while the upload is unchanged
+FINAL_STATUSES = (STATUS_PROCESSED, STATUS_NO_FACES)
+
+# Lines appended before compaction is considered
+COMPACT_MIN_LINES = 1000
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ProcessingManifest:
+    """
+    Processing outcomes of one event's uploads, keyed by filename
+
+    Usage:
+        manifest = ProcessingManifest(processed_event_dir)
+        if manifest.needs_processing(filename, upload_path):
+            ...
+            manifest.record(filename, upload_path, STATUS_PROCESSED, face_count=2,
+                            person_ids=['person_0001', 'person_0002'], method='robust_dnn')
+    """
+
+    def __init__(self, event_dir: str):
+        self.path = os.path.join(event_dir, MANIFEST_NAME)
+        self._entries: Dict[str, dict] = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        valid_end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError('torn line')
+                    entry = json.loads(line)
+                    filename = entry['filename']
+                except (ValueError, KeyError, TypeError):
+                    break  # torn tail of an interrupted append
+                valid_end += len(line)
+                self._lines += 1
+                if entry.get('forgotten'):
+                    self._entries.pop(filename, None)
+                else:
+                    self._entries[filename] = entry
+        if valid_end < os.path.getsize(self.path):
+            # Later appends must not be glued onto the torn line
+            with open(self.path, 'r+b') as f:
+                f.truncate(valid_end)
+
+    def exists(self) -> bool:
+        """Whether the manifest has been written for this event"""
+        return os.path.exists(self.path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, filename: str) -> Optional[dict]:
+        """Latest entry for an upload, or None"""
+        return self._entries.get(filename)
+
+    def needs_processing(self, filename: str, upload_path: str) -> bool:
+        """
+        Whether an upload is new, changed, or has no final outcome yet
+
+        Only hashes the upload when its size or mtime differ from the entry;
+        if the content is unchanged the entry's stat fields are refreshed.
+        """
+        entry = self._entries.get(filename)
+        if entry is None or entry.get('status') not in FINAL_STATUSES:
+            return True
+        stat = os.stat(upload_path)
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return False
+        if file_digest(upload_path) != entry.get('sha256'):
+            return True
+        self._append(dict(entry, size=stat.st_size, mtime_ns=stat.st_mtime_ns))
+        return False
+
+    def record(self, filename: str, upload_path: str, status: str, face_count: int = 0,
+               person_ids: Iterable[str] = (), method: Optional[str] = None, sha256: Optional[str] = None) -> dict:
+        """
+        Record the outcome of processing an upload
+
+        Args:
+            filename: Upload filename (the key)
+            upload_path: Path of the upload, for size, mtime and content hash
+            status: STATUS_PROCESSED, STATUS_NO_FACES or STATUS_ERROR
+            face_count: Faces detected in the photo
+            person_ids: Persons the photo was filed under
+            method: Detector that found the faces
+            sha256: Content hash if already known
+
+        Returns:
+            The recorded entry
+        """
+        stat = os.stat(upload_path)
+        entry = {
+            'filename': filename,
+            'sha256': sha256 or file_digest(upload_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'status': status,
+            'face_count': int(face_count),
+            'person_ids': sorted(person_ids),
+            'method': method,
+            'processed_at': datetime.now().isoformat(),
+        }
+        self._append(entry)
+        return entry
+
+    def forget(self, filename: str):
+        """Drop an upload's entry (e.g. when the photo is deleted)"""
+        if filename in self._entries:
+            self._append({'filename': filename, 'forgotten': True})
+
+    def bootstrap(self, upload_dir: str, filed: Dict[str, Dict[str, set]]) -> int:
+        """
+        Seed the manifest for an event processed before manifests existed
+
+        Args:
+            upload_dir: The event's upload folder
+            filed: filename -> {'individual': person IDs, 'group': person IDs}
+                   from one walk of the processed person folders
+
+        Returns:
+            Number of uploads recorded
+        """
+        count = 0
+        for filename, kinds in filed.items():
+            upload_path = os.path.join(upload_dir, filename)
+            if filename in self._entries or not os.path.exists(upload_path):
+                continue
+            person_ids = kinds['individual'] | kinds['group']
+            face_count = 1 if kinds['individual'] and not kinds['group'] else len(person_ids)
+            self.record(filename, upload_path, STATUS_PROCESSED, face_count=face_count,
+                        person_ids=person_ids, method='unknown')
+            count += 1
+        return count
+
+    def _append(self, entry: dict):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._lines += 1
+            if entry.get('forgotten'):
+                self._entries.pop(entry['filename'], None)
+            else:
+                self._entries[entry['filename']] = entry
+            if self._lines > max(COMPACT_MIN_LINES, 2 * len(self._entries)):
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the file with one line per live entry (caller holds the lock)"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(entry) + '\n')
+        os.replace(temp_path, self.path)
+        self._lines = len(self._entries)
@@ -0,0 +1,200 @@
+"""
+Per-Event Processing Job Queue
+Schedules process_images runs instead of starting a thread per trigger
+
+Every upload batch (and every event at startup) used to start its own
+process_images thread for the whole event, so repeated uploads raced over
+the same files and galleries. The queue instead:
+
+- Coalesces triggers: an event is queued at most once; a trigger while it
+  is running schedules exactly one follow-up run (to pick up new uploads)
+- Bounds concurrency: at most max_events events are processed at once
+- Prioritizes: fresh uploads (PRIORITY_UPLOAD) run before startup backfill
+  (PRIORITY_BACKFILL); a re-trigger can raise a queued event's priority
+- Cancels: pending runs are dropped and the running one is signalled via
+  its cancel Event, which the job checks between photos; work that must
+  wait for the run to stop (e.g. deleting the event's files) is handed to
+  cancel(on_stopped=...) instead of blocking the caller
+"""
+
+import heapq
+import itertools
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    from face_recognition_config import PROCESSING_MAX_EVENTS
+except ImportError:
+    PROCESSING_MAX_EVENTS = 2
+
+PRIORITY_UPLOAD = 0
+PRIORITY_BACKFILL = 10
+
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+
+
+class ProcessingQueue:
+    """
+    Priority job queue with one pending run per event
+
+    Usage:
+        queue = ProcessingQueue(lambda event_id, cancel: process_images(event_id, cancel), max_events=2)
+        queue.submit(event_id)                              # after an upload
+        queue.submit(event_id, priority=PRIORITY_BACKFILL)  # at startup
+        queue.cancel(event_id, on_stopped=delete_files)     # deleting the event
+    """
+
+    def __init__(self, run_event: Callable[[str, threading.Event], None], max_events: int = PROCESSING_MAX_EVENTS):
+        self._run_event = run_event
+        self._max_events = max(int(max_events), 1)
+        self._heap = []                       # (priority, sequence, event_id), stale entries skipped
+        self._queued: Dict[str, int] = {}     # event_id -> priority of its pending run
+        self._running: Dict[str, threading.Event] = {}  # event_id -> cancel flag
+        self._rerun: Dict[str, int] = {}      # running events triggered again -> priority
+        self._on_stopped: Dict[str, List[Callable[[], None]]] = {}  # running events -> callbacks
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._stopped = False
+
+    def submit(self, event_id: str, priority: int = PRIORITY_UPLOAD) -> bool:
+        """
+        Request a processing run for an event
+
+        Returns:
+            True if a new run was scheduled, False if the trigger was coalesced
+            into a run that is already pending
+        """
+        with self._condition:
+            if event_id in self._running:
+                scheduled = event_id not in self._rerun
+                self._rerun[event_id] = min(priority, self._rerun.get(event_id, priority))
+                return scheduled
+            if event_id in self._queued:
+                if priority < self._queued[event_id]:
+                    self._push(event_id, priority)  # the old heap entry goes stale
+                return False
+            self._push(event_id, priority)
+            self._start_workers()
+            self._condition.notify()
+            return True
+
+    def cancel(self, event_id: str, wait: bool = False, timeout: Optional[float] = None,
+               on_stopped: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Drop an event's pending run and signal its running one to stop
+
+        Args:
+            event_id: Event to cancel
+            wait: Block until the running job has returned
+            timeout: Maximum seconds to wait
+            on_stopped: Called once the event is not running: right away
+                        (in this thread) if it is not, otherwise by the
+                        worker thread when the job returns, before the event
+                        can run again
+
+        Returns:
+            True if the event is no longer running (on_stopped has run)
+        """
+        with self._condition:
+            self._queued.pop(event_id, None)
+            self._rerun.pop(event_id, None)
+            cancel = self._running.get(event_id)
+            if cancel is not None:
+                cancel.set()
+            if wait:
+                self._condition.wait_for(lambda: event_id not in self._running, timeout)
+            stopped = event_id not in self._running
+            if on_stopped is not None and not stopped:
+                self._on_stopped.setdefault(event_id, []).append(on_stopped)
+        if on_stopped is not None and stopped:
+            on_stopped()
+        return stopped
+
+    def state(self, event_id: str) -> Optional[str]:
+        """STATE_RUNNING, STATE_QUEUED or None"""
+        with self._condition:
+            if event_id in self._running:
+                return STATE_RUNNING
+            return STATE_QUEUED if event_id in self._queued else None
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until nothing is queued or running"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._queued and not self._running, timeout)
+
+    def shutdown(self, cancel_running: bool = True):
+        """Stop the worker threads after their current jobs"""
+        with self._condition:
+            self._stopped = True
+            self._queued.clear()
+            self._rerun.clear()
+            if cancel_running:
+                for cancel in self._running.values():
+                    cancel.set()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def _push(self, event_id, priority):
+        self._queued[event_id] = priority
+        heapq.heappush(self._heap, (priority, next(self._sequence), event_id))
+
+    def _start_workers(self):
+        """Start worker threads lazily (caller holds the lock)"""
+        while len(self._workers) < self._max_events:
+            worker = threading.Thread(target=self._work, name=f"event-processing-{len(self._workers)}",
+                                      daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_event(self):
+        """Pop the highest-priority live entry (caller holds the lock)"""
+        while self._heap:
+            priority, _, event_id = heapq.heappop(self._heap)
+            if self._queued.get(event_id) == priority:
+                del self._queued[event_id]
+                return event_id
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._stopped or self._queued)
+                if self._stopped:
+                    return
+                event_id = self._next_event()
+                if event_id is None:
+                    continue
+                cancel = threading.Event()
+                self._running[event_id] = cancel
+
+            try:
+                self._run_event(event_id, cancel)
+            except Exception as e:
+                print(f"--- [QUEUE] Processing run for {event_id} failed: {e} ---")
+            finally:
+                self._finish(event_id, cancel)
+
+    def _finish(self, event_id, cancel):
+        """
+        Run the event's on_stopped callbacks, then mark it not running. It
+        stays marked running until none are left, so no new run starts
+        before they finish and none registered meanwhile is lost.
+        """
+        while True:
+            with self._condition:
+                callbacks = self._on_stopped.pop(event_id, [])
+                if not callbacks:
+                    del self._running[event_id]
+                    rerun = self._rerun.pop(event_id, None)
+                    if rerun is not None and not cancel.is_set() and not self._stopped:
+                        self._push(event_id, rerun)
+                    self._condition.notify_all()
+                    return
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"--- [QUEUE] Cleanup after the run for {event_id} failed: {e} ---")
@@ -0,0 +1,172 @@
+"""
+Processing Status and Per-Stage Timings
+Progress of each event's processing run, for the status API
+
+The photo pipeline times its stages with time.perf_counter() and returns
+the timings with each photo's analysis (decode, detect, encode, analyze);
+the coordinator adds its own (match, file_io). Each photo's timings are
+folded into the run's totals once, under one short lock, when the
+coordinator finishes the photo, so the hot loop pays a few clock reads and
+additions per photo.
+
+Features:
+- Per-event run records: photo counts by outcome, start/finish times
+- Aggregated per-stage latency (total, mean, max)
+- Photos/sec and ETA for the running run
+- JSON-ready snapshots for /api/events/<event_id>/processing
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# Stages reported, in pipeline order
+STAGES = ('decode', 'detect', 'encode', 'analyze', 'match', 'file_io')
+
+RUN_RUNNING = 'running'
+RUN_DONE = 'done'
+RUN_CANCELLED = 'cancelled'
+RUN_FAILED = 'failed'
+
+
+class StageTimer:
+    """
+    Accumulates seconds per stage for one photo
+
+    Usage:
+        timer = StageTimer()
+        ...decode...
+        timer.lap('decode')
+        ...detect...
+        timer.lap('detect')
+    """
+
+    def __init__(self, timings: Optional[Dict[str, float]] = None):
+        self.timings = timings if timings is not None else {}
+        self._last = time.perf_counter()
+
+    def restart(self):
+        """Start timing the next stage from now (skips untimed work)"""
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Charge the time since the last lap to a stage"""
+        now = time.perf_counter()
+        self.timings[stage] = self.timings.get(stage, 0.0) + (now - self._last)
+        self._last = now
+
+
+class _Run:
+    """Counters of one processing run (guarded by the board's lock)"""
+
+    def __init__(self, total, already_processed, workers):
+        self.state = RUN_RUNNING
+        self.total = total
+        self.already_processed = already_processed
+        self.workers = workers
+        self.done = 0
+        self.outcomes = {}
+        self.stage_seconds = {stage: 0.0 for stage in STAGES}
+        self.stage_max = {stage: 0.0 for stage in STAGES}
+        self.stage_counts = {stage: 0 for stage in STAGES}
+        self.started = time.perf_counter()
+        self.finished = None
+        self.started_at = datetime.now().isoformat()
+        self.finished_at = None
+
+
+class ProcessingStatusBoard:
+    """
+    Latest processing run of every event
+
+    Usage:
+        board.start_run(event_id, total=len(pending), already_processed=skipped, workers=workers)
+        board.photo_done(event_id, 'processed', timings)
+        board.finish_run(event_id)
+        board.snapshot(event_id)
+    """
+
+    def __init__(self):
+        self._runs: Dict[str, _Run] = {}
+        self._lock = threading.Lock()
+
+    def start_run(self, event_id: str, total: int, already_processed: int = 0, workers: int = 1):
+        """Begin a run over `total` photos, replacing the event's previous run"""
+        with self._lock:
+            self._runs[event_id] = _Run(total, already_processed, workers)
+
+    def photo_done(self, event_id: str, outcome: str, timings: Optional[Dict[str, float]] = None):
+        """Count one finished photo and fold in its stage timings"""
+        with self._lock:
+            run = self._runs.get(event_id)
+            if run is None:
+                return
+            run.done += 1
+            run.outcomes[outcome] = run.outcomes.get(outcome, 0) + 1
+            for stage, seconds in (timings or {}).items():
+                if stage in run.stage_seconds:
+                    run.stage_seconds[stage] += seconds
+                    run.stage_counts[stage] += 1
+                    if seconds > run.stage_max[stage]:
+                        run.stage_max[stage] = seconds
+
+    def finish_run(self, event_id: str, state: str = RUN_DONE):
+        """Mark the event's run done, cancelled or failed"""
+        with self._lock:
+            run = self._runs.get(event_id)
+            if run is not None and run.finished is None:
+                run.state = state
+                run.finished = time.perf_counter()
+                run.finished_at = datetime.now().isoformat()
+
+    def forget(self, event_id: str):
+        with self._lock:
+            self._runs.pop(event_id, None)
+
+    def snapshot(self, event_id: str, chunk_size: int = 1) -> Optional[dict]:
+        """
+        JSON-ready status of the event's latest run, or None if it never ran
+
+        Args:
+            event_id: Event to report
+            chunk_size: Photos handed to a worker at a time, to estimate how
+                        many photos are in flight
+        """
+        with self._lock:
+            run = self._runs.get(event_id)
+            if run is None:
+                return None
+            end = run.finished if run.finished is not None else time.perf_counter()
+            elapsed = max(end - run.started, 0.0)
+            remaining = run.total - run.done
+            in_flight = min(remaining, run.workers * max(chunk_size, 1)) if run.state == RUN_RUNNING else 0
+            rate = run.done / elapsed if elapsed > 0 else 0.0
+            stages = {
+                stage: {
+                    'total_seconds': round(run.stage_seconds[stage], 3),
+                    'mean_ms': round(1000 * run.stage_seconds[stage] / run.stage_counts[stage], 2)
+                    if run.stage_counts[stage] else None,
+                    'max_ms': round(1000 * run.stage_max[stage], 2),
+                    'photos': run.stage_counts[stage],
+                }
+                for stage in STAGES
+            }
+            return {
+                'state': run.state,
+                'photos': {
+                    'total': run.total,
+                    'done': run.done,
+                    'in_flight': in_flight,
+                    'queued': remaining - in_flight if run.state == RUN_RUNNING else 0,
+                    'already_processed': run.already_processed,
+                    'outcomes': dict(run.outcomes),
+                },
+                'workers': run.workers,
+                'elapsed_seconds': round(elapsed, 1),
+                'photos_per_sec': round(rate, 2),
+                'eta_seconds': round(remaining / rate, 1) if run.state == RUN_RUNNING and rate > 0 else None,
+                'stages': stages,
+                'started_at': run.started_at,
+                'finished_at': run.finished_at,
+            }
@@ -7,21 +7,267 @@ Features:
 - Image preprocessing pipeline
 - Support for partially obscured faces
 - Pose-invariant detection
+- Accepts a decode-once ImageContext, sharing its colour conversions
+- Resolution-aware: detects on a size-capped copy, maps boxes back to full
+  resolution, and upsamples only when expected faces would be too small
+- Optional concurrent mode: all detectors at once on a thread pool (OpenCV
+  and dlib release the GIL), boxes fused by IoU with contributing detectors
+- Optional cost-aware cascade order: with a CascadePolicy, detectors run in
+  order of measured cost / hit rate per event, and ones that keep missing are
+  skipped
+- Batched DNN detection: one blobFromImages() forward pass for many images
+  (prefetch_dnn() for a group of photos ahead of their cascades)
+- Tiled DNN mode: when the 300x300 whole-frame pass finds nothing on a large
+  photo, overlapping tiles sized for the smallest expected face are detected
+  in one batched forward pass and merged with cross-tile NMS, so small faces
+  in group photos are found without escalating to slower detectors
+- Safe to share between threads: each detector model is used by one
+  thread at a time, different detectors still run at once
 """
 
 import cv2
 import numpy as np
-from typing import List, Tuple, Optional, Dict
+from typing import List, Tuple, Optional, Dict, Union
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from image_context import ImageContext
+from batch_encoding import box_to_location, encode_faces
+
+try:
+    from face_recognition_config import (
+        DETECTION_MAX_SIDE, DETECTION_MIN_FACE_FRACTION, DETECTOR_MIN_FACE_SIZE,
+        DETECTION_CONCURRENT, DETECTION_FUSION_IOU, DNN_BATCH_SIZE,
+        DETECTION_TILED, DETECTION_NMS_IOU
+    )
+except ImportError:
+    DETECTION_MAX_SIDE = 0
+    DETECTION_MIN_FACE_FRACTION = 0.025
+    DETECTOR_MIN_FACE_SIZE = {'haar': 30, 'hog': 80, 'mtcnn': 20, 'dnn': 20}
+    DETECTION_CONCURRENT = False
+    DETECTION_FUSION_IOU = 0.4
+    DNN_BATCH_SIZE = 1
+    DETECTION_TILED = True
+    DETECTION_NMS_IOU = 0.3
+
+# HOG never upsamples more than the original full-resolution detector did
+MAX_HOG_UPSAMPLE = 1
+
+# Input size, mean and confidence threshold of the res10 SSD face detector
+DNN_INPUT_SIZE = (300, 300)
+DNN_MEAN = (104.0, 177.0, 123.0)
+DNN_CONFIDENCE = 0.3
+
+# Boxes within this many pixels of a tile edge inside the image are cut
+# faces; the overlapping neighbour tile holds them whole
+TILE_EDGE_MARGIN = 2
+
+
+def detection_scale(shape, max_side: int = DETECTION_MAX_SIDE) -> float:
+    """
+    Factor that caps the longer side of an image at max_side (1.0 = no cap)
+
+    Detectors that cannot upsample (Haar, MTCNN) bound the factor from below:
+    the smallest expected face must stay at least their minimum face size.
+    """
+    longest = max(shape[:2])
+    if not max_side or longest <= max_side:
+        return 1.0
+    expected_face = DETECTION_MIN_FACE_FRACTION * min(shape[:2])
+    min_face = max(size for name, size in DETECTOR_MIN_FACE_SIZE.items() if name not in ('hog', 'dnn'))
+    return min(1.0, max(max_side / longest, min_face / expected_face))
+
+
+def hog_upsample_for(shape) -> int:
+    """
+    HOG upsampling needed for an image of this shape
+
+    Upsamples only while the smallest expected face (DETECTION_MIN_FACE_FRACTION
+    of the shorter side) is below HOG's minimum detectable face size.
+    """
+    expected_face = DETECTION_MIN_FACE_FRACTION * min(shape[:2])
+    upsample = 0
+    while expected_face * 2 ** upsample < DETECTOR_MIN_FACE_SIZE['hog'] and upsample < MAX_HOG_UPSAMPLE:
+        upsample += 1
+    return upsample
+
+
+def _tile_starts(length: int, side: int, stride: int) -> List[int]:
+    if length <= side:
+        return [0]
+    return list(range(0, length - side, stride)) + [length - side]
+
+
+def dnn_tiles(shape) -> List[Tuple[int, int, int, int]]:
+    """
+    Overlapping (x1, y1, x2, y2) tiles for DNN detection of small faces
+
+    A tile is sized so the smallest expected face (DETECTION_MIN_FACE_FRACTION
+    of the shorter side) reaches the DNN's minimum face size once the tile is
+    resized to the 300x300 input. Tiles overlap by the smallest face the
+    whole-frame pass finds, so every face it misses lies whole in some tile.
+
+    Returns:
+        The tiles, or [] when the whole frame is already fine enough
+    """
+    h, w = shape[:2]
+    expected_face = DETECTION_MIN_FACE_FRACTION * min(h, w)
+    side = max(int(DNN_INPUT_SIZE[0] * expected_face / DETECTOR_MIN_FACE_SIZE['dnn']), DNN_INPUT_SIZE[0])
+    if side >= max(h, w):
+        return []
+    whole_frame_face = int(np.ceil(DETECTOR_MIN_FACE_SIZE['dnn'] * max(h, w) / DNN_INPUT_SIZE[0]))
+    stride = side - min(side // 2, whole_frame_face)
+    tile_w, tile_h = min(side, w), min(side, h)
+    return [(x, y, x + tile_w, y + tile_h)
+            for y in _tile_starts(h, tile_h, stride)
+            for x in _tile_starts(w, tile_w, stride)]
+
+
+def box_iou(a, b) -> float:
+    """Intersection over union of two (x1, y1, x2, y2) boxes"""
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def fuse_detections(faces: List[Dict], iou_threshold: float = DETECTION_FUSION_IOU) -> List[Dict]:
+    """
+    Merge boxes of the same face (weighted box fusion)
+
+    Faces are taken by decreasing confidence; a box overlapping a kept face
+    by iou_threshold or more joins it. Each fused face has the confidence-
+    weighted mean box of its members, their highest confidence, the method
+    of the most confident member and 'detectors': every contributing method.
+    """
+    clusters = []
+    for face in sorted(faces, key=lambda f: f['confidence'], reverse=True):
+        for cluster in clusters:
+            if box_iou(cluster[0]['box'], face['box']) >= iou_threshold:
+                cluster.append(face)
+                break
+        else:
+            clusters.append([face])
+
+    fused = []
+    for cluster in clusters:
+        leader = cluster[0]
+        if len(cluster) == 1:
+            box = leader['box']
+        else:
+            weights = np.array([member['confidence'] for member in cluster], dtype=np.float64)
+            boxes = np.array([member['box'] for member in cluster], dtype=np.float64)
+            box = tuple(int(round(v)) for v in weights @ boxes / weights.sum())
+        face = dict(leader)
+        face['box'] = box
+        face['detectors'] = sorted({member['method'] for member in cluster})
+        fused.append(face)
+    return fused
+
+
+def parse_dnn_detections(rows: np.ndarray, shape, threshold: float = DNN_CONFIDENCE) -> List[Dict]:
+    """
+    Faces of one image from SSD detection rows
+
+    Args:
+        rows: (N, 7) rows [image_id, label, confidence, x1, y1, x2, y2] with
+              coordinates relative to the image
+        shape: Shape of the image the blob was made from
+        threshold: Minimum confidence
+    """
+    h, w = shape[:2]
+    faces = []
+    for row in rows[rows[:, 2] > threshold]:
+        (x1, y1, x2, y2) = (row[3:7] * np.array([w, h, w, h])).astype("int")
+
+        # Ensure coordinates are within image bounds
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+
+        # Skip invalid boxes
+        if x2 <= x1 or y2 <= y1:
+            continue
+
+        faces.append({
+            'box': (x1, y1, x2, y2),
+            'confidence': float(row[2]),
+            'method': 'dnn'
+        })
+    return faces
+
+
+def nms_detections(faces: List[Dict], iou_threshold: float = DETECTION_NMS_IOU) -> List[Dict]:
+    """Non-maximum suppression: the most confident of overlapping boxes wins"""
+    kept = []
+    for face in sorted(faces, key=lambda f: f.get('confidence', 0.0), reverse=True):
+        if all(box_iou(face['box'], other['box']) < iou_threshold for other in kept):
+            kept.append(face)
+    return kept
+
+
+def merge_tile_detections(tile_faces: List[List[Dict]], tiles, shape,
+                          iou_threshold: float = DETECTION_NMS_IOU) -> List[Dict]:
+    """
+    Faces of tiled detection in image coordinates
+
+    Boxes are offset by their tile, boxes cut by a tile edge inside the image
+    are dropped (the neighbour tile has the whole face), and faces found in
+    several overlapping tiles are merged by NMS.
+    """
+    h, w = shape[:2]
+    faces = []
+    for (tx1, ty1, tx2, ty2), found in zip(tiles, tile_faces):
+        for face in found:
+            x1, y1, x2, y2 = face['box']
+            if ((tx1 > 0 and x1 <= TILE_EDGE_MARGIN) or (ty1 > 0 and y1 <= TILE_EDGE_MARGIN) or
+                    (tx2 < w and x2 >= tx2 - tx1 - TILE_EDGE_MARGIN) or
+                    (ty2 < h and y2 >= ty2 - ty1 - TILE_EDGE_MARGIN)):
+                continue
+            face = dict(face)
+            face['box'] = (x1 + tx1, y1 + ty1, x2 + tx1, y2 + ty1)
+            faces.append(face)
+    return nms_detections(faces, iou_threshold)
+
+
+def scale_detections(faces: List[Dict], from_shape, to_shape) -> List[Dict]:
+    """Map detection boxes from an image of from_shape onto one of to_shape"""
+    if tuple(from_shape[:2]) == tuple(to_shape[:2]):
+        return faces
+    h, w = to_shape[:2]
+    scale_y = h / from_shape[0]
+    scale_x = w / from_shape[1]
+    scaled = []
+    for face in faces:
+        x1, y1, x2, y2 = face['box']
+        face = dict(face)
+        face['box'] = (
+            max(0, int(round(x1 * scale_x))), max(0, int(round(y1 * scale_y))),
+            min(w, int(round(x2 * scale_x))), min(h, int(round(y2 * scale_y)))
+        )
+        scaled.append(face)
+    return scaled
+
+# Detector inputs: a BGR array or a decode-once ImageContext
+ImageInput = Union[np.ndarray, ImageContext]
 
 class RobustFaceDetector:
     """
     Multi-algorithm face detector with preprocessing and fallback mechanisms
     """
     
-    def __init__(self):
-        """Initialize all face detection models"""
+    def __init__(self, cascade_policy=None):
+        """
+        Initialize all face detection models
+        
+        Args:
+            cascade_policy: Optional CascadePolicy ordering the detectors; the
+                            fixed Haar, HOG, DNN, MTCNN order without one
+        """
         self.models_loaded = {}
+        self.cascade_policy = cascade_policy
         self.detection_stats = {
             'mtcnn': 0,
             'dnn': 0,
@@ -29,6 +275,15 @@ class RobustFaceDetector:
             'hog': 0,
             'preprocessing_used': 0
         }
+        # Thread pool of the concurrent detection mode, created on first use
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        # The Haar cascades, dlib's HOG detector, MTCNN and the Caffe net (its
+        # input blob is network state) are not thread-safe: threads sharing
+        # this detector take turns on each model, while different models
+        # still run at once (concurrent mode, or requests at other steps)
+        self._model_locks = {name: threading.Lock() for name in ('mtcnn', 'dnn', 'haar', 'hog')}
+        self._stats_lock = threading.Lock()
         
         # Load models
         self._load_models()
@@ -45,13 +300,13 @@ class RobustFaceDetector:
             # steps_threshold: [P-Net, R-Net, O-Net] - lowered for better detection
             # scale_factor: Pyramid scale factor (0.709 is default)
             self.mtcnn_detector = MTCNN(
-                min_face_size=20,
+                min_face_size=DETECTOR_MIN_FACE_SIZE['mtcnn'],
                 steps_threshold=[0.6, 0.7, 0.7],
                 scale_factor=0.709
             )
             self.models_loaded['mtcnn'] = True
             print("--- [ROBUST DETECTOR] ✓ MTCNN loaded (primary) ---")
-            print("--- [ROBUST DETECTOR]   Config: min_face_size=20px, steps_threshold=[0.6, 0.7, 0.7] ---")
+            print(f"--- [ROBUST DETECTOR]   Config: min_face_size={DETECTOR_MIN_FACE_SIZE['mtcnn']}px, steps_threshold=[0.6, 0.7, 0.7] ---")
         except ImportError:
             self.models_loaded['mtcnn'] = False
             print("--- [ROBUST DETECTOR] ✗ MTCNN not available (install: pip install mtcnn tensorflow) ---")
@@ -103,21 +358,23 @@ class RobustFaceDetector:
         
         print(f"--- [ROBUST DETECTOR] Loaded {sum(self.models_loaded.values())}/4 detectors ---")
     
-    def preprocess_image(self, image: np.ndarray, enhancement_level: str = 'medium') -> List[np.ndarray]:
+    def preprocess_image(self, image: ImageInput, enhancement_level: str = 'medium') -> List[np.ndarray]:
         """
         Preprocess image with multiple enhancement techniques
         
         Args:
-            image: Input image (BGR format)
+            image: Input image (BGR format or ImageContext)
             enhancement_level: 'light', 'medium', 'heavy'
         
         Returns:
             List of preprocessed image variants
         """
+        context = ImageContext.wrap(image)
+        image = context.bgr
         variants = [image.copy()]  # Original
         
-        # Convert to grayscale for some operations
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # Grayscale for some operations
+        gray = context.gray
         
         # 1. Histogram Equalization (better contrast)
         if enhancement_level in ['medium', 'heavy']:
@@ -163,7 +420,7 @@ class RobustFaceDetector:
         
         return variants
     
-    def detect_faces_mtcnn(self, image: np.ndarray) -> List[Dict]:
+    def detect_faces_mtcnn(self, image: ImageInput) -> List[Dict]:
         """
         Detect faces using MTCNN (best for sunglasses/occlusions)
         
@@ -175,8 +432,9 @@ class RobustFaceDetector:
         
         try:
             # MTCNN expects RGB
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            detections = self.mtcnn_detector.detect_faces(rgb_image)
+            rgb_image = ImageContext.wrap(image).rgb
+            with self._model_locks['mtcnn']:
+                detections = self.mtcnn_detector.detect_faces(rgb_image)
             
             faces = []
             for detection in detections:
@@ -196,69 +454,127 @@ class RobustFaceDetector:
                     })
             
             if faces:
-                self.detection_stats['mtcnn'] += 1
+                self._count('mtcnn')
             
             return faces
         except Exception as e:
             print(f"--- [ROBUST DETECTOR] MTCNN error: {e} ---")
             return []
     
-    def detect_faces_dnn(self, image: np.ndarray) -> List[Dict]:
+    def detect_faces_dnn(self, image: ImageInput, tiled: bool = DETECTION_TILED) -> List[Dict]:
         """
         Detect faces using DNN (good for various lighting)
         
+        Args:
+            image: Input image (BGR format or ImageContext)
+            tiled: If the whole frame has no face, try overlapping tiles
+                   (large images only, see dnn_tiles)
+        
         Returns:
             List of face dictionaries with 'box' and 'confidence'
         """
+        faces = self.detect_faces_dnn_batch([image])[0]
+        if not faces and tiled:
+            faces = self.detect_faces_dnn_tiles(image)
+        return faces
+    
+    def detect_faces_dnn_batch(self, images: List[ImageInput], batch_size: int = DNN_BATCH_SIZE) -> List[List[Dict]]:
+        """
+        DNN detection for many images, batch_size images per forward pass
+        
+        Each image is resized to 300x300 and stacked into one NCHW blob;
+        detections are split back per image by their image index and scaled
+        to that image's size.
+        
+        Returns:
+            One list of face dictionaries per image (whole frames, no tiling)
+        """
+        results = self._dnn_forward(images, batch_size)
+        self._count('dnn', sum(1 for faces in results if faces))
+        return results
+    
+    def detect_faces_dnn_tiles(self, image: ImageInput) -> List[Dict]:
+        """
+        DNN detection on overlapping tiles of a large image
+        
+        All tiles go through one forward pass, which OpenCV spreads over its
+        threads; boxes are merged across tiles (merge_tile_detections).
+        
+        Returns:
+            Faces in image coordinates; [] if the image needs no tiling
+        """
         if not self.models_loaded.get('dnn'):
             return []
-        
-        try:
-            h, w = image.shape[:2]
-            
-            # Prepare blob
-            blob = cv2.dnn.blobFromImage(
-                cv2.resize(image, (300, 300)), 
-                1.0, 
-                (300, 300), 
-                (104.0, 177.0, 123.0)
-            )
-            
-            self.dnn_detector.setInput(blob)
-            detections = self.dnn_detector.forward()
-            
-            faces = []
-            for i in range(detections.shape[2]):
-                confidence = detections[0, 0, i, 2]
-                
-                # Lowered threshold from 0.5 to 0.3 for better detection
-                if confidence > 0.3:  # Confidence threshold
-                    box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                    (x1, y1, x2, y2) = box.astype("int")
-                    
-                    # Ensure coordinates are within image bounds
-                    x1, y1 = max(0, x1), max(0, y1)
-                    x2, y2 = min(w, x2), min(h, y2)
-                    
-                    # Skip invalid boxes
-                    if x2 <= x1 or y2 <= y1:
-                        continue
-                    
-                    faces.append({
-                        'box': (x1, y1, x2, y2),
-                        'confidence': float(confidence),
-                        'method': 'dnn'
-                    })
-            
-            if faces:
-                self.detection_stats['dnn'] += 1
-            
-            return faces
-        except Exception as e:
-            print(f"--- [ROBUST DETECTOR] DNN error: {e} ---")
+        image = ImageContext.wrap(image)
+        tiles = dnn_tiles(image.shape)
+        if not tiles:
             return []
+        bgr = image.bgr
+        crops = [bgr[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        faces = merge_tile_detections(self._dnn_forward(crops, len(crops)), tiles, image.shape)
+        if faces:
+            self._count('dnn')
+            print(f"--- [ROBUST DETECTOR] DNN found {len(faces)} face(s) in {len(tiles)} tiles ---")
+        return faces
+    
+    def _dnn_forward(self, images: List[ImageInput], batch_size: int) -> List[List[Dict]]:
+        """Batched forward passes; faces per image in its own coordinates"""
+        results = [[] for _ in images]
+        if not self.models_loaded.get('dnn') or not images:
+            return results
+        
+        batch_size = max(int(batch_size), 1)
+        for start in range(0, len(images), batch_size):
+            batch = [ImageContext.wrap(image).bgr for image in images[start:start + batch_size]]
+            try:
+                blob = cv2.dnn.blobFromImages(
+                    [cv2.resize(image, DNN_INPUT_SIZE) for image in batch],
+                    1.0,
+                    DNN_INPUT_SIZE,
+                    DNN_MEAN
+                )
+                with self._model_locks['dnn']:
+                    self.dnn_detector.setInput(blob)
+                    detections = self.dnn_detector.forward()
+                
+                # Rows of every image: [image_id, label, confidence, x1, y1, x2, y2]
+                rows = detections.reshape(-1, 7)
+                for i, image in enumerate(batch):
+                    results[start + i] = parse_dnn_detections(rows[rows[:, 0] == i], image.shape)
+            except Exception as e:
+                print(f"--- [ROBUST DETECTOR] DNN error: {e} ---")
+        return results
     
-    def detect_faces_haar(self, image: np.ndarray) -> List[Dict]:
+    def prefetch_dnn(
+        self,
+        images: List[ImageInput],
+        max_side: int = DETECTION_MAX_SIDE,
+        batch_size: int = DNN_BATCH_SIZE
+    ) -> List[Optional[Dict]]:
+        """
+        Batched DNN detection for a group of photos ahead of their cascades
+        
+        Runs on the same size-capped copies detect_faces_robust() uses; hand
+        each result to detect_faces_robust(..., dnn_prefetch=...).
+        
+        Returns:
+            Per image {'faces': DNN faces on its capped copy, 'seconds': its
+            share of the batch time}, or None for each image when the DNN
+            detector is not loaded
+        """
+        if not self.models_loaded.get('dnn') or not images:
+            return [None] * len(images)
+        
+        smalls = []
+        for image in images:
+            image = ImageContext.wrap(image)
+            smalls.append(image.scaled(detection_scale(image.shape, max_side)))
+        start = time.perf_counter()
+        faces = self.detect_faces_dnn_batch(smalls, batch_size)
+        seconds = (time.perf_counter() - start) / len(images)
+        return [{'faces': image_faces, 'seconds': seconds} for image_faces in faces]
+    
+    def detect_faces_haar(self, image: ImageInput) -> List[Dict]:
         """
         Detect faces using Haar Cascade (lightweight fallback)
         
@@ -269,25 +585,27 @@ class RobustFaceDetector:
             return []
         
         try:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Detect frontal faces
-            frontal_faces = self.haar_detector.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
+            gray = ImageContext.wrap(image).gray
+            haar_min = DETECTOR_MIN_FACE_SIZE['haar']
             
-            # Detect profile faces
-            profile_faces = self.haar_profile_detector.detectMultiScale(
-                gray,
-                scaleFactor=1.1,
-                minNeighbors=5,
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
+            with self._model_locks['haar']:
+                # Detect frontal faces
+                frontal_faces = self.haar_detector.detectMultiScale(
+                    gray,
+                    scaleFactor=1.1,
+                    minNeighbors=5,
+                    minSize=(haar_min, haar_min),
+                    flags=cv2.CASCADE_SCALE_IMAGE
+                )
+                
+                # Detect profile faces
+                profile_faces = self.haar_profile_detector.detectMultiScale(
+                    gray,
+                    scaleFactor=1.1,
+                    minNeighbors=5,
+                    minSize=(haar_min, haar_min),
+                    flags=cv2.CASCADE_SCALE_IMAGE
+                )
             
             faces = []
             
@@ -308,17 +626,23 @@ class RobustFaceDetector:
                 })
             
             if faces:
-                self.detection_stats['haar'] += 1
+                self._count('haar')
             
-            return faces
+            # A face found by both cascades is one face
+            return fuse_detections(faces)
         except Exception as e:
             print(f"--- [ROBUST DETECTOR] Haar error: {e} ---")
             return []
     
-    def detect_faces_hog(self, image: np.ndarray) -> List[Dict]:
+    def detect_faces_hog(self, image: ImageInput, upsample: int = 1) -> List[Dict]:
         """
         Detect faces using HOG (pose-invariant, good for sunglasses)
         
+        Args:
+            image: Input image (BGR format or ImageContext)
+            upsample: Times the image is doubled before detecting (each halves
+                      the smallest detectable face)
+        
         Returns:
             List of face dictionaries with 'box' and 'confidence'
         """
@@ -328,12 +652,11 @@ class RobustFaceDetector:
         try:
             import dlib
             
-            # Convert to RGB for dlib
-            rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            # RGB for dlib
+            rgb_image = ImageContext.wrap(image).rgb
             
-            # Detect faces with upsampling for better detection
-            # upsample=1 means we'll upsample the image once before detecting
-            dets = self.hog_detector(rgb_image, 1)
+            with self._model_locks['hog']:
+                dets = self.hog_detector(rgb_image, upsample)
             
             faces = []
             for det in dets:
@@ -344,7 +667,7 @@ class RobustFaceDetector:
                 })
             
             if faces:
-                self.detection_stats['hog'] += 1
+                self._count('hog')
                 print(f"--- [ROBUST DETECTOR] HOG detected {len(faces)} face(s) ---")
             
             return faces
@@ -354,9 +677,14 @@ class RobustFaceDetector:
     
     def detect_faces_robust(
         self, 
-        image: np.ndarray, 
+        image: ImageInput, 
         use_preprocessing: bool = True,
-        enhancement_level: str = 'medium'  # Changed to 'medium' for speed
+        enhancement_level: str = 'medium',  # Changed to 'medium' for speed
+        max_side: int = DETECTION_MAX_SIDE,
+        concurrent: bool = DETECTION_CONCURRENT,
+        profile: Optional[str] = None,
+        dnn_prefetch: Optional[Dict] = None,
+        tiled: bool = DETECTION_TILED
     ) -> Tuple[List[Dict], str]:
         """
         OPTIMIZED: Robust face detection with multiple algorithms
@@ -365,118 +693,188 @@ class RobustFaceDetector:
         CRITICAL FIX: Reduced preprocessing variants for speed
         
         Args:
-            image: Input image (BGR format)
+            image: Input image (BGR format or ImageContext)
             use_preprocessing: Whether to use image preprocessing
             enhancement_level: 'light', 'medium', 'heavy'
+            max_side: Detect on a copy with this longest side (0 = full
+                      resolution); boxes are returned in full-resolution
+                      coordinates either way
+            concurrent: Run all detectors at once and fuse their boxes
+                        (method 'fused') instead of stopping at the first hit
+            profile: Cascade policy profile (the event ID) whose statistics
+                     order the detectors and which records their outcomes
+            dnn_prefetch: This image's prefetch_dnn() result; the DNN step
+                          is already paid for, so it goes first and uses it
+                          (ignored in concurrent mode)
+            tiled: Let the DNN fall back to overlapping tiles when the
+                   whole frame has no face
         
         Returns:
             Tuple of (list of detected faces, detection method used)
         """
+        # Every detector shares the one set of colour conversions
+        image = ImageContext.wrap(image)
+        
+        # Detect on a size-capped copy; HOG upsamples it only if needed
+        small = image.scaled(detection_scale(image.shape, max_side))
+        hog_upsample = hog_upsample_for(small.shape) if max_side else 1
+        
         # Try each detection method in order of speed and reliability
         # CRITICAL: Try on original image first, then preprocess only if needed
         detection_methods = [
             ('haar', self.detect_faces_haar),    # Fastest, try first
-            ('hog', self.detect_faces_hog),      # Good for sunglasses
-            ('dnn', self.detect_faces_dnn),      # Good for lighting
+            ('hog', lambda img: self.detect_faces_hog(img, hog_upsample)),  # Good for sunglasses
+            ('dnn', lambda img: self.detect_faces_dnn(img, tiled)),  # Good for lighting; tiles find small faces
             ('mtcnn', self.detect_faces_mtcnn),  # Slowest, try last
         ]
         
+        if concurrent:
+            available = [func for name, func in detection_methods if self.models_loaded.get(name)]
+            return self._detect_concurrent(available, small, image, use_preprocessing)
+        
+        detect_funcs = {name: func for name, func in detection_methods if self.models_loaded.get(name)}
+        
+        order = self._cascade_order(profile, list(detect_funcs))
+        if dnn_prefetch is not None and 'dnn' in detect_funcs:
+            order = ['dnn'] + [name for name in order if name != 'dnn']
+        
         # PHASE 1: Try all methods on original image (fast)
-        for method_name, detect_func in detection_methods:
-            if not self.models_loaded.get(method_name):
-                continue
-            
-            faces = detect_func(image)
+        for method_name in order:
+            if method_name == 'dnn' and dnn_prefetch is not None:
+                # Whole frame prefetched; tiles only if it found nothing
+                start = time.perf_counter()
+                faces = dnn_prefetch['faces']
+                if not faces and tiled:
+                    faces = self.detect_faces_dnn_tiles(small)
+                seconds = dnn_prefetch['seconds'] + time.perf_counter() - start
+                self._record_attempt(profile, method_name, seconds, faces)
+            else:
+                faces = self._timed_detect(profile, method_name, detect_funcs[method_name], small)
             
             if faces:
                 print(f"--- [ROBUST DETECTOR] ✓ {method_name.upper()} found {len(faces)} face(s) ---")
-                return faces, method_name
+                return scale_detections(faces, small.shape, image.shape), method_name
         
         # PHASE 2: If no faces found, try with preprocessing (slower)
         if use_preprocessing:
             print("--- [ROBUST DETECTOR] No faces found, trying with preprocessing... ---")
-            self.detection_stats['preprocessing_used'] += 1
+            self._count('preprocessing_used')
             
-            # Create only 2-3 most effective variants (not 7!)
-            image_variants = [
-                image,  # Original
-                self._quick_enhance(image)  # Single enhanced version
-            ]
+            # Single enhanced version (the original was tried above)
+            enhanced = ImageContext.from_bgr(self._quick_enhance(small))
             
-            for method_name, detect_func in detection_methods:
-                if not self.models_loaded.get(method_name):
-                    continue
+            # The fallback never skips a detector, but is ordered by its own statistics
+            enhanced_names = self._cascade_order(profile, [f"{name}_enhanced" for name in detect_funcs], allow_skip=False)
+            for enhanced_name in enhanced_names:
+                method_name = enhanced_name[:-len('_enhanced')]
+                faces = self._timed_detect(profile, enhanced_name, detect_funcs[method_name], enhanced)
                 
-                for variant_idx, img_variant in enumerate(image_variants[1:], 1):  # Skip original (already tried)
-                    faces = detect_func(img_variant)
-                    
-                    if faces:
-                        print(f"--- [ROBUST DETECTOR] ✓ {method_name.upper()} found {len(faces)} face(s) with preprocessing ---")
-                        return faces, f"{method_name}_enhanced"
+                if faces:
+                    print(f"--- [ROBUST DETECTOR] ✓ {method_name.upper()} found {len(faces)} face(s) with preprocessing ---")
+                    return scale_detections(faces, small.shape, image.shape), enhanced_name
+        
+        print("--- [ROBUST DETECTOR] ✗ No faces detected by any method ---")
+        return [], 'none'
+    
+    def _count(self, stat: str, amount: int = 1):
+        """Add to a detection statistic (requests update them concurrently)"""
+        with self._stats_lock:
+            self.detection_stats[stat] += amount
+    
+    def _cascade_order(self, profile: Optional[str], names: List[str], allow_skip: bool = True) -> List[str]:
+        """Detector names in the cascade policy's order (as given without a policy)"""
+        if self.cascade_policy is None:
+            return names
+        return self.cascade_policy.order(profile, names, allow_skip=allow_skip)
+    
+    def _timed_detect(self, profile: Optional[str], name: str, detect_func, image: ImageContext) -> List[Dict]:
+        """Run one cascade step, recording its time and outcome with the policy"""
+        start = time.perf_counter()
+        faces = detect_func(image)
+        self._record_attempt(profile, name, time.perf_counter() - start, faces)
+        return faces
+    
+    def _record_attempt(self, profile: Optional[str], name: str, seconds: float, faces: List[Dict]):
+        if self.cascade_policy is not None:
+            self.cascade_policy.record(profile, name, seconds, bool(faces))
+    
+    def _detector_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='face-detector')
+            return self._pool
+    
+    def _run_concurrently(self, detect_funcs, image: ImageContext) -> List[Dict]:
+        """Run detectors in parallel on one image and fuse their boxes"""
+        pool = self._detector_pool()
+        futures = [pool.submit(detect_func, image) for detect_func in detect_funcs]
+        return fuse_detections([face for future in futures for face in future.result()])
+    
+    def _detect_concurrent(self, detect_funcs, small: ImageContext, image: ImageContext,
+                           use_preprocessing: bool) -> Tuple[List[Dict], str]:
+        """Concurrent mode of detect_faces_robust: every detector, fused boxes"""
+        faces = self._run_concurrently(detect_funcs, small)
+        if faces:
+            print(f"--- [ROBUST DETECTOR] ✓ FUSED {len(faces)} face(s) from {len(detect_funcs)} detectors ---")
+            return scale_detections(faces, small.shape, image.shape), 'fused'
+        
+        if use_preprocessing:
+            print("--- [ROBUST DETECTOR] No faces found, trying with preprocessing... ---")
+            self._count('preprocessing_used')
+            faces = self._run_concurrently(detect_funcs, ImageContext.from_bgr(self._quick_enhance(small)))
+            if faces:
+                print(f"--- [ROBUST DETECTOR] ✓ FUSED {len(faces)} face(s) with preprocessing ---")
+                return scale_detections(faces, small.shape, image.shape), 'fused_enhanced'
         
         print("--- [ROBUST DETECTOR] ✗ No faces detected by any method ---")
         return [], 'none'
     
-    def _quick_enhance(self, image: np.ndarray) -> np.ndarray:
+    def _quick_enhance(self, image: ImageInput) -> np.ndarray:
         """
         Quick single-pass enhancement for speed
         
         Returns:
-            Enhanced image
+            Enhanced image (BGR)
         """
+        context = ImageContext.wrap(image)
         try:
             # CLAHE for better contrast (most effective single enhancement)
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = context.gray
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
             enhanced_gray = clahe.apply(gray)
             enhanced = cv2.cvtColor(enhanced_gray, cv2.COLOR_GRAY2BGR)
             return enhanced
         except:
-            return image
+            return context.bgr
     
     def get_face_encodings_from_detections(
         self, 
-        image: np.ndarray, 
+        image: ImageInput, 
         face_detections: List[Dict]
-    ) -> List[np.ndarray]:
+    ) -> List[Optional[np.ndarray]]:
         """
         Extract face encodings from detected face regions
         
+        All faces are encoded in one batch (one RGB conversion, one
+        descriptor-network call).
+        
         Args:
-            image: Original image
+            image: Full-resolution image (BGR format or ImageContext); boxes
+                   from detect_faces_robust are already in its coordinates
             face_detections: List of face detection dictionaries
         
         Returns:
-            List of face encodings
+            List of face encodings aligned with face_detections; None for a
+            face that could not be encoded
         """
         try:
-            import face_recognition
-            
-            encodings = []
-            
-            for detection in face_detections:
-                x1, y1, x2, y2 = detection['box']
-                
-                # Ensure coordinates are within image bounds
-                h, w = image.shape[:2]
-                x1, y1 = max(0, x1), max(0, y1)
-                x2, y2 = min(w, x2), min(h, y2)
-                
-                # Convert box format for face_recognition
-                # face_recognition uses (top, right, bottom, left)
-                face_location = (y1, x2, y2, x1)
-                
-                # Get encoding
-                rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-                encoding = face_recognition.face_encodings(rgb_image, [face_location])
-                
-                if encoding:
-                    encodings.append(encoding[0])
-            
-            return encodings
+            context = ImageContext.wrap(image)
+            # Boxes clipped to the image, as this method always has
+            locations = [box_to_location(detection['box'], context.shape) for detection in face_detections]
+            return encode_faces(context, locations)
         except Exception as e:
             print(f"--- [ROBUST DETECTOR] Error getting encodings: {e} ---")
-            return []
+            return [None] * len(face_detections)
     
     def print_stats(self):
         """Print detection statistics"""
@@ -501,7 +899,9 @@ def detect_faces_robust(image_path: str, use_preprocessing: bool = True) -> Tupl
     Returns:
         Tuple of (list of face detections, method used)
     """
-    detector = RobustFaceDetector()
+    # The process-wide detector: models load once, not on every call
+    from model_registry import model_registry
+    detector = model_registry.get('robust_detector')
     image = cv2.imread(image_path)
     
     if image is None:
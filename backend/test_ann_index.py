@@ -0,0 +1,161 @@
+"""
+Test Approximate Nearest-Neighbour Encoding Index
+
+Covers incremental insert/delete, exact re-ranked distances, and the
+index-backed candidate paths of MultiAngleFaceModel and EnhancedMatchingEngine.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import multi_angle_face_model
+from ann_index import BruteForceEncodingIndex, IVFEncodingIndex, create_encoding_index
+from enhanced_matching_engine import EnhancedMatchingEngine
+from gallery_test_utils import InMemoryEncodingDatabase, gallery_from_faces
+
+
+def _face_like_gallery(rng, persons, per_person=3):
+    """Clustered encodings: ~0.9 between persons, ~0.3 within a person"""
+    mean = rng.normal(0, 0.08, 128)
+    bases = mean + rng.normal(0, 0.055, (persons, 128))
+    return np.repeat(bases, per_person, axis=0) + rng.normal(0, 0.02, (persons * per_person, 128))
+
+
+def _index_backends():
+    backends = [BruteForceEncodingIndex(), IVFEncodingIndex(min_train_size=256, n_probe=8)]
+    try:
+        backends.append(create_encoding_index('hnsw'))
+    except ImportError:
+        print("  (hnswlib not installed, skipping HNSW backend)")
+    return backends
+
+
+def test_index_insert_delete_and_exact_distances():
+    """Deleted keys never come back and returned distances are exact"""
+    print("=" * 70)
+    print("TEST: Index insert / delete / replace")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    data = _face_like_gallery(rng, 1000)
+
+    for index in _index_backends():
+        for key, vector in enumerate(data):
+            index.add(key, vector)
+        for key in range(0, 300):
+            index.remove(key)
+        # Replace a few keys with new vectors
+        for key in range(300, 310):
+            index.add(key, data[key] + 0.5)
+        assert len(index) == len(data) - 300
+
+        for query_key in range(500, 520):
+            query = data[query_key] + rng.normal(0, 0.01, 128)
+            keys, distances = index.search(query, k=5)
+            assert all(key >= 300 for key in keys)
+            assert list(distances) == sorted(distances)
+            expected = [np.linalg.norm(index._vectors[index._key_slots[key]] - query) for key in keys]
+            assert np.allclose(distances, expected, rtol=0, atol=1e-12)
+
+            keys, distances = index.range_search(query, 0.6)
+            assert query_key in keys
+            assert np.all(distances <= 0.6)
+
+        print(f"✓ {type(index).__name__}: deletes honoured, distances exact")
+
+
+def test_model_with_index_matches_brute_force():
+    """Recognition decisions with the index equal the exhaustive scan"""
+    print("=" * 70)
+    print("TEST: MultiAngleFaceModel with ANN index")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    data = _face_like_gallery(rng, 300)
+
+    original = (multi_angle_face_model.ANN_MIN_GALLERY_SIZE, multi_angle_face_model.ANN_INDEX_BACKEND)
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            model = gallery_from_faces(data_dir, {
+                f"person_{i + 1:04d}": dict(zip(('center', 'left', 'right'), data[3 * i:3 * i + 3]))
+                for i in range(300)
+            })
+            model.save_model = lambda: None  # keep the test in memory
+
+            queries = [data[3 * i] + rng.normal(0, 0.02, 128) for i in range(0, 300, 10)]
+            queries += [rng.normal(0, 0.1, 128) for _ in range(5)]
+            brute = [model.recognize_face_multi_angle(q, photo_orientation='center') for q in queries]
+
+            multi_angle_face_model.ANN_MIN_GALLERY_SIZE = 1
+            multi_angle_face_model.ANN_INDEX_BACKEND = 'brute'
+            indexed = [model.recognize_face_multi_angle(q, photo_orientation='center') for q in queries]
+            batch = model.recognize_faces_multi_angle_batch(queries, ['center'] * len(queries))
+            assert model._ann_index is not None
+
+            for expected, single, batched in zip(brute, indexed, batch):
+                assert single[0] == expected[0] and batched[0] == expected[0]
+                if expected[0]:
+                    assert single[3] == expected[3]
+
+            # Learning a new person updates the index incrementally
+            new_id = model.learn_face_multi_angle({'center': rng.normal(0, 0.1, 128)})
+            assert model._gallery_rows[new_id] * 3 in model._ann_index
+    finally:
+        multi_angle_face_model.ANN_MIN_GALLERY_SIZE, multi_angle_face_model.ANN_INDEX_BACKEND = original
+
+    print("✓ Index-backed recognition identical to exhaustive scan")
+
+
+def test_engine_with_index():
+    """match_face / find_similar_faces through the IVF index"""
+    print("=" * 70)
+    print("TEST: EnhancedMatchingEngine with ANN index")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    data = _face_like_gallery(rng, 500)
+    angles = ['frontal', 'left_45', 'right_45']
+    records = [{
+        'id': i + 1,
+        'person_id': i // 3 + 1,
+        'angle': angles[i % 3],
+        'quality_score': 0.8,
+        'encoding_array': vector
+    } for i, vector in enumerate(data)]
+
+    exact = EnhancedMatchingEngine(InMemoryEncodingDatabase(records), min_index_size=10 ** 9)
+    indexed = EnhancedMatchingEngine(InMemoryEncodingDatabase(records), index_backend='ivf', min_index_size=100)
+
+    agree = 0
+    queries = [data[i] + rng.normal(0, 0.02, 128) for i in range(0, 1500, 15)]
+    for query in queries:
+        expected = exact.match_face(query, 'frontal')
+        result = indexed.match_face(query, 'frontal')
+        if result['matched']:
+            # Anything the index reports is exact
+            assert np.isclose(result['distance'], expected['distance']) or result['distance'] > expected['distance']
+        agree += result['person_id'] == expected['person_id']
+
+        similar = indexed.find_similar_faces(query, top_k=3)
+        assert [m['distance'] for m in similar] == sorted(m['distance'] for m in similar)
+    assert indexed.encoding_index is not None
+    assert agree >= 0.95 * len(queries)
+
+    # A refreshed cache only pushes the difference into the index
+    records.append(dict(records[0], id=len(records) + 1))
+    indexed.encoding_cache = {}
+    indexed.match_face(queries[0])
+    assert len(indexed.encoding_index) == len(records)
+
+    print(f"✓ Index agreed with exhaustive scan on {agree}/{len(queries)} queries")
+
+
+if __name__ == '__main__':
+    test_index_insert_delete_and_exact_distances()
+    test_model_with_index_matches_brute_force()
+    test_engine_with_index()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,119 @@
+"""
+Test Batched Face Encoding
+
+All faces of one or several images go through the descriptor network in a
+single call, results stay aligned with the input locations (None for faces
+that cannot be encoded), and encodings equal face_recognition's per-face ones,
+also for boxes reaching past the image (locations are used unchanged).
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import batch_encoding
+from batch_encoding import encode_faces, encode_faces_across_images, box_to_location
+from image_context import ImageContext
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+class FakeModels:
+    """dlib / face_recognition.api stand-ins recording the calls made"""
+
+    def __init__(self):
+        self.descriptor_calls = []
+        self.aligned = []
+        self.face_encoder = self
+
+    def _css_to_rect(self, location):
+        return location
+
+    def pose_predictor_5_point(self, rgb, location):
+        if location[0] == 13:
+            raise RuntimeError("alignment failed")
+        self.aligned.append(location)
+        return location
+
+    def get_face_chip(self, rgb, shape, size, padding):
+        top, right, bottom, left = shape
+        return rgb[max(top, 0):bottom, max(left, 0):right].mean()
+
+    def compute_face_descriptor(self, chips, num_jitters):
+        self.descriptor_calls.append(len(chips))
+        return [np.full(128, chip) for chip in chips]
+
+
+def test_single_batch_aligned_results():
+    """One descriptor call for every face of every image, placeholders kept"""
+    print("=" * 70)
+    print("TEST: Batched encoding alignment")
+    print("=" * 70)
+
+    fake = FakeModels()
+    original = batch_encoding._dlib_api
+    batch_encoding._dlib_api = lambda: (fake, fake)
+    try:
+        first = np.full((100, 100, 3), 10, dtype=np.uint8)
+        second = ImageContext.from_rgb(np.full((100, 100, 3), 20, dtype=np.uint8))
+        results = encode_faces_across_images(
+            [first, second],
+            [[(0, 50, 50, 0), (13, 60, 40, 20)],  # ok, fails
+             [(-5, 120, 40, 60)]]                 # reaches past the image
+        )
+        assert fake.descriptor_calls == [2]
+        assert [r is None for r in results[0]] == [False, True]
+        assert results[0][0][0] == 10 and results[1][0][0] == 20
+        # Locations reach the aligner unchanged, as with face_encodings()
+        assert fake.aligned == [(0, 50, 50, 0), (-5, 120, 40, 60)]
+
+        assert encode_faces(first, []) == []
+        assert fake.descriptor_calls == [2]  # nothing to encode, no call
+    finally:
+        batch_encoding._dlib_api = original
+
+    assert box_to_location((40, 10, 90, 70)) == (10, 90, 70, 40)
+    assert box_to_location((-8, 10, 130, 70), (60, 120, 3)) == (10, 120, 60, 0)
+    print("✓ One batch, results aligned with locations")
+
+
+def test_same_encodings_as_face_recognition():
+    """Batched encodings equal per-face face_recognition.face_encodings()"""
+    print("=" * 70)
+    print("TEST: Batched encodings on upload photos")
+    print("=" * 70)
+
+    photos = sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))[:2]
+    if not photos or batch_encoding._dlib_api() is None:
+        print("  face_recognition models or sample uploads not available, skipping")
+        return
+
+    import face_recognition
+    images = [face_recognition.load_image_file(photo) for photo in photos]
+    locations = [face_recognition.face_locations(image) for image in images]
+    batched = encode_faces_across_images(images, locations)
+    faces = 0
+    for image, image_locations, encodings in zip(images, locations, batched):
+        assert len(encodings) == len(image_locations)
+        for location, encoding in zip(image_locations, encodings):
+            expected = face_recognition.face_encodings(image, [location])[0]
+            assert np.allclose(encoding, expected, atol=1e-6)
+            faces += 1
+
+    # A box reaching past the top-left corner, as detectors report for faces
+    # cut by the frame
+    h, w = images[0].shape[:2]
+    edge = (-h // 20, w // 3, h // 3, -w // 20)
+    expected = face_recognition.face_encodings(images[0], [edge])[0]
+    assert np.allclose(encode_faces(images[0], [edge])[0], expected, atol=1e-6)
+
+    print(f"✓ {faces} faces (and an edge box) encoded identically in one batch")
+
+
+if __name__ == '__main__':
+    test_single_batch_aligned_results()
+    test_same_encodings_as_face_recognition()
+    print("\nALL TESTS PASSED")
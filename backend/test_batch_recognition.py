@@ -0,0 +1,166 @@
+"""
+Test Batched Recognition
+
+Checks that the batched entry points (MultiAngleFaceModel.recognize_faces_multi_angle_batch
+and EnhancedMatchingEngine.batch_match) agree with their one-query-at-a-time counterparts.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from multi_angle_face_model import MultiAngleFaceModel
+from enhanced_matching_engine import EnhancedMatchingEngine
+from gallery_test_utils import InMemoryEncodingDatabase
+
+
+def test_model_batch_matches_single():
+    """Batch results must equal per-face results"""
+    print("=" * 70)
+    print("TEST: MultiAngleFaceModel batch vs single")
+    print("=" * 70)
+
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = MultiAngleFaceModel(data_file=os.path.join(data_dir, 'faces.dat'))
+        stored = []
+        for i in range(40):
+            encodings = {angle: rng.normal(0, 0.1, 128) for angle in ('center', 'left', 'right')}
+            if i % 5 == 0:
+                del encodings['right']
+            model.learn_face_multi_angle(encodings, {angle: 50.0 for angle in encodings})
+            stored.append(encodings['center'])
+
+        queries = np.array([stored[i] + rng.normal(0, 0.01, 128) for i in range(0, 40, 2)] +
+                           [rng.normal(0, 0.1, 128) for _ in range(10)])
+        orientations = (['center', 'left', 'right', 'angle_left', 'angle_right', 'unknown'] * 5)[:len(queries)]
+        accessories = [i % 3 == 0 for i in range(len(queries))]
+        qualities = [0.4 if i % 4 == 0 else 0.9 for i in range(len(queries))]
+
+        batch = model.recognize_faces_multi_angle_batch(queries, orientations, accessories, qualities)
+        assert len(batch) == len(queries)
+
+        for i, query in enumerate(queries):
+            single = model.recognize_face_multi_angle(
+                query,
+                photo_orientation=orientations[i],
+                has_accessories=accessories[i],
+                quality_score=qualities[i]
+            )
+            assert batch[i][0] == single[0]
+            assert batch[i][2] == single[2]
+            assert np.isclose(batch[i][1], single[1])
+            assert np.isclose(batch[i][3], single[3])
+            assert batch[i][4]['is_match'] == single[4]['is_match']
+            assert batch[i][4]['tolerance_used'] == single[4]['tolerance_used']
+
+    print("✓ Batch results identical to single-face recognition")
+
+
+def _near_ties(rng, count):
+    """
+    Queries with two stored encodings at the same exact distance, and one
+    right at the 0.3 (70% confidence) threshold; a shared offset makes the
+    matrix-product expansion lose precision as real encodings do
+    """
+    offset = np.full(128, 0.4)
+    queries, tied, edge = [], [], []
+    for _ in range(count):
+        query = offset + rng.normal(0, 0.1, 128)
+        step = rng.normal(0, 1, 128)
+        step *= 0.25 / np.linalg.norm(step)
+        unit = rng.normal(0, 1, 128)
+        unit /= np.linalg.norm(unit)
+        queries.append(query)
+        tied.extend([query + step, query - step])
+        edge.append(query + 0.3 * unit)
+    return np.array(queries), tied, edge
+
+
+def test_batch_matches_single_on_near_ties():
+    """float64 galleries: ties and threshold cases decide as the single-query path"""
+    print("=" * 70)
+    print("TEST: Batch vs single on near-ties (float64)")
+    print("=" * 70)
+
+    rng = np.random.default_rng(11)
+    queries, tied, edge = _near_ties(rng, 40)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = MultiAngleFaceModel(data_file=os.path.join(data_dir, 'faces.dat'), encoding_dtype='float64')
+        for encoding in tied + edge:
+            model.learn_face_multi_angle({'center': encoding}, {'center': 50.0})
+
+        batch = model.recognize_faces_multi_angle_batch(queries)
+        for query, result in zip(queries, batch):
+            single = model.recognize_face_multi_angle(query)
+            assert result[0] == single[0]
+            assert result[3] == single[3]
+            assert result[4]['is_match'] == single[4]['is_match']
+
+    records = [{'id': i + 1, 'person_id': i + 1, 'angle': 'frontal', 'quality_score': 0.8,
+                'encoding_array': encoding} for i, encoding in enumerate(tied + edge)]
+    engine = EnhancedMatchingEngine(InMemoryEncodingDatabase(records), threshold=0.3)
+    for query, result in zip(queries, engine.batch_match(queries)):
+        single = engine.match_face(query)
+        assert result['person_id'] == single['person_id']
+        assert result['distance'] == single['distance']
+        assert result['matched'] == single['matched']
+
+    print("✓ Ties and threshold cases decided identically")
+
+
+def test_model_batch_empty_gallery():
+    """An empty gallery returns one 'no match' tuple per query"""
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = MultiAngleFaceModel(data_file=os.path.join(data_dir, 'faces.dat'))
+        results = model.recognize_faces_multi_angle_batch(np.zeros((3, 128)))
+        assert results == [(None, 0.0, None, float('inf'), {})] * 3
+
+
+def test_engine_batch_matches_single():
+    """EnhancedMatchingEngine.batch_match must equal repeated match_face"""
+    print("=" * 70)
+    print("TEST: EnhancedMatchingEngine batch vs single")
+    print("=" * 70)
+
+    rng = np.random.default_rng(5)
+    angles = ['frontal', 'left_45', 'right_45']
+    records = []
+    for person_id in range(1, 31):
+        base = rng.normal(0, 0.1, 128)
+        for j, angle in enumerate(angles):
+            records.append({
+                'id': len(records) + 1,
+                'person_id': person_id,
+                'angle': angle,
+                'quality_score': 0.8,
+                'encoding_array': base + rng.normal(0, 0.02, 128)
+            })
+
+    engine = EnhancedMatchingEngine(InMemoryEncodingDatabase(records), threshold=0.6)
+
+    queries = [records[i]['encoding_array'] + rng.normal(0, 0.01, 128) for i in range(0, 90, 7)]
+    queries += [rng.normal(0, 0.1, 128) for _ in range(5)]
+    hints = [angles[i % 3] if i % 2 else None for i in range(len(queries))]
+
+    batch = engine.batch_match(np.array(queries), hints)
+    for query, hint, result in zip(queries, hints, batch):
+        single = engine.match_face(query, hint)
+        assert result['matched'] == single['matched']
+        assert result['person_id'] == single['person_id']
+        assert result.get('encoding_id') == single.get('encoding_id')
+        assert np.isclose(result['distance'], single['distance'])
+        assert np.isclose(result['confidence'], single['confidence'])
+
+    print("✓ Engine batch results identical to match_face")
+
+
+if __name__ == '__main__':
+    test_model_batch_matches_single()
+    test_batch_matches_single_on_near_ties()
+    test_model_batch_empty_gallery()
+    test_engine_batch_matches_single()
+    print("\nALL TESTS PASSED")
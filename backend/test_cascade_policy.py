@@ -0,0 +1,151 @@
+"""
+Test Cost-Aware Detector Cascade
+
+The cascade policy orders detectors by measured cost / hit rate per event,
+skips detectors that keep missing (except on exploration calls), survives a
+save/load round trip, and the robust detector follows and feeds it.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cascade_policy import CascadePolicy, GLOBAL_PROFILE
+from image_context import ImageContext
+from robust_face_detector import RobustFaceDetector
+
+DEFAULT_ORDER = ['haar', 'hog', 'dnn', 'mtcnn']
+
+
+def _train(policy, profile, name, seconds, hit_rate, attempts=50):
+    hits = int(round(attempts * hit_rate))
+    for i in range(attempts):
+        policy.record(profile, name, seconds, i < hits)
+
+
+def test_order_by_expected_cost():
+    """Cheap-but-missing detectors go behind slower ones that always hit"""
+    print("=" * 70)
+    print("TEST: Cascade order by cost / hit rate")
+    print("=" * 70)
+
+    policy = CascadePolicy(skip_min_attempts=1000)
+    assert policy.order('outdoor', DEFAULT_ORDER) == DEFAULT_ORDER  # nothing known
+
+    # Outdoor event: Haar is cheap but misses, MTCNN is slow but always wins
+    _train(policy, 'outdoor', 'haar', 0.05, 0.05)
+    _train(policy, 'outdoor', 'hog', 0.80, 0.50)
+    _train(policy, 'outdoor', 'mtcnn', 0.30, 1.0)
+    # DNN never measured: explored first, then ordered by its statistics
+    assert policy.order('outdoor', DEFAULT_ORDER) == ['dnn', 'mtcnn', 'haar', 'hog']
+    _train(policy, 'outdoor', 'dnn', 0.40, 0.30)
+    assert policy.order('outdoor', DEFAULT_ORDER) == ['mtcnn', 'haar', 'dnn', 'hog']
+
+    # Another event has no statistics of its own and uses the global ones
+    _train(policy, 'indoor', 'haar', 0.05, 1.0)
+    assert policy.order('indoor', DEFAULT_ORDER)[0] == 'haar'
+    assert policy.order('party', DEFAULT_ORDER) == policy.order(None, DEFAULT_ORDER)
+    assert policy.stats(GLOBAL_PROFILE)['haar']['attempts'] > policy.stats('indoor')['haar']['attempts']
+
+    policy.forget('outdoor')
+    assert policy.stats('outdoor') == {}
+    print("✓ Ordered by expected time to a detection, per event")
+
+
+def test_skip_and_explore():
+    """A detector that keeps missing is skipped, except every Nth call"""
+    print("=" * 70)
+    print("TEST: Skipping detectors that keep missing")
+    print("=" * 70)
+
+    policy = CascadePolicy(skip_hit_rate=0.05, skip_min_attempts=20, explore_interval=5)
+    _train(policy, 'event', 'haar', 0.01, 0.0)
+    _train(policy, 'event', 'hog', 0.50, 0.9)
+
+    orders = [policy.order('event', ['haar', 'hog']) for _ in range(10)]
+    assert orders.count(['hog']) == 8
+    # Explored in its cost order: cheap enough to go first when it runs
+    assert orders[4] == orders[9] == ['haar', 'hog']
+    # The enhanced fallback never skips, and never skips everything
+    assert policy.order('event', ['haar', 'hog'], allow_skip=False) == ['haar', 'hog']
+    assert policy.order('event', ['haar']) == ['haar']
+    print("✓ Skipped on 8 of 10 photos, explored on the rest")
+
+
+def test_persistence_and_worker_traces():
+    """Statistics survive save/load; worker traces merge into the coordinator"""
+    print("=" * 70)
+    print("TEST: Policy file and worker traces")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'cascade_policy.json')
+        policy = CascadePolicy.load(path)
+        _train(policy, 'event', 'mtcnn', 0.3, 1.0)
+        policy.save()
+
+        loaded = CascadePolicy.load(path)
+        assert loaded.stats('event') == policy.stats('event')
+
+        worker = CascadePolicy.load(path, keep_trace=True)
+        worker.record('event', 'haar', 0.02, False)
+        trace = worker.drain()
+        assert len(trace) == 1 and worker.drain() == []
+        loaded.merge(trace)
+        assert loaded.stats('event')['haar']['attempts'] == 1
+        assert policy.drain() == []  # no trace kept by default
+
+        with open(path, 'w') as f:
+            f.write('{not json')
+        assert CascadePolicy.load(path).stats() == {}
+    print("✓ Round trip and trace merge")
+
+
+def test_robust_detector_follows_policy():
+    """detect_faces_robust runs detectors in policy order and records them"""
+    print("=" * 70)
+    print("TEST: Robust detector with a cascade policy")
+    print("=" * 70)
+
+    policy = CascadePolicy(skip_min_attempts=1000)
+    _train(policy, 'outdoor', 'haar', 0.05, 0.0)
+    _train(policy, 'outdoor', 'hog', 0.10, 1.0)
+
+    detector = RobustFaceDetector(cascade_policy=policy)
+    detector.models_loaded = {'haar': True, 'hog': True, 'dnn': False, 'mtcnn': False}
+    calls = []
+
+    def fake_haar(image):
+        calls.append('haar')
+        return []
+
+    def fake_hog(image, upsample=1):
+        calls.append('hog')
+        return [{'box': (10, 10, 60, 60), 'confidence': 0.9, 'method': 'hog'}]
+
+    detector.detect_faces_haar = fake_haar
+    detector.detect_faces_hog = fake_hog
+    context = ImageContext.from_bgr(np.zeros((200, 200, 3), dtype=np.uint8))
+
+    attempts = policy.stats('outdoor')['hog']['attempts']
+    faces, method = detector.detect_faces_robust(context, profile='outdoor')
+    assert method == 'hog' and calls == ['hog']
+    assert policy.stats('outdoor')['hog']['attempts'] > attempts
+
+    # Without statistics the fixed order applies
+    policy.forget(GLOBAL_PROFILE)
+    calls.clear()
+    detector.detect_faces_robust(context, profile='another-event')
+    assert calls == ['haar', 'hog']
+    print("✓ Policy order followed, attempts recorded")
+
+
+if __name__ == '__main__':
+    test_order_by_expected_cost()
+    test_skip_and_explore()
+    test_persistence_and_worker_traces()
+    test_robust_detector_follows_policy()
+    print("\nALL TESTS PASSED")
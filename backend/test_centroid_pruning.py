@@ -0,0 +1,110 @@
+"""
+Test Centroid/Radius Pruning
+
+Per-person centroids and covering radii must give exactly the results of
+the unpruned scan (same person, same distances) for every orientation,
+stay valid as persons are learned and updated, and skip most persons.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import multi_angle_face_model
+from multi_angle_face_model import MultiAngleFaceModel, GALLERY_ANGLES
+from gallery_test_utils import clustered_faces, gallery_from_faces
+
+ORIENTATIONS = ['center', 'left', 'right', 'angle_left', 'angle_right', 'unknown', None]
+
+
+def _unpruned(call):
+    original = multi_angle_face_model.CENTROID_PRUNING_MIN_PERSONS
+    multi_angle_face_model.CENTROID_PRUNING_MIN_PERSONS = float('inf')
+    try:
+        return call()
+    finally:
+        multi_angle_face_model.CENTROID_PRUNING_MIN_PERSONS = original
+
+
+def test_bounds_are_valid_and_maintained():
+    """Every stored angle lies within radius of its person's centroid"""
+    print("=" * 70)
+    print("TEST: Centroids and radii")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = gallery_from_faces(data_dir, clustered_faces(rng, 50)[1])
+        new_id = model.learn_face_multi_angle({'center': rng.normal(0, 0.12, 128)})
+        model.learn_face_multi_angle({'center': model.known_faces[new_id]['encodings']['center'],
+                                      'left': rng.normal(0, 0.12, 128)}, {'left': 90.0})
+
+        for person_id, row in model._gallery_rows.items():
+            encodings = [model.known_faces[person_id]['encodings'][angle]
+                         for angle in GALLERY_ANGLES if angle in model.known_faces[person_id]['encodings']]
+            centroid = np.mean(encodings, axis=0)
+            assert np.allclose(model._centroids[row], centroid)
+            spread = max(np.linalg.norm(encoding - centroid) for encoding in encodings)
+            assert np.isclose(model._radii[row], spread)
+
+        # Reloading from the store recomputes the same bounds
+        model.save_model()
+        reloaded = MultiAngleFaceModel(data_file=model.data_file)
+        count = len(model._gallery_ids)
+        assert np.allclose(reloaded._centroids[:count], model._centroids[:count])
+        assert np.allclose(reloaded._radii[:count], model._radii[:count])
+
+    print("✓ Bounds cover every angle, updated on learn and reload")
+
+
+def test_pruned_recognition_is_exact():
+    """Pruned and unpruned scans agree on person, distances and decisions"""
+    print("=" * 70)
+    print("TEST: Pruned recognition vs full scan")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as data_dir:
+        identities, faces = clustered_faces(rng, 2000)
+        model = gallery_from_faces(data_dir, faces)
+
+        queries = [identities[i * 37] + rng.normal(0, 0.03, 128) for i in range(20)]
+        queries += [rng.normal(0, 0.12, 128) for _ in range(10)]
+        kept = []
+        for query in queries:
+            for orientation in ORIENTATIONS:
+                pruned = model.recognize_face_multi_angle(query, photo_orientation=orientation)
+                full = _unpruned(lambda: model.recognize_face_multi_angle(query, photo_orientation=orientation))
+                assert pruned[:4] == full[:4]
+                assert pruned[4] == full[4]
+                kept.append(len(model._prune_rows(query, None, orientation)))
+
+            assert model._find_existing_person(query) == _unpruned(lambda: model._find_existing_person(query))
+
+        batch = model.recognize_faces_multi_angle_batch(queries, photo_orientations=['center'] * len(queries))
+        full_batch = _unpruned(lambda: model.recognize_faces_multi_angle_batch(
+            queries, photo_orientations=['center'] * len(queries)))
+        assert [result[:4] for result in batch] == [result[:4] for result in full_batch]
+
+        # Report the pruning rate and speedup on the unknown-orientation path
+        start = time.perf_counter()
+        for query in queries:
+            model.recognize_face_multi_angle(query)
+        pruned_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        _unpruned(lambda: [model.recognize_face_multi_angle(query) for query in queries])
+        full_seconds = time.perf_counter() - start
+
+    print(f"  2000 persons: {np.mean(kept):.0f} scored on average, "
+          f"{pruned_seconds * 1000 / len(queries):.2f} ms vs {full_seconds * 1000 / len(queries):.2f} ms per query")
+    print("✓ Pruning is exact")
+
+
+if __name__ == '__main__':
+    test_bounds_are_valid_and_maintained()
+    test_pruned_recognition_is_exact()
+    print("\nALL TESTS PASSED")
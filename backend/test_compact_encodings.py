@@ -0,0 +1,135 @@
+"""
+Test Compact Encoding Representations
+
+Covers the int8 quantizer's distance bounds, float32 galleries (memory,
+decisions vs float64, store conversion), the int8 pre-scan returning exactly
+what the float32 scan returns, and the compact matching-engine cache.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from compact_encodings import Int8Quantizer, resolve_dtype
+from multi_angle_face_model import MultiAngleFaceModel
+from enhanced_matching_engine import EnhancedMatchingEngine
+from gallery_test_utils import InMemoryEncodingDatabase, clustered_faces, gallery_from_faces
+
+ORIENTATIONS = ['center', 'left', 'right', 'angle_left', 'unknown', None]
+
+
+def test_int8_bounds_contain_exact_distances():
+    """Every exact distance lies inside its quantized [lower, upper] interval"""
+    print("=" * 70)
+    print("TEST: Int8 quantizer bounds")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    quantizer = Int8Quantizer()
+    vectors = rng.normal(0, 0.12, (500, 3, 128))
+    vectors[0, 0, 0] = 2.0  # clipped component: the error bound must absorb it
+    codes, norms, errors = quantizer.encode(vectors)
+    assert codes.dtype == np.int8 and codes.shape == vectors.shape
+
+    for _ in range(20):
+        query = rng.normal(0, 0.12, 128)
+        lower, upper = quantizer.distance_bounds(query, codes, norms, errors)
+        exact = np.linalg.norm(vectors - query, axis=-1)
+        assert np.all(lower <= exact) and np.all(exact <= upper)
+    print(f"  mean interval width {np.mean(upper - lower):.4f}")
+
+    assert resolve_dtype('float32') == np.float32
+    print("✓ Quantized intervals always contain the exact distance")
+
+
+def test_float32_gallery_and_int8_prescan():
+    """float32 halves the gallery, keeps decisions; int8 pre-scan is exact"""
+    print("=" * 70)
+    print("TEST: Compact galleries")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    identities, faces = clustered_faces(rng, 2000)
+    with tempfile.TemporaryDirectory() as data_dir:
+        full = gallery_from_faces(data_dir, faces, 'full.dat', encoding_dtype='float64')
+        compact = gallery_from_faces(data_dir, faces, 'compact.dat')
+        quantized = gallery_from_faces(data_dir, faces, 'quantized.dat', quantized_scan='int8')
+        assert compact._gallery.dtype == np.float32
+        assert compact._gallery.nbytes * 2 == full._gallery.nbytes
+
+        queries = [identities[i * 53] + rng.normal(0, 0.03, 128) for i in range(20)]
+        queries += [rng.normal(0, 0.12, 128) for _ in range(10)]
+        for query in queries:
+            for orientation in ORIENTATIONS:
+                expected = full.recognize_face_multi_angle(query, photo_orientation=orientation)
+                got = compact.recognize_face_multi_angle(query, photo_orientation=orientation)
+                assert got[0] == expected[0] and got[4]['person_id'] == expected[4]['person_id']
+                assert abs(got[3] - expected[3]) < 1e-6
+                # The int8 pre-scan only drops persons that cannot win
+                assert quantized.recognize_face_multi_angle(query, photo_orientation=orientation)[:4] == got[:4]
+            assert quantized._find_existing_person(query) == compact._find_existing_person(query)
+
+        batch = compact.recognize_faces_multi_angle_batch(queries, photo_orientations=['center'] * len(queries))
+        for query, result in zip(queries, batch):
+            assert result[:4] == compact.recognize_face_multi_angle(query, photo_orientation='center')[:4]
+
+        start = time.perf_counter()
+        for query in queries:
+            quantized.recognize_face_multi_angle(query)
+        quantized_ms = (time.perf_counter() - start) * 1000 / len(queries)
+        print(f"  gallery: float64 {full._gallery.nbytes >> 10} KiB, float32 {compact._gallery.nbytes >> 10} KiB, "
+              f"int8 codes {quantized._codes.nbytes >> 10} KiB; int8 pre-scan {quantized_ms:.2f} ms/query")
+
+        # A float64 store is converted once on load and rewritten compactly
+        full.save_model()
+        converted = MultiAngleFaceModel(data_file=full.data_file)
+        assert converted._gallery.dtype == np.float32
+        assert MultiAngleFaceModel(data_file=full.data_file).store.load()[0]['gallery'].dtype == np.float32
+
+    print("✓ float32 decisions match float64; int8 pre-scan is exact")
+
+
+def test_engine_compact_cache():
+    """Engine cache holds one float32 matrix, records share its rows"""
+    print("=" * 70)
+    print("TEST: Compact matching-engine cache")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    records = []
+    for person_id in range(1, 41):
+        base = rng.normal(0, 0.1, 128)
+        for angle in ('frontal', 'left_45', 'right_45'):
+            encoding = base + rng.normal(0, 0.02, 128)
+            records.append({'id': len(records) + 1, 'person_id': person_id, 'angle': angle, 'quality_score': 0.8,
+                            'encoding_vector': encoding.tobytes(), 'encoding_array': encoding})
+    originals = [record['encoding_array'] for record in records]
+
+    compact = EnhancedMatchingEngine(InMemoryEncodingDatabase([dict(r) for r in records]))
+    full = EnhancedMatchingEngine(InMemoryEncodingDatabase([dict(r) for r in records]), encoding_dtype='float64')
+
+    queries = [originals[i] + rng.normal(0, 0.01, 128) for i in range(0, 120, 9)]
+    for query, result in zip(queries, compact.batch_match(np.array(queries), ['frontal'] * len(queries))):
+        expected = full.match_face(query, 'frontal')
+        assert result['person_id'] == expected['person_id']
+        assert abs(result['distance'] - expected['distance']) < 1e-6
+        assert result['distance'] == compact.match_face(query, 'frontal')['distance']
+
+    matrix, _ = compact._get_cached_matrix()
+    assert matrix.dtype == np.float32
+    cached = compact._get_cached_encodings()
+    assert all('encoding_vector' not in enc for enc in cached)
+    assert all(enc['encoding_array'].base is matrix for enc in cached)
+
+    print("✓ Engine cache compact, batch re-scored at full precision")
+
+
+if __name__ == '__main__':
+    test_int8_bounds_contain_exact_distances()
+    test_float32_gallery_and_int8_prescan()
+    test_engine_compact_cache()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,136 @@
+"""
+Test Concurrent Detection and Box Fusion
+
+Overlapping boxes of one face are fused with their contributing detectors,
+Haar no longer reports a face twice (frontal + profile), and the concurrent
+mode runs the detectors at once: wall time near the slowest, not the sum.
+Request threads sharing one detector take turns on each detector model.
+"""
+
+import numpy as np
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_context import ImageContext
+from robust_face_detector import RobustFaceDetector, fuse_detections
+
+
+def test_fuse_detections():
+    """One fused face per cluster, confidence-weighted box, all detectors"""
+    print("=" * 70)
+    print("TEST: Box fusion")
+    print("=" * 70)
+
+    faces = [
+        {'box': (100, 100, 200, 200), 'confidence': 0.8, 'method': 'haar_frontal'},
+        {'box': (110, 104, 210, 204), 'confidence': 0.7, 'method': 'haar_profile'},
+        {'box': (104, 98, 196, 206), 'confidence': 0.9, 'method': 'hog'},
+        {'box': (400, 100, 480, 180), 'confidence': 0.7, 'method': 'haar_profile'},
+    ]
+    fused = fuse_detections(faces)
+    assert len(fused) == 2
+    face, other = fused
+    assert face['method'] == 'hog' and face['confidence'] == 0.9
+    assert face['detectors'] == ['haar_frontal', 'haar_profile', 'hog']
+    expected = np.average([f['box'] for f in faces[:3]], axis=0, weights=[0.8, 0.7, 0.9])
+    assert np.allclose(face['box'], expected, atol=0.5)
+    assert other['box'] == (400, 100, 480, 180) and other['detectors'] == ['haar_profile']
+    assert fuse_detections([]) == []
+    print("✓ Duplicates fused, separate faces kept")
+
+
+def test_concurrent_detectors():
+    """All detectors run at once; latency close to the slowest one"""
+    print("=" * 70)
+    print("TEST: Concurrent detection")
+    print("=" * 70)
+
+    detector = RobustFaceDetector()
+    detector.models_loaded = {'haar': True, 'hog': True, 'dnn': True, 'mtcnn': False}
+
+    def slow_detector(method, box, delay):
+        def detect(image, *args):
+            time.sleep(delay)  # stands in for OpenCV/dlib work that releases the GIL
+            return [{'box': box, 'confidence': 0.8, 'method': method}]
+        return detect
+
+    detector.detect_faces_haar = slow_detector('haar_frontal', (10, 10, 60, 60), 0.2)
+    detector.detect_faces_hog = slow_detector('hog', (12, 8, 62, 58), 0.3)
+    detector.detect_faces_dnn = slow_detector('dnn', (200, 10, 250, 60), 0.2)
+
+    context = ImageContext.from_bgr(np.zeros((300, 400, 3), dtype=np.uint8))
+    start = time.perf_counter()
+    faces, method = detector.detect_faces_robust(context, concurrent=True)
+    elapsed = time.perf_counter() - start
+    print(f"  3 detectors (0.2 + 0.3 + 0.2 s) in {elapsed:.2f} s")
+
+    assert method == 'fused' and elapsed < 0.6
+    assert sorted(tuple(f['detectors']) for f in faces) == [('dnn',), ('haar_frontal', 'hog')]
+
+    # The cascade still stops at the first detector that finds a face
+    faces, method = detector.detect_faces_robust(context)
+    assert method == 'haar' and len(faces) == 1
+    print("✓ Detectors ran concurrently, one clean detection list")
+
+
+class Rect:
+    def left(self): return 10
+    def top(self): return 10
+    def right(self): return 60
+    def bottom(self): return 60
+
+
+class TrackedHog:
+    """dlib HOG detector stand-in recording how many threads are inside it"""
+
+    def __init__(self):
+        self.inside = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, rgb, upsample):
+        with self.lock:
+            self.inside += 1
+            self.peak = max(self.peak, self.inside)
+        time.sleep(0.005)
+        with self.lock:
+            self.inside -= 1
+        return [Rect()]
+
+
+def test_shared_between_threads():
+    """One detector shared by request threads: one thread per model, exact statistics"""
+    print("=" * 70)
+    print("TEST: Detector shared between threads")
+    print("=" * 70)
+
+    detector = RobustFaceDetector()
+    detector.models_loaded = {'haar': False, 'hog': True, 'dnn': False, 'mtcnn': False}
+    detector.hog_detector = hog = TrackedHog()
+    detector.detection_stats['hog'] = 0
+
+    context = ImageContext.from_bgr(np.zeros((300, 400, 3), dtype=np.uint8))
+    threads = [
+        threading.Thread(target=lambda: [detector.detect_faces_robust(context) for _ in range(5)])
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(f"  40 detections from 8 threads, at most {hog.peak} inside the HOG detector")
+    assert hog.peak == 1
+    assert detector.detection_stats['hog'] == 40
+    print("✓ HOG detector used by one thread at a time, every detection counted")
+
+
+if __name__ == '__main__':
+    test_fuse_detections()
+    test_concurrent_detectors()
+    test_shared_between_threads()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,122 @@
+"""
+Test Batched DNN Detection
+
+Several images share one blobFromImages() forward pass, detections come back
+per image in that image's coordinates, and a prefetched DNN result starts the
+robust cascade without another forward pass.
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from cascade_policy import CascadePolicy
+from image_context import ImageContext
+from robust_face_detector import RobustFaceDetector
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+class FakeNet:
+    """SSD stand-in: one face per image in the middle, one low-confidence box"""
+
+    def __init__(self):
+        self.batches = []
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        n = self.blob.shape[0]
+        self.batches.append(n)
+        rows = []
+        for i in range(n):
+            rows.append([i, 1, 0.9, 0.25, 0.25, 0.75, 0.75])
+            rows.append([i, 1, 0.1, 0.0, 0.0, 0.5, 0.5])
+        return np.array(rows, dtype=np.float32).reshape(1, 1, -1, 7)
+
+
+def _detector():
+    detector = RobustFaceDetector()
+    detector.models_loaded = {'haar': True, 'hog': False, 'dnn': True, 'mtcnn': False}
+    detector.dnn_detector = FakeNet()
+    return detector
+
+
+def test_batches_split_per_image():
+    """One forward pass per batch; boxes scaled to each image's own size"""
+    print("=" * 70)
+    print("TEST: Batched DNN detection")
+    print("=" * 70)
+
+    detector = _detector()
+    images = [np.zeros((100 * (i + 1), 200, 3), dtype=np.uint8) for i in range(5)]
+    results = detector.detect_faces_dnn_batch(images, batch_size=3)
+
+    assert detector.dnn_detector.batches == [3, 2]
+    assert [len(faces) for faces in results] == [1] * 5
+    for i, faces in enumerate(results):
+        h = 100 * (i + 1)
+        assert faces[0]['box'] == (50, h // 4, 150, 3 * h // 4)
+        assert faces[0]['method'] == 'dnn'
+    assert detector.detection_stats['dnn'] == 5
+    assert detector.detect_faces_dnn(images[0]) == results[0]
+    print("✓ 5 images in 2 forward passes, boxes per image")
+
+
+def test_prefetch_starts_cascade():
+    """A prefetched DNN result goes first and is not recomputed"""
+    print("=" * 70)
+    print("TEST: Prefetched DNN result in the cascade")
+    print("=" * 70)
+
+    detector = _detector()
+    detector.cascade_policy = CascadePolicy()
+    haar_calls = []
+    detector.detect_faces_haar = lambda image: haar_calls.append(image) or []
+
+    contexts = [ImageContext.from_bgr(np.zeros((3000, 4000, 3), dtype=np.uint8)) for _ in range(2)]
+    prefetched = detector.prefetch_dnn(contexts, batch_size=8)
+    assert detector.dnn_detector.batches == [2]
+    assert prefetched[0]['seconds'] >= 0
+
+    faces, method = detector.detect_faces_robust(contexts[0], profile='event', dnn_prefetch=prefetched[0])
+    assert method == 'dnn' and haar_calls == []
+    assert detector.dnn_detector.batches == [2]  # no second forward pass
+    assert faces[0]['box'] == (1000, 750, 3000, 2250)  # full-resolution coordinates
+    assert detector.cascade_policy.stats('event')['dnn']['attempts'] == 1
+
+    detector.models_loaded['dnn'] = False
+    assert detector.prefetch_dnn(contexts) == [None, None]
+    print("✓ Cascade starts from the prefetched result")
+
+
+def test_real_model_matches_single_image():
+    """With the res10 model, batched and single-image detections agree"""
+    print("=" * 70)
+    print("TEST: Batched detection with the DNN model")
+    print("=" * 70)
+
+    photos = sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))[:4]
+    detector = RobustFaceDetector()
+    if not photos or not detector.models_loaded.get('dnn'):
+        print("  DNN model or sample uploads not available, skipping")
+        return
+
+    contexts = [ImageContext.from_file(photo) for photo in photos]
+    batched = detector.detect_faces_dnn_batch(contexts, batch_size=len(contexts))
+    for context, faces in zip(contexts, batched):
+        single = detector.detect_faces_dnn(context, tiled=False)
+        assert [f['box'] for f in faces] == [f['box'] for f in single]
+        assert np.allclose([f['confidence'] for f in faces], [f['confidence'] for f in single], atol=1e-4)
+    print(f"✓ {sum(len(f) for f in batched)} faces, identical to per-image detection")
+
+
+if __name__ == '__main__':
+    test_batches_split_per_image()
+    test_prefetch_starts_cascade()
+    test_real_model_matches_single_image()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,85 @@
+"""
+Test Size-Capped Detection
+
+Robust detection runs on a capped copy of large photos, boxes come back in
+full-resolution coordinates, and HOG upsamples only when the smallest
+expected face would be below its minimum.
+"""
+
+import numpy as np
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_context import ImageContext
+from robust_face_detector import (
+    RobustFaceDetector, detection_scale, hog_upsample_for, scale_detections
+)
+
+
+def test_scale_and_upsample_rules():
+    """Cap, small-face floor, HOG upsampling and box mapping"""
+    print("=" * 70)
+    print("TEST: Detection scale and upsampling rules")
+    print("=" * 70)
+
+    assert detection_scale((960, 1280), 1600) == 1.0
+    assert detection_scale((3000, 4000), 0) == 1.0
+    assert abs(detection_scale((3000, 4000), 1600) - 0.4) < 1e-9
+    # A 2.5% face of a 4000px short side must stay >= 30px for Haar
+    assert abs(detection_scale((4000, 6000), 1600) - 0.3) < 1e-9
+
+    assert hog_upsample_for((1200, 1600)) == 1   # 30px faces < 80px
+    assert hog_upsample_for((4000, 6000)) == 0   # 100px faces
+
+    faces = [{'box': (10, 20, 50, 60), 'method': 'haar_frontal'}, {'box': (0, 0, 400, 300), 'method': 'hog'}]
+    mapped = scale_detections(faces, (300, 400), (3000, 4000))
+    assert mapped[0]['box'] == (100, 200, 500, 600) and mapped[0]['method'] == 'haar_frontal'
+    assert mapped[1]['box'] == (0, 0, 4000, 3000)
+    assert faces[0]['box'] == (10, 20, 50, 60)  # input untouched
+    assert scale_detections(faces, (300, 400), (300, 400)) is faces
+    print("✓ Capped, floored and mapped back as expected")
+
+
+def test_detectors_run_on_capped_copy():
+    """Every detector sees the one cached copy; boxes return at full resolution"""
+    print("=" * 70)
+    print("TEST: Detection on the capped copy")
+    print("=" * 70)
+
+    detector = RobustFaceDetector()
+    detector.models_loaded = {'haar': True, 'hog': True, 'dnn': False, 'mtcnn': False}
+    seen = []
+
+    def fake_haar(image):
+        seen.append(('haar', image, None))
+        return []
+
+    def fake_hog(image, upsample=1):
+        seen.append(('hog', image, upsample))
+        return [{'box': (160, 120, 240, 200), 'confidence': 0.9, 'method': 'hog'}]
+
+    detector.detect_faces_haar = fake_haar
+    detector.detect_faces_hog = fake_hog
+
+    context = ImageContext.from_bgr(np.zeros((3000, 4000, 3), dtype=np.uint8))
+    faces, method = detector.detect_faces_robust(context, max_side=1600)
+    assert method == 'hog'
+    assert faces[0]['box'] == (400, 300, 600, 500)
+    assert [name for name, _, _ in seen] == ['haar', 'hog']
+    assert seen[0][1] is seen[1][1] is context.scaled(0.4)
+    assert seen[1][1].shape == (1200, 1600) and seen[1][2] == 1
+
+    # Full-resolution mode keeps the original behaviour
+    seen.clear()
+    faces, _ = detector.detect_faces_robust(context, max_side=0)
+    assert seen[1][1] is context and seen[1][2] == 1
+    assert faces[0]['box'] == (160, 120, 240, 200)
+    print("✓ One capped copy shared, boxes mapped to full resolution")
+
+
+if __name__ == '__main__':
+    test_scale_and_upsample_rules()
+    test_detectors_run_on_capped_copy()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,336 @@
+"""
+Test Memory-Mapped Encoding Store
+
+Covers the store format itself, in-place conversion of the legacy .dat
+pickles for both models, reloading galleries from the mapped arrays and
+the write-ahead log of gallery mutations (replay, torn tails, compaction).
+"""
+
+import numpy as np
+import sys
+import os
+import pickle
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from encoding_store import EncodingStore, EncodingStoreError, store_path_for
+from face_model import FaceRecognitionModel
+from multi_angle_face_model import MultiAngleFaceModel
+import convert_to_encoding_store
+import encoding_store
+
+
+def test_store_roundtrip_and_generations():
+    """Arrays come back memory-mapped; old generations are cleaned up"""
+    print("=" * 70)
+    print("TEST: Encoding store round trip")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = EncodingStore(os.path.join(data_dir, 'faces.store'))
+        assert not store.exists()
+
+        first = rng.normal(0, 0.1, (10, 128))
+        store.save({'encodings': first}, {'ids': ['a'] * 10, 'score': np.float32(0.5)})
+        second = rng.normal(0, 0.1, (12, 128))
+        store.save({'encodings': second, 'flags': np.ones(12, dtype=bool)}, {'ids': ['b'] * 12})
+
+        arrays, meta = store.load(mmap_mode='r')
+        assert isinstance(arrays['encodings'].base, np.memmap)
+        assert np.array_equal(arrays['encodings'], second)
+        assert arrays['flags'].dtype == bool and arrays['flags'].all()
+        assert meta == {'ids': ['b'] * 12}
+        assert not arrays['encodings'].flags.writeable
+
+        # Only the current generation remains on disk
+        assert sorted(os.listdir(store.path)) == ['encodings-000002.npy', 'flags-000002.npy', 'store.json']
+
+        # Empty galleries are valid stores
+        store.save({'encodings': np.zeros((0, 128))}, {'ids': []})
+        arrays, meta = store.load()
+        assert arrays['encodings'].shape == (0, 128)
+
+    print("✓ Store round trip, atomic generations and cleanup")
+
+
+def _multi_angle_pickle(rng, path, persons):
+    known_faces = {}
+    for i in range(persons):
+        encodings = {'center': rng.normal(0, 0.1, 128)}
+        if i % 2:
+            encodings['left'] = rng.normal(0, 0.1, 128)
+        if i % 3:
+            encodings['right'] = rng.normal(0, 0.1, 128)
+        if i == 0:
+            # Live-scan angles are not gallery columns but must survive conversion
+            encodings['frontal'] = rng.normal(0, 0.1, 128)
+        known_faces[f"person_{i + 1:04d}"] = {
+            'encodings': encodings,
+            'metadata': {'quality_scores': {angle: np.float64(80 + i % 7) for angle in encodings},
+                         'angle_count': len(encodings)}
+        }
+    with open(path, 'wb') as f:
+        pickle.dump(known_faces, f)
+    return known_faces
+
+
+def test_multi_angle_model_converts_and_reloads():
+    """Pickle -> store conversion is lossless and the mapped gallery stays usable"""
+    print("=" * 70)
+    print("TEST: MultiAngleFaceModel pickle conversion")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_file = os.path.join(data_dir, 'multi_angle_faces.dat')
+        original = _multi_angle_pickle(rng, data_file, 50)
+
+        converted = MultiAngleFaceModel(data_file=data_file, encoding_dtype='float64')
+        assert os.path.exists(data_file), "pickle is kept as a backup"
+        assert converted.store.exists()
+
+        reloaded = MultiAngleFaceModel(data_file=data_file, encoding_dtype='float64')
+        assert list(reloaded.known_faces) == list(original)
+        for person_id, data in original.items():
+            loaded = reloaded.known_faces[person_id]
+            assert set(loaded['encodings']) == set(data['encodings'])
+            for angle, encoding in data['encodings'].items():
+                assert np.array_equal(loaded['encodings'][angle], encoding)
+            assert loaded['metadata'] == data['metadata']
+
+        queries = [original['person_0007']['encodings']['center'] + rng.normal(0, 0.01, 128),
+                   rng.normal(0, 0.1, 128)]
+        for query in queries:
+            assert reloaded.recognize_face_multi_angle(query, photo_orientation='center')[:4] == \
+                converted.recognize_face_multi_angle(query, photo_orientation='center')[:4]
+
+        # Learning on top of the mapped gallery grows it and persists
+        new_id = reloaded.learn_face_multi_angle({'center': rng.normal(0, 0.1, 128)}, {'center': 90.0})
+        assert new_id == 'person_0051'
+        again = MultiAngleFaceModel(data_file=data_file, encoding_dtype='float64')
+        assert again._gallery_ids == reloaded._gallery_ids
+        assert np.array_equal(again._gallery[:51], reloaded._gallery[:51])
+
+    print("✓ Conversion lossless, reload uses the mapped gallery")
+
+
+def test_legacy_model_and_converter_script():
+    """known_faces.dat converts through the script; --force rebuilds from the pickle"""
+    print("=" * 70)
+    print("TEST: FaceRecognitionModel conversion script")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as data_dir:
+        legacy_file = os.path.join(data_dir, 'known_faces.dat')
+        encodings = [rng.normal(0, 0.1, 128) for _ in range(20)]
+        ids = [f"person_{i + 1:04d}" for i in range(20)]
+        with open(legacy_file, 'wb') as f:
+            pickle.dump((encodings, ids), f)
+        multi_file = os.path.join(data_dir, 'multi_angle_faces.dat')
+        _multi_angle_pickle(rng, multi_file, 5)
+
+        assert convert_to_encoding_store.convert(legacy_file) == 20
+        assert convert_to_encoding_store.convert(multi_file) == 5
+        assert convert_to_encoding_store.convert(legacy_file) is None  # already converted
+
+        model = FaceRecognitionModel(data_file=legacy_file)
+        assert model.known_ids == ids
+        assert all(np.array_equal(a, b) for a, b in zip(model.known_encodings, encodings))
+        assert model.recognize_face(encodings[3] + 0.001)[0] == ids[3]
+
+        # A stale store is replaced from the pickle with --force
+        with open(legacy_file, 'wb') as f:
+            pickle.dump((encodings[:5], ids[:5]), f)
+        assert convert_to_encoding_store.convert(legacy_file, force=True) == 5
+        assert FaceRecognitionModel(data_file=legacy_file).known_ids == ids[:5]
+        assert store_path_for(legacy_file) == os.path.join(data_dir, 'known_faces.store')
+
+    print("✓ Converter script migrates both pickles in place")
+
+
+def test_log_replay_and_torn_tail():
+    """Appended records replay bit-exact; a torn tail is truncated, not fatal"""
+    print("=" * 70)
+    print("TEST: Write-ahead log replay")
+    print("=" * 70)
+
+    rng = np.random.default_rng(4)
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = EncodingStore(os.path.join(data_dir, 'faces.store'), fsync=False)
+        store.save({'encodings': np.zeros((0, 128))}, {'ids': []})
+
+        encodings = [rng.normal(0, 0.1, 128) for _ in range(3)]
+        for i, encoding in enumerate(encodings):
+            store.append({'op': 'add', 'id': f"person_{i + 1:04d}", 'encoding': encoding})
+
+        # Simulate a crash halfway through a fourth append
+        with open(store.log_path, 'ab') as f:
+            f.write(b'\x40\x00\x00\x00garbage')
+
+        reopened = EncodingStore(store.path, fsync=False)
+        reopened.load()
+        records = reopened.replay()
+        assert [r['id'] for r in records] == ['person_0001', 'person_0002', 'person_0003']
+        assert all(np.array_equal(r['encoding'], e) for r, e in zip(records, encodings))
+        assert reopened.log_records == 3
+
+        # Appends continue after the last intact record
+        reopened.append({'op': 'add', 'id': 'person_0004', 'encoding': encodings[0]})
+        assert len(EncodingStore(store.path).replay()) == 4
+
+        # A new snapshot starts an empty log and removes the old one
+        reopened.save({'encodings': np.zeros((0, 128))}, {'ids': []})
+        assert reopened.replay() == []
+        assert not any(name.endswith('.log') for name in os.listdir(store.path))
+
+    print("✓ Log replays in order and survives a torn tail")
+
+
+def test_models_replay_log_without_snapshot_rewrites():
+    """Learning appends to the log; reload = snapshot + replay; compaction folds it in"""
+    print("=" * 70)
+    print("TEST: Model mutations through the write-ahead log")
+    print("=" * 70)
+
+    rng = np.random.default_rng(5)
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_file = os.path.join(data_dir, 'multi_angle_faces.dat')
+        _multi_angle_pickle(rng, data_file, 10)
+        model = MultiAngleFaceModel(data_file=data_file)
+        snapshot_generation = model.store.generation
+
+        new_ids = [model.learn_face_multi_angle({'center': rng.normal(0, 0.1, 128)}, {'center': 70.0})
+                   for _ in range(5)]
+        # Better quality angle for an existing person is logged too
+        improved = model.known_faces['person_0002']['encodings']['center'] + rng.normal(0, 0.001, 128)
+        assert model.learn_face_multi_angle({'center': improved, 'right': improved}, {'center': 99.0}) == 'person_0002'
+        assert model.store.generation == snapshot_generation, "no snapshot rewrite per face"
+        assert model.store.log_records == 6
+
+        reloaded = MultiAngleFaceModel(data_file=data_file)
+        assert reloaded._gallery_ids == model._gallery_ids
+        assert list(reloaded._gallery_ids[-5:]) == new_ids
+        count = len(model._gallery_ids)
+        assert np.array_equal(reloaded._gallery[:count], model._gallery[:count])
+        assert np.array_equal(reloaded._gallery_mask[:count], model._gallery_mask[:count])
+        assert reloaded.known_faces['person_0002']['metadata']['quality_scores']['center'] == 99.0
+
+        legacy_file = os.path.join(data_dir, 'known_faces.dat')
+        legacy = FaceRecognitionModel(data_file=legacy_file)
+        encodings = [rng.normal(0, 0.1, 128) for _ in range(4)]
+        ids = [legacy.learn_face(encoding) for encoding in encodings]
+        assert not legacy.store.exists(), "faces before the first snapshot live only in the log"
+        recovered = FaceRecognitionModel(data_file=legacy_file)
+        assert recovered.known_ids == ids
+        assert all(np.array_equal(a, b) for a, b in zip(recovered.known_encodings, encodings))
+
+    # Compaction once the log outgrows the configured minimum
+    original_min = encoding_store.WAL_COMPACT_MIN_RECORDS
+    encoding_store.WAL_COMPACT_MIN_RECORDS = 3
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            model = MultiAngleFaceModel(data_file=os.path.join(data_dir, 'multi_angle_faces.dat'))
+            for _ in range(4):
+                model.learn_face_multi_angle({'center': rng.normal(0, 0.1, 128)})
+            assert model.store.generation == 1 and model.store.log_records == 1
+            assert len(MultiAngleFaceModel(data_file=model.data_file).known_faces) == 4
+    finally:
+        encoding_store.WAL_COMPACT_MIN_RECORDS = original_min
+
+    print("✓ Mutations are logged, replayed on load and compacted")
+
+
+def _directory_contents(path):
+    contents = {}
+    for name in sorted(os.listdir(path)):
+        with open(os.path.join(path, name), 'rb') as f:
+            contents[name] = f.read()
+    return contents
+
+
+def _expect_store_error(build):
+    try:
+        build()
+    except EncodingStoreError:
+        return
+    assert False, "an unreadable store should not load"
+
+
+def test_unreadable_store_is_never_overwritten():
+    """A corrupt sidecar or array raises; backup pickle and log never replace the store"""
+    print("=" * 70)
+    print("TEST: Unreadable encoding store left untouched")
+    print("=" * 70)
+
+    rng = np.random.default_rng(6)
+    for corrupt in ('store.json', 'gallery'):
+        with tempfile.TemporaryDirectory() as data_dir:
+            data_file = os.path.join(data_dir, 'multi_angle_faces.dat')
+            _multi_angle_pickle(rng, data_file, 10)
+            model = MultiAngleFaceModel(data_file=data_file)  # converted, pickle kept as backup
+            for _ in range(3):
+                model.learn_face_multi_angle({'center': rng.normal(0, 0.1, 128)}, {'center': 70.0})
+            assert model.store.log_records == 3
+
+            store_dir = model.store.path
+            name = 'store.json' if corrupt == 'store.json' else \
+                next(n for n in os.listdir(store_dir) if n.startswith('gallery-'))
+            with open(os.path.join(store_dir, name), 'r+b') as f:
+                f.truncate(20)
+            before = _directory_contents(store_dir)
+
+            _expect_store_error(lambda: MultiAngleFaceModel(data_file=data_file))
+            assert _directory_contents(store_dir) == before, f"store rewritten after corrupt {corrupt}"
+
+            # An explicit rebuild from the pickle moves the unreadable store aside
+            assert convert_to_encoding_store.convert(data_file, force=True) == 10
+            assert _directory_contents(store_dir + '.unreadable') == before
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        legacy_file = os.path.join(data_dir, 'known_faces.dat')
+        with open(legacy_file, 'wb') as f:
+            pickle.dump(([rng.normal(0, 0.1, 128)], ['person_0001']), f)
+        legacy = FaceRecognitionModel(data_file=legacy_file)
+        legacy.learn_face(rng.normal(0, 0.1, 128))
+        with open(legacy.store.sidecar_path, 'w') as f:
+            f.write('{"format_version": 1, "generation"')
+        before = _directory_contents(legacy.store.path)
+
+        _expect_store_error(lambda: FaceRecognitionModel(data_file=legacy_file))
+        assert _directory_contents(legacy.store.path) == before
+
+    print("✓ Corrupt sidecar / array: load fails, nothing overwritten")
+
+
+def test_cold_start_time():
+    """Report cold-start time of pickle vs store for a large gallery"""
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as data_dir:
+        data_file = os.path.join(data_dir, 'multi_angle_faces.dat')
+        _multi_angle_pickle(rng, data_file, 20000)
+
+        start = time.perf_counter()
+        MultiAngleFaceModel(data_file=data_file)  # pickle load + conversion
+        pickle_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        reloaded = MultiAngleFaceModel(data_file=data_file)
+        store_seconds = time.perf_counter() - start
+        assert len(reloaded.known_faces) == 20000
+
+    print(f"  20000 persons: pickle + convert {pickle_seconds:.2f}s, encoding store {store_seconds:.2f}s")
+
+
+if __name__ == '__main__':
+    test_store_roundtrip_and_generations()
+    test_multi_angle_model_converts_and_reloads()
+    test_legacy_model_and_converter_script()
+    test_log_replay_and_torn_tail()
+    test_models_replay_log_without_snapshot_rewrites()
+    test_unreadable_store_is_never_overwritten()
+    test_cold_start_time()
+    print("\nALL TESTS PASSED")
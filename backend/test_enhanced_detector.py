@@ -7,11 +7,14 @@ Comprehensive tests for the EnhancedFaceDetector class including:
 - Angle estimation
 - Quality scoring
 - Edge cases and error handling
+- Sharing one detector between threads
 """
 
 import cv2
 import numpy as np
 import sys
+import threading
+import time
 from enhanced_face_detector import EnhancedFaceDetector
 
 def create_test_image(size=(400, 400), face_type='frontal'):
@@ -266,6 +269,54 @@ def test_statistics(detector):
         print(f"✗ Statistics test failed: {e}")
         return False
 
+def test_thread_sharing(detector):
+    """Test 7: One detector shared by request threads"""
+    print("\n" + "=" * 70)
+    print("TEST 7: Shared Between Threads")
+    print("=" * 70)
+    
+    try:
+        detector.reset_stats()
+        inside = []
+        overlaps = []
+        detect_haar = detector._detect_haar
+        
+        def tracked_haar(image):
+            inside.append(1)
+            overlaps.append(len(inside))
+            time.sleep(0.005)
+            inside.pop()
+            return detect_haar(image)
+        
+        detector._detect_haar = tracked_haar
+        loaded = dict(detector.detectors_loaded)
+        detector.detectors_loaded = {name: name == 'haar' for name in loaded}
+        try:
+            image = create_test_image()
+            threads = [
+                threading.Thread(target=lambda: [detector.detect_faces(image) for _ in range(5)])
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            del detector._detect_haar
+            detector.detectors_loaded = loaded
+        
+        stats = detector.get_detection_stats()
+        print(f"\n  40 detections from 8 threads, at most {max(overlaps)} at a time")
+        if stats['total'] != 40 or max(overlaps) != 1:
+            print(f"  ✗ Detections overlapped or were miscounted: {stats}")
+            return False
+        
+        print("\n✓ Thread sharing test passed")
+        return True
+    except Exception as e:
+        print(f"✗ Thread sharing test failed: {e}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "=" * 70)
@@ -298,6 +349,9 @@ def run_all_tests():
     # Test 6: Statistics
     results['statistics'] = test_statistics(detector)
     
+    # Test 7: Shared between threads
+    results['thread_sharing'] = test_thread_sharing(detector)
+    
     # Print summary
     print("\n" + "=" * 70)
     print("TEST SUMMARY")
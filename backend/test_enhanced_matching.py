@@ -7,6 +7,7 @@ This script tests the bidirectional cross-angle matching functionality.
 import numpy as np
 import sys
 import os
+import shutil
 
 # Add backend to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -296,6 +297,8 @@ def run_all_tests():
         if os.path.exists('test_multi_angle_faces.dat'):
             os.remove('test_multi_angle_faces.dat')
             print("✓ Cleaned up test data file")
+        if os.path.exists('test_multi_angle_faces.store'):
+            shutil.rmtree('test_multi_angle_faces.store')
         
     except Exception as e:
         print(f"\n✗ TEST FAILED WITH ERROR: {e}")
@@ -0,0 +1,213 @@
+"""
+Test Event-Scoped Candidate Pre-Filtering
+
+Recognition for an event only scores the persons filed under it, falls
+back to the global gallery for unindexed events, and the membership index
+survives reloads (log replay and snapshots) and event deletion. Each gallery
+keeps its own membership, and an event processed before the index existed
+keeps its earlier persons when new photos are processed before any scan.
+"""
+
+import numpy as np
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from face_model import FaceRecognitionModel
+from multi_angle_face_model import MultiAngleFaceModel
+from gallery_test_utils import learned_gallery
+
+
+def _gallery(rng, data_dir, persons):
+    model, learned, ids = learned_gallery(rng, data_dir, persons, scale=1.0, quality=80.0,
+                                          name='multi_angle_faces.dat')
+    return model, [encodings['center'] for encodings in learned], ids
+
+
+def test_event_restricts_candidates():
+    """Only event members can match; unindexed events search everyone"""
+    print("=" * 70)
+    print("TEST: Event-scoped recognition")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model, encodings, ids = _gallery(rng, data_dir, 40)
+        model.add_event_members('event_a', ids[:5])
+        model.add_event_members('event_a', [ids[2], ids[7]])  # repeats are ignored
+        assert model.event_members('event_a') == set(ids[:5]) | {ids[7]}
+
+        member_query = encodings[7] + rng.normal(0, 0.01, 128)
+        outsider_query = encodings[30] + rng.normal(0, 0.01, 128)
+
+        person_id, _, _, distance, _ = model.recognize_face_multi_angle(
+            member_query, photo_orientation='center', event_id='event_a')
+        assert person_id == ids[7]
+        assert distance == model.recognize_face_multi_angle(member_query, photo_orientation='center')[3]
+
+        # Outsiders are not in the candidate set at all
+        assert model.recognize_face_multi_angle(outsider_query, photo_orientation='center',
+                                                event_id='event_a')[0] is None
+        # Unindexed events fall back to the whole gallery
+        assert model.recognize_face_multi_angle(outsider_query, photo_orientation='center',
+                                                event_id='event_b')[0] == ids[30]
+
+        results = model.recognize_faces_multi_angle_batch([member_query, outsider_query], event_id='event_a')
+        assert [result[0] for result in results] == [ids[7], None]
+
+        # Legacy model takes the candidate IDs directly
+        legacy = FaceRecognitionModel(data_file=os.path.join(data_dir, 'known_faces.dat'))
+        legacy.store.fsync = False
+        legacy_ids = [legacy.learn_face(encoding) for encoding in encodings]
+        assert legacy.recognize_face(outsider_query, candidate_ids=set(legacy_ids[:5]))[0] is None
+        assert legacy.recognize_face(outsider_query, candidate_ids=set(legacy_ids[28:32]))[0] == legacy_ids[30]
+        assert legacy.recognize_face(outsider_query)[0] == legacy_ids[30]
+
+    print("✓ Event members only, global fallback for unindexed events")
+
+
+def test_membership_persists_and_is_removed():
+    """Membership replays from the log, survives snapshots and event deletion"""
+    print("=" * 70)
+    print("TEST: Event membership persistence")
+    print("=" * 70)
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model, encodings, ids = _gallery(rng, data_dir, 10)
+        model.add_event_members('event_a', ids[:3])
+        model.add_event_members('event_b', ids[3:6])
+        model.remove_event('event_b')
+
+        replayed = MultiAngleFaceModel(data_file=model.data_file)
+        assert replayed.event_members('event_a') == set(ids[:3])
+        assert replayed.event_members('event_b') == set()
+
+        replayed.save_model()
+        snapshot = MultiAngleFaceModel(data_file=model.data_file)
+        assert snapshot.event_members('event_a') == set(ids[:3])
+        assert snapshot.store.log_records == 0
+
+        # A member learned after the rows were cached becomes a candidate
+        new_id = snapshot.learn_face_multi_angle({'center': rng.normal(0, 1.0, 128)})
+        query = snapshot.known_faces[new_id]['encodings']['center']
+        assert snapshot.recognize_face_multi_angle(query, event_id='event_a')[0] is None
+        snapshot.add_event_members('event_a', [new_id])
+        assert snapshot.recognize_face_multi_angle(query, event_id='event_a')[0] == new_id
+
+    print("✓ Membership index persisted through log and snapshot")
+
+
+def test_membership_per_gallery():
+    """Both galleries use person_NNNN IDs; each indexes only its own persons"""
+    print("=" * 70)
+    print("TEST: Membership per gallery")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model, encodings, ids = _gallery(rng, data_dir, 3)             # person_0001..0003
+        legacy = FaceRecognitionModel(data_file=os.path.join(data_dir, 'known_faces.dat'))
+        legacy.store.fsync = False
+        legacy_ids = [legacy.learn_face(rng.normal(0, 1.0, 128)) for _ in range(5)]  # person_0001..0005
+
+        # Folder names of an old event: person_0004 exists in the legacy gallery only
+        for gallery in (legacy, model):
+            gallery.add_event_members('event_a', ['person_0002', 'person_0004', 'person_9999'])
+        assert legacy.event_members('event_a') == {'person_0002', 'person_0004'}
+        assert model.event_members('event_a') == {'person_0002'}
+
+        legacy.add_event_members('event_b', legacy_ids[:2])
+        legacy.remove_event('event_b')
+        replayed = FaceRecognitionModel(data_file=legacy.data_file)
+        assert replayed.event_members('event_a') == {'person_0002', 'person_0004'}
+        assert replayed.event_members('event_b') == set()
+        replayed.save_model()
+        assert FaceRecognitionModel(data_file=legacy.data_file).event_members('event_a') == {'person_0002', 'person_0004'}
+
+    print("✓ Unknown IDs ignored, legacy membership persisted")
+
+
+def _canned_analyses(encodings_per_photo):
+    """photo_pipeline.iter_photo_analyses stand-in with the given encodings per photo"""
+    def iter_photo_analyses(paths, **kwargs):
+        for path, encodings in zip(paths, encodings_per_photo):
+            yield {'path': path, 'error': None, 'encodings': encodings, 'method': 'canned',
+                   'robust': False, 'orientations': None, 'accessories': None,
+                   'quality_scores': None, 'timings': {}, 'detector_trace': None}
+    return iter_photo_analyses
+
+
+def test_partially_indexed_event():
+    """New photos processed before any scan keep the event's earlier persons"""
+    print("=" * 70)
+    print("TEST: Event processed before the membership index")
+    print("=" * 70)
+
+    try:
+        import face_recognition_config
+        face_recognition_config.MODEL_LOADING = 'lazy'
+        import app
+        import photo_pipeline
+        from cascade_policy import CascadePolicy
+    except ImportError as e:
+        print(f"  app dependencies not available ({e}), skipping")
+        return
+
+    rng = np.random.default_rng(3)
+    with tempfile.TemporaryDirectory() as data_dir:
+        multi_angle_model, centers, ids = _gallery(rng, data_dir, 3)
+        legacy = FaceRecognitionModel(data_file=os.path.join(data_dir, 'known_faces.dat'))
+        legacy.store.fsync = False
+        old_face = rng.normal(0, 1.0, 128)
+        old_legacy_id = legacy.learn_face(old_face)
+
+        # Processed by an earlier version: filed photos, no manifest, no membership
+        uploads, processed = os.path.join(data_dir, 'uploads'), os.path.join(data_dir, 'processed')
+        event_id = 'event_partial'
+        os.makedirs(os.path.join(uploads, event_id))
+        for name, person_id in (('old_1.jpg', old_legacy_id), ('old_2.jpg', ids[2])):
+            with open(os.path.join(uploads, event_id, name), 'wb') as f:
+                f.write(name.encode())
+            os.makedirs(os.path.join(processed, event_id, person_id, 'individual'), exist_ok=True)
+            shutil.copy(os.path.join(uploads, event_id, name), os.path.join(processed, event_id, person_id, 'individual'))
+        with open(os.path.join(uploads, event_id, 'new.jpg'), 'wb') as f:
+            f.write(b'new')
+
+        saved = (app.get_face_model, app.get_multi_angle_model, app.get_robust_detector,
+                 app.cascade_policy, photo_pipeline.iter_photo_analyses, dict(app.app.config))
+        app.get_face_model = lambda: legacy
+        app.get_multi_angle_model = lambda: multi_angle_model
+        app.get_robust_detector = lambda: None
+        app.cascade_policy = CascadePolicy()
+        photo_pipeline.iter_photo_analyses = _canned_analyses([[rng.normal(0, 1.0, 128)]])
+        app.app.config.update(UPLOAD_FOLDER=uploads, PROCESSED_FOLDER=processed)
+        try:
+            app.process_images(event_id)
+
+            # Only new.jpg was analyzed; its new person did not make the event "indexed"
+            assert legacy.event_members(event_id) == {old_legacy_id, 'person_0002'}
+            # The folder name person_0001 is known to both galleries, so it joins both
+            assert multi_angle_model.event_members(event_id) == {old_legacy_id, ids[2]}
+            query = old_face + rng.normal(0, 0.01, 128)
+            assert legacy.recognize_face(query, candidate_ids=app.get_event_person_ids(event_id))[0] == old_legacy_id
+            assert multi_angle_model.recognize_face_multi_angle(
+                centers[2] + rng.normal(0, 0.01, 128), event_id=event_id)[0] == ids[2]
+        finally:
+            (app.get_face_model, app.get_multi_angle_model, app.get_robust_detector,
+             app.cascade_policy, photo_pipeline.iter_photo_analyses, config) = saved
+            app.app.config.update(config)
+            app._event_manifests.pop(event_id, None)
+
+    print("✓ Earlier persons indexed with the manifest")
+
+
+if __name__ == '__main__':
+    test_event_restricts_candidates()
+    test_membership_persists_and_is_removed()
+    test_membership_per_gallery()
+    test_partially_indexed_event()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,111 @@
+"""
+Test Fused Per-Face Analysis
+
+analyze_face() runs the landmark predictor once per face and shares one
+grayscale crop, and gives the same orientation, sunglasses and quality
+results as detect_face_orientation / detect_sunglasses / assess_image_quality.
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import multi_angle_face_model
+from multi_angle_face_model import (
+    analyze_face, detect_face_orientation, detect_sunglasses, assess_image_quality
+)
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+def _fake_landmarks(face_location, shift):
+    """Eye, eyebrow and nose points of a face turned by `shift` pixels"""
+    top, right, bottom, left = face_location
+    cx, cy, w = (left + right) / 2, (top + bottom) / 2, right - left
+    return {
+        'left_eyebrow': [(cx - w * 0.3 + i * 4 + shift, cy - w * 0.2) for i in range(5)],
+        'right_eyebrow': [(cx + w * 0.1 + i * 4 + shift, cy - w * 0.2) for i in range(5)],
+        'left_eye': [(cx - w * 0.25 + i * 3 + shift, cy - w * 0.1) for i in range(6)],
+        'right_eye': [(cx + w * 0.1 + i * 3 + shift, cy - w * 0.1) for i in range(6)],
+        'nose_bridge': [(cx + shift, cy - w * 0.1 + i * 5) for i in range(4)],
+    }
+
+
+def test_single_landmark_pass():
+    """One landmark call per face, same results as the separate functions"""
+    print("=" * 70)
+    print("TEST: Fused face analysis")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    rgb = rng.integers(0, 256, (200, 300, 3), dtype=np.uint8)
+    rgb[20:80, 200:260] //= 8  # a dark face
+    gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+    faces = {(20, 260, 80, 200): 0, (100, 120, 180, 40): 30}  # location -> turn
+
+    calls = []
+    face_recognition = multi_angle_face_model.face_recognition
+    original = getattr(face_recognition, 'face_landmarks', None)
+
+    def counting_landmarks(image, face_locations):
+        calls.append(face_locations[0])
+        return [_fake_landmarks(face_locations[0], faces[face_locations[0]])]
+
+    face_recognition.face_landmarks = counting_landmarks
+    try:
+        for location in faces:
+            calls.clear()
+            analysis = analyze_face(rgb, location, gray=gray)
+            assert len(calls) == 1
+
+            assert analysis['orientation'] == detect_face_orientation(rgb, location)
+            assert analysis['has_sunglasses'] == detect_sunglasses(rgb, location)
+            assert abs(analysis['quality_score'] - assess_image_quality(rgb, location)) < 1e-9
+            assert analysis['landmarks'] is not None and analysis['encoding'] is None
+            assert len(calls) == 3  # the separate functions needed two more passes
+
+        assert analyze_face(rgb, (20, 260, 80, 200))['has_sunglasses']
+        assert analyze_face(rgb, (100, 120, 180, 40))['orientation'] == 'right'
+    finally:
+        if original is None:
+            del face_recognition.face_landmarks
+        else:
+            face_recognition.face_landmarks = original
+
+    print("✓ One landmark pass per face, identical results")
+
+
+def test_upload_faces_match_separate_calls():
+    """Real faces from the upload set give identical analyses"""
+    print("=" * 70)
+    print("TEST: Fused analysis on upload photos")
+    print("=" * 70)
+
+    face_recognition = multi_angle_face_model.face_recognition
+    photos = sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))[:2]
+    if not photos or not hasattr(face_recognition, 'face_landmarks'):
+        print("  face_recognition models or sample uploads not available, skipping")
+        return
+
+    faces = 0
+    for photo in photos:
+        rgb = face_recognition.load_image_file(photo)
+        gray = cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY)
+        for location in face_recognition.face_locations(rgb):
+            analysis = analyze_face(rgb, location, gray=gray)
+            assert analysis['orientation'] == detect_face_orientation(rgb, location)
+            assert analysis['has_sunglasses'] == detect_sunglasses(rgb, location)
+            assert abs(analysis['quality_score'] - assess_image_quality(rgb, location)) < 1e-9
+            faces += 1
+
+    print(f"✓ {faces} faces analyzed identically")
+
+
+if __name__ == '__main__':
+    test_single_landmark_pass()
+    test_upload_faces_match_separate_calls()
+    print("\nALL TESTS PASSED")
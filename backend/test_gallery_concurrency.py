@@ -0,0 +1,162 @@
+"""
+Test Concurrent Gallery Access
+
+Stress test for the readers-writer locking of both face models: learner
+threads add persons while recognizer threads match against the same
+gallery. Checks that no update is lost, no person ID is handed out twice
+and that the persisted store agrees with memory afterwards.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from gallery_lock import ReadWriteLock
+from face_model import FaceRecognitionModel
+from multi_angle_face_model import MultiAngleFaceModel
+
+LEARNERS = 4
+FACES_PER_LEARNER = 50
+RECOGNIZERS = 4
+
+
+def test_read_write_lock_semantics():
+    """Readers share, writers exclude, waiting writers block new readers"""
+    print("=" * 70)
+    print("TEST: ReadWriteLock semantics")
+    print("=" * 70)
+
+    lock = ReadWriteLock()
+    inside = []
+    both_reading = threading.Barrier(2, timeout=5)
+
+    def reader():
+        with lock.read_locked():
+            both_reading.wait()  # only passes if two readers hold the lock at once
+            inside.append('read')
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert inside == ['read', 'read']
+
+    # Reentrancy, and reads nested inside a write
+    with lock.write_locked():
+        with lock.write_locked():
+            with lock.read_locked():
+                pass
+    with lock.read_locked():
+        with lock.read_locked():
+            pass
+
+    # A waiting writer is served before a reader that arrives after it
+    order = []
+    lock.acquire_read()
+    writer = threading.Thread(target=lambda: (lock.acquire_write(), order.append('write'), lock.release_write()))
+    writer.start()
+    while not lock._waiting_writers:
+        time.sleep(0.001)
+    late_reader = threading.Thread(target=lambda: (lock.acquire_read(), order.append('read'), lock.release_read()))
+    late_reader.start()
+    time.sleep(0.05)
+    assert order == []
+    lock.release_read()
+    writer.join()
+    late_reader.join()
+    assert order == ['write', 'read']
+
+    print("✓ Shared reads, exclusive reentrant writes, writer preference")
+
+
+def _run_stress(learn, recognize, encodings_by_learner):
+    errors = []
+    learned = [[] for _ in encodings_by_learner]
+    done = threading.Event()
+    recognitions = [0]
+
+    def learner(index):
+        try:
+            for encoding in encodings_by_learner[index]:
+                learned[index].append(learn(encoding))
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    def recognizer(seed):
+        rng = np.random.default_rng(seed)
+        try:
+            while not done.is_set():
+                recognize(rng.normal(0, 0.1, 128))
+                recognitions[0] += 1
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    learners = [threading.Thread(target=learner, args=(i,)) for i in range(len(encodings_by_learner))]
+    recognizers = [threading.Thread(target=recognizer, args=(100 + i,)) for i in range(RECOGNIZERS)]
+    for thread in recognizers + learners:
+        thread.start()
+    for thread in learners:
+        thread.join()
+    done.set()
+    for thread in recognizers:
+        thread.join()
+
+    assert not errors, errors
+    assert recognitions[0] > 0
+    return learned
+
+
+def test_concurrent_learners_and_recognizers():
+    """No lost updates or duplicate IDs under concurrent learning and recognition"""
+    print("=" * 70)
+    print("TEST: Concurrent learners and recognizers")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = MultiAngleFaceModel(data_file=os.path.join(data_dir, 'multi_angle_faces.dat'))
+        model.store.fsync = False
+        # Well-separated faces: every learn must create a new person
+        encodings = [[rng.normal(0, 1.0, 128) for _ in range(FACES_PER_LEARNER)] for _ in range(LEARNERS)]
+
+        learned = _run_stress(
+            lambda encoding: model.learn_face_multi_angle({'center': encoding}, {'center': 80.0}),
+            lambda query: model.recognize_face_multi_angle(query, photo_orientation='center'),
+            encodings
+        )
+
+        all_ids = [person_id for ids in learned for person_id in ids]
+        assert len(all_ids) == LEARNERS * FACES_PER_LEARNER
+        assert len(set(all_ids)) == len(all_ids), "duplicate person IDs"
+        assert len(model.known_faces) == len(all_ids), "lost updates"
+        assert sorted(model._gallery_ids) == sorted(all_ids)
+        for ids, faces in zip(learned, encodings):
+            for person_id, encoding in zip(ids, faces):
+                row = model._gallery_rows[person_id]
+                assert np.array_equal(model._gallery[row, 0], encoding.astype(model._gallery.dtype))
+
+        reloaded = MultiAngleFaceModel(data_file=model.data_file)
+        assert sorted(reloaded.known_faces) == sorted(all_ids)
+
+        legacy = FaceRecognitionModel(data_file=os.path.join(data_dir, 'known_faces.dat'))
+        legacy.store.fsync = False
+        learned = _run_stress(legacy.learn_face, legacy.recognize_face, encodings)
+        all_ids = [person_id for ids in learned for person_id in ids]
+        assert len(set(all_ids)) == len(all_ids) == LEARNERS * FACES_PER_LEARNER
+        assert sorted(legacy.known_ids) == sorted(all_ids)
+        assert len(legacy.known_encodings) == len(legacy.known_ids)
+
+    print(f"✓ {LEARNERS} learners x {FACES_PER_LEARNER} faces with {RECOGNIZERS} recognizers: "
+          f"no lost updates, unique IDs")
+
+
+if __name__ == '__main__':
+    test_read_write_lock_semantics()
+    test_concurrent_learners_and_recognizers()
+    print("\nALL TESTS PASSED")
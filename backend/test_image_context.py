@@ -0,0 +1,94 @@
+"""
+Test Decode-Once Image Context
+
+A photo is decoded once; RGB, grayscale and downscaled views are derived
+lazily, cached, and match what each stage used to compute on its own.
+Detectors give the same results for a context as for a bare BGR array.
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import image_context
+from image_context import ImageContext
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+def test_views_decoded_once():
+    """One imread per photo; views equal direct conversions and are cached"""
+    print("=" * 70)
+    print("TEST: Image context views")
+    print("=" * 70)
+
+    rng = np.random.default_rng(0)
+    bgr = rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+    reads = []
+    original_imread = cv2.imread
+
+    def counting_imread(*args, **kwargs):
+        reads.append(args[0])
+        return original_imread(*args, **kwargs)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        path = os.path.join(data_dir, 'photo.png')
+        cv2.imwrite(path, bgr)
+
+        image_context.cv2.imread = counting_imread
+        try:
+            context = ImageContext.from_file(path)
+            assert reads == []  # lazy
+            assert np.array_equal(context.rgb, cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+            assert np.array_equal(context.gray, cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY))
+            assert np.array_equal(context.bgr, bgr)
+            assert context.rgb is context.rgb and context.gray is context.gray
+            assert len(reads) == 1
+        finally:
+            image_context.cv2.imread = original_imread
+
+    assert context.shape == (240, 320)
+    half = context.level(1)
+    assert half.shape == (120, 160) and context.level(1) is half
+    assert context.scaled(0.25).rgb.shape == (60, 80, 3)
+    assert context.scaled(1.0) is context
+
+    # Contexts built from RGB derive BGR on demand
+    assert np.array_equal(ImageContext.from_rgb(context.rgb).bgr, bgr)
+    assert ImageContext.wrap(context) is context
+    print("✓ Decoded once, views cached")
+
+
+def test_detectors_accept_context():
+    """Detector results are identical for a context and a bare BGR array"""
+    print("=" * 70)
+    print("TEST: Detectors on an image context")
+    print("=" * 70)
+
+    photos = sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))[:2]
+    if not photos:
+        print("  No sample uploads found, skipping")
+        return
+
+    from robust_face_detector import RobustFaceDetector
+    detector = RobustFaceDetector()
+    for photo in photos:
+        bgr = cv2.imread(photo)
+        context = ImageContext.from_file(photo)
+        assert detector.detect_faces_haar(context) == detector.detect_faces_haar(bgr)
+        assert detector.detect_faces_dnn(context) == detector.detect_faces_dnn(bgr)
+        faces, method = detector.detect_faces_robust(context, use_preprocessing=False)
+        assert (faces, method) == detector.detect_faces_robust(bgr, use_preprocessing=False)
+
+    print(f"✓ {len(photos)} photos: same detections from a shared context")
+
+
+if __name__ == '__main__':
+    test_views_decoded_once()
+    test_detectors_accept_context()
+    print("\nALL TESTS PASSED")
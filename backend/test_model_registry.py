@@ -0,0 +1,213 @@
+"""
+Test Shared Model Registry
+
+Each model is built and warmed up once per process even when requests race
+for it, leased instances stay within the pool bound and are reused, load
+time and memory are accounted per model, readiness follows a warm-up, and
+the enhanced detectors share the persisted cascade policy.
+"""
+
+import threading
+import time
+import types
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import model_registry as registry_module
+from model_registry import ModelRegistry, warm_robust_detector
+
+
+class SlowModel:
+    """Stand-in for a detector whose construction takes a while"""
+
+    built = 0
+
+    def __init__(self):
+        time.sleep(0.05)
+        SlowModel.built += 1
+        self.warmed = False
+
+
+def test_get_loads_once():
+    """Concurrent first requests share one load and one warm-up"""
+    print("=" * 70)
+    print("TEST: One load under concurrent get()")
+    print("=" * 70)
+
+    SlowModel.built = 0
+    registry = ModelRegistry()
+    warmups = []
+    registry.register('slow', SlowModel, warmup=lambda model: warmups.append(model))
+    assert not registry.is_loaded('slow')
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get('slow'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowModel.built == 1 and len(warmups) == 1
+    assert all(model is results[0] for model in results)
+    stats = registry.stats()['slow']
+    assert stats['loaded'] and stats['instances'] == 1
+    assert stats['load_seconds'] >= 0.05
+    print(f"✓ 8 racing requests, 1 load ({stats['load_seconds']}s)")
+
+
+def test_lease_pool_is_bounded():
+    """At most pool_size instances; returned ones are handed out again"""
+    print("=" * 70)
+    print("TEST: Bounded lease pool")
+    print("=" * 70)
+
+    SlowModel.built = 0
+    registry = ModelRegistry()
+    registry.register('slow', SlowModel, pool_size=2)
+
+    in_use = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with registry.lease('slow') as model:
+            with lock:
+                assert model not in in_use
+                in_use.append(model)
+                peak.append(len(in_use))
+            time.sleep(0.02)
+            with lock:
+                in_use.remove(model)
+
+    threads = [threading.Thread(target=request) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowModel.built == 2 and max(peak) <= 2
+    stats = registry.stats()['slow']
+    assert stats['instances'] == 2 and stats['leases'] == 6
+
+    # Without a pool, a lease is the shared instance
+    registry.register('shared', SlowModel)
+    with registry.lease('shared') as model:
+        assert model is registry.get('shared')
+    print("✓ 6 requests served by 2 instances")
+
+
+def test_register_after_load():
+    """A loaded model cannot be swapped; unknown names are a KeyError"""
+    print("=" * 70)
+    print("TEST: Registration rules")
+    print("=" * 70)
+
+    registry = ModelRegistry()
+    registry.register('model', object)
+    registry.register('model', dict)  # not loaded yet: replaced
+    assert isinstance(registry.get('model'), dict)
+    try:
+        registry.register('model', list)
+        assert False, "re-registering a loaded model should fail"
+    except RuntimeError:
+        pass
+    try:
+        registry.get('missing')
+        assert False, "unknown model should fail"
+    except KeyError:
+        pass
+    print("✓ Loaded models stay, unknown names raise")
+
+
+def test_warm_and_readiness():
+    """warm() loads ahead of use; readiness() tells loading, loaded and failed apart"""
+    print("=" * 70)
+    print("TEST: Background warm-up and readiness")
+    print("=" * 70)
+
+    registry = ModelRegistry()
+    release = threading.Event()
+    registry.register('slow', lambda: release.wait(5) and SlowModel())
+    registry.register('broken', lambda: 1 / 0)
+    assert registry.readiness() == {'slow': 'not loaded', 'broken': 'not loaded'}
+
+    warmed = []
+    thread = threading.Thread(target=lambda: warmed.append(registry.warm()))
+    thread.start()
+    deadline = time.time() + 5
+    while registry.readiness(['slow'])['slow'] != 'loading' and time.time() < deadline:
+        time.sleep(0.01)
+    assert registry.readiness(['slow']) == {'slow': 'loading'}
+
+    release.set()
+    thread.join()
+    assert warmed == [False]
+    assert registry.readiness() == {'slow': 'loaded', 'broken': 'failed'}
+    assert 'ZeroDivisionError' in registry.stats()['broken']['error']
+    print("✓ not loaded -> loading -> loaded / failed")
+
+
+class BlankDetector:
+    """Detector stand-in recording into its statistics and policy"""
+
+    def __init__(self):
+        self.detection_stats = {'haar': 0}
+        self.cascade_policy = []
+        self.calls = 0
+
+    def detect_faces_robust(self, image, use_preprocessing=True):
+        self.calls += 1
+        self.detection_stats['haar'] += 1
+        if self.cascade_policy is not None:
+            self.cascade_policy.append('haar')
+        return [], 'none'
+
+
+def test_warmup_leaves_no_statistics():
+    """The blank-frame warm-up runs the detectors without counting"""
+    print("=" * 70)
+    print("TEST: Warm-up leaves statistics untouched")
+    print("=" * 70)
+
+    detector = BlankDetector()
+    warm_robust_detector(detector)
+    assert detector.calls == 1
+    assert detector.detection_stats == {'haar': 0} and detector.cascade_policy == []
+    print("✓ Warm-up detection not recorded")
+
+
+def test_enhanced_detector_uses_persisted_policy():
+    """Every enhanced detector the registry builds gets the one persisted policy"""
+    print("=" * 70)
+    print("TEST: Enhanced detector cascade policy")
+    print("=" * 70)
+
+    fake = types.ModuleType('enhanced_face_detector')
+    fake.EnhancedFaceDetector = lambda cascade_policy=None: types.SimpleNamespace(cascade_policy=cascade_policy)
+    real = sys.modules.get('enhanced_face_detector')
+    sys.modules['enhanced_face_detector'] = fake
+    try:
+        first, second = registry_module._enhanced_detector(), registry_module._enhanced_detector()
+    finally:
+        if real is None:
+            del sys.modules['enhanced_face_detector']
+        else:
+            sys.modules['enhanced_face_detector'] = real
+
+    policy = registry_module.enhanced_cascade_policy
+    assert first.cascade_policy is policy and second.cascade_policy is policy
+    assert policy.path == os.path.join(os.path.dirname(os.path.abspath(registry_module.__file__)),
+                                       registry_module.ENHANCED_CASCADE_POLICY_FILE)
+    print(f"✓ Shared policy saved to {os.path.basename(policy.path)}")
+
+
+if __name__ == '__main__':
+    test_get_loads_once()
+    test_lease_pool_is_bounded()
+    test_register_after_load()
+    test_warm_and_readiness()
+    test_warmup_leaves_no_statistics()
+    test_enhanced_detector_uses_persisted_policy()
+    print("\nALL TESTS PASSED")
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 """
 Comprehensive test for Multi-Angle Face Database Manager
-Tests person management, encoding storage, and photo associations
+Tests person management, encoding storage, and photo associations,
+and that threads sharing the manager get a connection each
 """
 
 import numpy as np
 import uuid
+import threading
+import mysql.connector
 from multi_angle_database import MultiAngleFaceDatabase
 
 def test_database_manager():
@@ -284,7 +287,59 @@ def test_database_manager():
     return True
 
 
+class FakeConnection:
+    """Stand-in for a MySQL connection (no server needed)"""
+    
+    def __init__(self, **kwargs):
+        self.thread = threading.get_ident()
+        self.commits = 0
+    
+    def commit(self):
+        self.commits += 1
+    
+    def is_connected(self):
+        return True
+    
+    def close(self):
+        pass
+
+
+def test_connection_per_thread():
+    """Request threads sharing one manager never share a connection"""
+    print("\n" + "=" * 80)
+    print("TEST: ONE CONNECTION PER THREAD")
+    print("=" * 80)
+    
+    connect = mysql.connector.connect
+    mysql.connector.connect = FakeConnection
+    try:
+        db = MultiAngleFaceDatabase()
+        main_connection = db.connection
+        assert db.connection is main_connection, "A thread keeps its connection"
+        
+        seen = []
+        def request():
+            seen.append(db.connection)
+            db.commit()
+        threads = [threading.Thread(target=request) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len({id(connection) for connection in seen + [main_connection]}) == 5
+        assert all(connection.thread != main_connection.thread for connection in seen)
+        assert all(connection.commits == 1 for connection in seen) and main_connection.commits == 0
+        
+        db.close()
+        assert db.connection is not main_connection, "A closed connection is reopened on use"
+    finally:
+        mysql.connector.connect = connect
+    print("✓ 5 threads, 5 connections")
+
+
 if __name__ == "__main__":
+    test_connection_per_thread()
     try:
         success = test_database_manager()
         if success:
@@ -0,0 +1,108 @@
+"""
+Test Parallel Photo Pipeline
+
+Analyzes the sample uploads serially and with a worker pool: the pool must
+return the same analyses, in the same photo order, as the serial run.
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from photo_pipeline import iter_photo_analyses, resolve_workers, ThroughputMeter
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+def _sample_photos():
+    return sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))[:6]
+
+
+def test_parallel_matches_serial():
+    """Worker pool yields the serial analyses in photo order"""
+    print("=" * 70)
+    print("TEST: Parallel vs serial photo analysis")
+    print("=" * 70)
+
+    photos = _sample_photos()
+    if not photos:
+        print("  No sample uploads found, skipping")
+        return
+
+    meter = ThroughputMeter(total=len(photos), interval=0)
+    serial = list(iter_photo_analyses(photos, workers=1, use_robust=False))
+    meter.tick(len(photos))
+    meter.report()
+    parallel = list(iter_photo_analyses(photos, workers=2, chunk_size=2, use_robust=False))
+
+    assert [result['path'] for result in parallel] == photos
+    for expected, got in zip(serial, parallel):
+        assert got['error'] == expected['error']
+        assert got['method'] == expected['method']
+        assert len(got['encodings']) == len(expected['encodings'])
+        for a, b in zip(got['encodings'], expected['encodings']):
+            assert np.allclose(a, b)
+        assert got['orientations'] == expected['orientations']
+        assert got['quality_scores'] == expected['quality_scores']
+
+    assert resolve_workers(0) == (os.cpu_count() or 1)
+    assert resolve_workers(3) == 3
+    print(f"✓ {len(photos)} photos: identical analyses in photo order")
+
+
+def test_standard_path_detects_once():
+    """A 30-face photo is detected once; locations are carried to analysis"""
+    print("=" * 70)
+    print("TEST: Standard path detection count")
+    print("=" * 70)
+
+    import cv2
+    import tempfile
+    import photo_pipeline
+
+    locations = [(10, 20 * i + 18, 28, 20 * i) for i in range(30)]
+    detections = []
+    analyzed = []
+    face_recognition = photo_pipeline.face_recognition
+    original = (getattr(face_recognition, 'face_locations', None),
+                photo_pipeline.encode_faces, photo_pipeline.analyze_face)
+
+    def fake_locations(image):
+        detections.append(image.shape)
+        return list(locations)
+
+    def fake_analysis(image, face_location, gray=None):
+        analyzed.append(face_location)
+        return {'orientation': 'center', 'has_sunglasses': False, 'quality_score': 0.9}
+
+    face_recognition.face_locations = fake_locations
+    # The third face fails to encode and is dropped with its location
+    photo_pipeline.encode_faces = lambda context, locs: [None if i == 2 else np.zeros(128)
+                                                         for i in range(len(locs))]
+    photo_pipeline.analyze_face = fake_analysis
+    try:
+        with tempfile.TemporaryDirectory() as data_dir:
+            path = os.path.join(data_dir, 'group.png')
+            cv2.imwrite(path, np.zeros((40, 640, 3), dtype=np.uint8))
+            result = photo_pipeline.analyze_photo(path)
+    finally:
+        if original[0] is None:
+            del face_recognition.face_locations
+        else:
+            face_recognition.face_locations = original[0]
+        photo_pipeline.encode_faces, photo_pipeline.analyze_face = original[1:]
+
+    assert len(detections) == 1
+    expected = locations[:2] + locations[3:]
+    assert result['locations'] == expected and analyzed == expected
+    assert len(result['encodings']) == len(result['orientations']) == 29
+    print("✓ 1 detection for 30 faces (was 31)")
+
+
+if __name__ == '__main__':
+    test_parallel_matches_serial()
+    test_standard_path_detects_once()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,138 @@
+"""
+Test Processing Manifest
+
+Uploads are processed once: unchanged files are skipped from one stat,
+changed content is processed again, photos without faces are remembered,
+failures are retried, and the manifest survives reloads, torn appends and
+compaction. Events from before the manifest are seeded from their folders.
+"""
+
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import processing_manifest
+from processing_manifest import (
+    ProcessingManifest, STATUS_PROCESSED, STATUS_NO_FACES, STATUS_ERROR, MANIFEST_NAME
+)
+
+
+def _write(path, content):
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+def test_manifest_tracks_uploads():
+    """Skip unchanged uploads in O(1); re-process changed content and failures"""
+    print("=" * 70)
+    print("TEST: Processing manifest")
+    print("=" * 70)
+
+    hashes = []
+    original_digest = processing_manifest.file_digest
+
+    def counting_digest(path):
+        hashes.append(path)
+        return original_digest(path)
+
+    processing_manifest.file_digest = counting_digest
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            upload_dir = os.path.join(root, 'uploads')
+            event_dir = os.path.join(root, 'processed')
+            os.makedirs(upload_dir)
+            photos = {name: os.path.join(upload_dir, name) for name in ('a.jpg', 'b.jpg', 'c.jpg')}
+            for name, path in photos.items():
+                _write(path, name.encode() * 100)
+
+            manifest = ProcessingManifest(event_dir)
+            assert not manifest.exists()
+            assert all(manifest.needs_processing(name, path) for name, path in photos.items())
+
+            manifest.record('a.jpg', photos['a.jpg'], STATUS_PROCESSED, face_count=2,
+                            person_ids={'person_0002', 'person_0001'}, method='robust_dnn')
+            manifest.record('b.jpg', photos['b.jpg'], STATUS_NO_FACES, method='standard')
+            manifest.record('c.jpg', photos['c.jpg'], STATUS_ERROR)
+            assert manifest.get('a.jpg')['person_ids'] == ['person_0001', 'person_0002']
+
+            # Unchanged uploads are skipped without hashing; failures are retried
+            hashes.clear()
+            assert not manifest.needs_processing('a.jpg', photos['a.jpg'])
+            assert not manifest.needs_processing('b.jpg', photos['b.jpg'])
+            assert manifest.needs_processing('c.jpg', photos['c.jpg'])
+            assert hashes == []
+
+            # Same content with a new mtime: hashed once, then skipped by stat again
+            os.utime(photos['a.jpg'], ns=(1, 1))
+            assert not manifest.needs_processing('a.jpg', photos['a.jpg'])
+            assert not manifest.needs_processing('a.jpg', photos['a.jpg'])
+            assert len(hashes) == 1
+
+            # Changed content is processed again
+            _write(photos['b.jpg'], b'new content')
+            assert manifest.needs_processing('b.jpg', photos['b.jpg'])
+
+            # Reload, with a torn tail left by an interrupted append
+            with open(manifest.path, 'a') as f:
+                f.write('{"filename": "d.jp')
+            reloaded = ProcessingManifest(event_dir)
+            assert len(reloaded) == 3
+            assert reloaded.get('a.jpg')['mtime_ns'] == 1
+            assert reloaded.get('b.jpg')['status'] == STATUS_NO_FACES
+
+            reloaded.forget('c.jpg')
+            assert ProcessingManifest(event_dir).get('c.jpg') is None
+
+            # Repeated records are compacted to one line per upload
+            original_min = processing_manifest.COMPACT_MIN_LINES
+            processing_manifest.COMPACT_MIN_LINES = 10
+            try:
+                for _ in range(20):
+                    reloaded.record('a.jpg', photos['a.jpg'], STATUS_PROCESSED, face_count=2,
+                                    person_ids=['person_0001', 'person_0002'])
+            finally:
+                processing_manifest.COMPACT_MIN_LINES = original_min
+            with open(reloaded.path) as f:
+                assert sum(1 for _ in f) <= 10
+            assert ProcessingManifest(event_dir).get('a.jpg')['face_count'] == 2
+    finally:
+        processing_manifest.file_digest = original_digest
+
+    print("✓ Unchanged skipped by stat, changed and failed uploads re-processed")
+
+
+def test_bootstrap_from_processed_folders():
+    """Events processed before the manifest are seeded from the filed copies"""
+    print("=" * 70)
+    print("TEST: Manifest bootstrap")
+    print("=" * 70)
+
+    with tempfile.TemporaryDirectory() as root:
+        upload_dir = os.path.join(root, 'uploads')
+        event_dir = os.path.join(root, 'processed')
+        os.makedirs(upload_dir)
+        for name in ('solo.jpg', 'group.jpg'):
+            _write(os.path.join(upload_dir, name), name.encode())
+
+        filed = {
+            'solo.jpg': {'individual': {'person_0001'}, 'group': set()},
+            'group.jpg': {'individual': set(), 'group': {'person_0001', 'person_0002'}},
+            'gone.jpg': {'individual': {'person_0003'}, 'group': set()},  # upload deleted since
+        }
+        manifest = ProcessingManifest(event_dir)
+        assert manifest.bootstrap(upload_dir, filed) == 2
+        assert os.path.exists(os.path.join(event_dir, MANIFEST_NAME))
+        assert manifest.get('solo.jpg')['face_count'] == 1
+        assert manifest.get('group.jpg')['face_count'] == 2
+        assert not manifest.needs_processing('group.jpg', os.path.join(upload_dir, 'group.jpg'))
+        assert manifest.get('gone.jpg') is None
+
+    print("✓ Seeded from processed folders")
+
+
+if __name__ == '__main__':
+    test_manifest_tracks_uploads()
+    test_bootstrap_from_processed_folders()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,156 @@
+"""
+Test Per-Event Processing Queue
+
+Repeated triggers for an event coalesce into one pending run, no more than
+max_events events run at once, uploads jump ahead of backfill, and
+cancelling drops pending runs and signals the running one, deferring
+on_stopped work until that run has returned.
+"""
+
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from processing_queue import (
+    ProcessingQueue, PRIORITY_UPLOAD, PRIORITY_BACKFILL, STATE_QUEUED, STATE_RUNNING
+)
+
+
+class RecordingJob:
+    """Job that records runs and blocks until released"""
+
+    def __init__(self):
+        self.runs = []
+        self.running = set()
+        self.max_running = 0
+        self.release = threading.Event()
+        self.lock = threading.Lock()
+
+    def __call__(self, event_id, cancel):
+        with self.lock:
+            self.runs.append(event_id)
+            self.running.add(event_id)
+            self.max_running = max(self.max_running, len(self.running))
+        while not self.release.is_set() and not cancel.is_set():
+            time.sleep(0.001)
+        with self.lock:
+            self.running.discard(event_id)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_coalescing_and_concurrency_bound():
+    """Twenty triggers for a running event give one follow-up run; bounded concurrency"""
+    print("=" * 70)
+    print("TEST: Coalescing and bounded concurrency")
+    print("=" * 70)
+
+    job = RecordingJob()
+    queue = ProcessingQueue(job, max_events=2)
+    try:
+        assert queue.submit('event_a')
+        _wait_for(lambda: queue.state('event_a') == STATE_RUNNING)
+        scheduled = [queue.submit('event_a') for _ in range(20)]
+        assert scheduled.count(True) == 1
+
+        for event_id in ('event_b', 'event_c', 'event_d'):
+            queue.submit(event_id)
+        assert not queue.submit('event_d')  # already queued
+        time.sleep(0.05)
+        assert job.max_running == 2
+
+        job.release.set()
+        assert queue.wait_idle(timeout=5)
+        assert sorted(job.runs) == ['event_a', 'event_a', 'event_b', 'event_c', 'event_d']
+        assert job.max_running == 2
+    finally:
+        queue.shutdown()
+
+    print("✓ One follow-up run per burst, at most 2 events at once")
+
+
+def test_priorities_and_cancellation():
+    """Uploads run before backfill; cancel drops pending and stops running"""
+    print("=" * 70)
+    print("TEST: Priorities and cancellation")
+    print("=" * 70)
+
+    job = RecordingJob()
+    queue = ProcessingQueue(job, max_events=1)
+    try:
+        queue.submit('busy', priority=PRIORITY_BACKFILL)
+        _wait_for(lambda: queue.state('busy') == STATE_RUNNING)
+        for event_id in ('old_1', 'old_2', 'old_3'):
+            queue.submit(event_id, priority=PRIORITY_BACKFILL)
+        queue.submit('fresh', priority=PRIORITY_UPLOAD)
+        queue.submit('old_3', priority=PRIORITY_UPLOAD)  # re-triggered by an upload
+        assert queue.state('old_2') == STATE_QUEUED
+
+        # Cancel a pending event and the running one (waits for it to stop)
+        assert queue.cancel('old_2')
+        assert queue.state('old_2') is None
+        assert queue.cancel('busy', wait=True, timeout=5)
+
+        job.release.set()
+        assert queue.wait_idle(timeout=5)
+        assert job.runs == ['busy', 'fresh', 'old_3', 'old_1']
+    finally:
+        queue.shutdown()
+
+    print("✓ Uploads ahead of backfill, cancellation honoured")
+
+
+def test_cleanup_deferred_until_stopped():
+    """cancel(on_stopped=...) never blocks; cleanup runs after the job, before any new run"""
+    print("=" * 70)
+    print("TEST: Deferred cleanup of a cancelled run")
+    print("=" * 70)
+
+    job_done = threading.Event()
+    log = []
+
+    def stubborn_job(event_id, cancel):
+        log.append(('run', event_id))
+        job_done.wait(5)  # a photo that takes a while, whatever the cancel flag says
+        log.append(('returned', event_id))
+
+    def cleanup(event_id):
+        log.append(('cleanup', event_id))
+
+    queue = ProcessingQueue(stubborn_job, max_events=1)
+    try:
+        # Not running: the cleanup runs right away, in the caller
+        assert queue.cancel('idle', on_stopped=lambda: cleanup('idle'))
+        assert log == [('cleanup', 'idle')]
+
+        queue.submit('busy')
+        _wait_for(lambda: queue.state('busy') == STATE_RUNNING)
+        start = time.perf_counter()
+        assert not queue.cancel('busy', on_stopped=lambda: cleanup('busy'))
+        assert time.perf_counter() - start < 0.5
+        assert ('cleanup', 'busy') not in log
+
+        queue.submit('busy')  # e.g. an upload racing the deletion: no new run
+        job_done.set()
+        assert queue.wait_idle(timeout=5)
+        assert log[1:] == [('run', 'busy'), ('returned', 'busy'), ('cleanup', 'busy')]
+        assert queue.state('busy') is None
+    finally:
+        queue.shutdown()
+
+    print("✓ Cleanup after the run returned, request not blocked")
+
+
+if __name__ == '__main__':
+    test_coalescing_and_concurrency_bound()
+    test_priorities_and_cancellation()
+    test_cleanup_deferred_until_stopped()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,83 @@
+"""
+Test Processing Status Board
+
+Per-stage timings are aggregated per run, snapshots report counts,
+photos/sec and ETA, and recording a photo is cheap enough for the hot loop.
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from processing_status import (
+    ProcessingStatusBoard, StageTimer, STAGES, RUN_RUNNING, RUN_CANCELLED
+)
+
+
+def test_run_snapshot():
+    """Counts, outcomes, stage aggregates, rate and ETA"""
+    print("=" * 70)
+    print("TEST: Processing status snapshot")
+    print("=" * 70)
+
+    timer = StageTimer()
+    time.sleep(0.01)
+    timer.lap('decode')
+    timer.restart()
+    timer.lap('detect')
+    assert timer.timings['decode'] >= 0.01 and timer.timings['detect'] < 0.01
+
+    board = ProcessingStatusBoard()
+    assert board.snapshot('event_a') is None
+    board.start_run('event_a', total=10, already_processed=5, workers=2)
+    for i in range(4):
+        board.photo_done('event_a', 'processed' if i else 'no_faces',
+                         {'decode': 0.010, 'detect': 0.100 + i * 0.01, 'unknown_stage': 1.0})
+    time.sleep(0.01)
+
+    status = board.snapshot('event_a', chunk_size=2)
+    assert status['state'] == RUN_RUNNING
+    assert status['photos'] == {'total': 10, 'done': 4, 'in_flight': 4, 'queued': 2,
+                                'already_processed': 5, 'outcomes': {'no_faces': 1, 'processed': 3}}
+    assert set(status['stages']) == set(STAGES)
+    assert status['stages']['detect']['photos'] == 4
+    assert abs(status['stages']['detect']['mean_ms'] - 115.0) < 1e-6
+    assert abs(status['stages']['detect']['max_ms'] - 130.0) < 1e-6
+    assert status['stages']['match']['mean_ms'] is None
+    assert status['photos_per_sec'] > 0 and status['eta_seconds'] is not None
+
+    board.finish_run('event_a', RUN_CANCELLED)
+    status = board.snapshot('event_a')
+    assert status['state'] == RUN_CANCELLED and status['eta_seconds'] is None
+    assert status['photos']['in_flight'] == 0 and status['finished_at']
+
+    print("✓ Counts, stage latency, rate and ETA reported")
+
+
+def test_recording_is_cheap():
+    """Folding in one photo's timings costs microseconds"""
+    print("=" * 70)
+    print("TEST: Instrumentation overhead")
+    print("=" * 70)
+
+    board = ProcessingStatusBoard()
+    board.start_run('event_a', total=100000)
+    timings = {stage: 0.001 for stage in STAGES}
+    start = time.perf_counter()
+    for _ in range(10000):
+        timer = StageTimer(dict(timings))
+        timer.lap('match')
+        timer.lap('file_io')
+        board.photo_done('event_a', 'processed', timer.timings)
+    per_photo_us = (time.perf_counter() - start) * 1e6 / 10000
+    print(f"  {per_photo_us:.1f} µs per photo")
+    assert per_photo_us < 200
+    print("✓ Instrumentation overhead negligible next to per-photo work")
+
+
+if __name__ == '__main__':
+    test_run_snapshot()
+    test_recording_is_cheap()
+    print("\nALL TESTS PASSED")
@@ -0,0 +1,139 @@
+"""
+Test Tiled DNN Detection
+
+Large frames are covered by overlapping tiles sized for the smallest expected
+face, tiles run in one forward pass when the whole frame has no face, and
+boxes cut by a tile edge or found twice in an overlap are merged away.
+"""
+
+import numpy as np
+import sys
+import os
+import glob
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from image_context import ImageContext
+from robust_face_detector import (
+    RobustFaceDetector, dnn_tiles, merge_tile_detections, nms_detections, detection_scale
+)
+
+UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'uploads')
+
+
+def test_tile_grid():
+    """Tiles cover the frame, overlap, and are sized for the smallest face"""
+    print("=" * 70)
+    print("TEST: DNN tile grid")
+    print("=" * 70)
+
+    assert dnn_tiles((300, 300)) == []  # the whole frame is the DNN input size
+
+    tiles = dnn_tiles((1200, 1600))
+    # A 2.5% face of 1200px is 30px: a 450px tile brings it to 20px at 300x300
+    assert {(x2 - x1, y2 - y1) for x1, y1, x2, y2 in tiles} == {(450, 450)}
+    covered = np.zeros((1200, 1600), dtype=int)
+    for x1, y1, x2, y2 in tiles:
+        covered[y1:y2, x1:x2] += 1
+    assert covered.min() >= 1
+    # Neighbours overlap by the 107px face the whole-frame pass still finds
+    xs = sorted({x1 for x1, _, _, _ in tiles})
+    assert xs[0] == 0 and xs[1] == 450 - 107 and max(x2 for _, _, x2, _ in tiles) == 1600
+
+    # A narrow frame gets tiles no wider than itself
+    assert all(x2 <= 540 for _, _, x2, _ in dnn_tiles((1196, 540)))
+    print(f"✓ {len(tiles)} tiles of 450px cover a 1600x1200 frame")
+
+
+def test_merge_across_tiles():
+    """Cut faces at inner tile edges are dropped, duplicates suppressed"""
+    print("=" * 70)
+    print("TEST: Cross-tile merge")
+    print("=" * 70)
+
+    tiles = [(0, 0, 100, 100), (60, 0, 160, 100)]
+    tile_faces = [
+        [{'box': (70, 10, 100, 40), 'confidence': 0.6},    # cut by the inner edge
+         {'box': (62, 50, 90, 80), 'confidence': 0.7},     # whole, also in tile 2
+         {'box': (0, 10, 20, 30), 'confidence': 0.9}],     # at the image border: kept
+        [{'box': (10, 10, 40, 40), 'confidence': 0.8},     # the face cut in tile 1
+         {'box': (3, 50, 31, 80), 'confidence': 0.9}],     # duplicate, more confident
+    ]
+    faces = merge_tile_detections(tile_faces, tiles, (100, 160))
+    assert sorted(face['box'] for face in faces) == [(0, 10, 20, 30), (63, 50, 91, 80), (70, 10, 100, 40)]
+    assert tile_faces[1][0]['box'] == (10, 10, 40, 40)  # input untouched
+
+    boxes = [{'box': (0, 0, 10, 10), 'confidence': 0.5}, {'box': (1, 1, 11, 11), 'confidence': 0.9}]
+    assert nms_detections(boxes) == [boxes[1]]
+    print("✓ One box per face across tiles")
+
+
+class TileOnlyNet:
+    """SSD stand-in that finds nothing in the whole frame, a face in each tile"""
+
+    def __init__(self):
+        self.batches = []
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        n = self.blob.shape[0]
+        self.batches.append(n)
+        confidence = 0.0 if len(self.batches) == 1 else 0.9
+        rows = [[i, 1, confidence, 0.4, 0.4, 0.6, 0.6] for i in range(n)]
+        return np.array(rows, dtype=np.float32).reshape(1, 1, -1, 7)
+
+
+def test_tiles_when_whole_frame_misses():
+    """One forward pass for every tile, only after the whole frame missed"""
+    print("=" * 70)
+    print("TEST: Tiled fallback of the DNN detector")
+    print("=" * 70)
+
+    detector = RobustFaceDetector()
+    detector.models_loaded = {'haar': False, 'hog': False, 'dnn': True, 'mtcnn': False}
+    detector.dnn_detector = TileOnlyNet()
+
+    context = ImageContext.from_bgr(np.zeros((3000, 4000, 3), dtype=np.uint8))
+    faces, method = detector.detect_faces_robust(context, use_preprocessing=False)
+    tiles = dnn_tiles(context.scaled(detection_scale(context.shape)).shape)
+    assert method == 'dnn' and len(faces) == len(tiles)
+    assert detector.dnn_detector.batches == [1, len(tiles)]
+    assert detector.detection_stats['dnn'] == 1
+
+    detector.dnn_detector = TileOnlyNet()
+    faces, method = detector.detect_faces_robust(context, use_preprocessing=False, tiled=False)
+    assert method == 'none' and detector.dnn_detector.batches == [1]
+    print(f"✓ Whole frame, then {len(tiles)} tiles in one pass")
+
+
+def test_group_photo_with_model():
+    """With the res10 model, tiles find group-photo faces the whole frame misses"""
+    print("=" * 70)
+    print("TEST: Tiled detection on upload photos")
+    print("=" * 70)
+
+    photos = sorted(glob.glob(os.path.join(UPLOADS_DIR, '**', '*.jp*g'), recursive=True))
+    detector = RobustFaceDetector()
+    if not photos or not detector.models_loaded.get('dnn'):
+        print("  DNN model or sample uploads not available, skipping")
+        return
+
+    gained = 0
+    for photo in photos:
+        context = ImageContext.from_file(photo)
+        small = context.scaled(detection_scale(context.shape))
+        whole = detector.detect_faces_dnn(small, tiled=False)
+        tiled = detector.detect_faces_dnn(small)
+        assert len(tiled) >= len(whole)
+        gained += len(tiled) - len(whole)
+    print(f"✓ {gained} more faces found with tiles")
+
+
+if __name__ == '__main__':
+    test_tile_grid()
+    test_merge_across_tiles()
+    test_tiles_when_whole_frame_misses()
+    test_group_photo_with_model()
+    print("\nALL TESTS PASSED")
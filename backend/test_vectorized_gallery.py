@@ -0,0 +1,178 @@
+"""
+Test Vectorized Multi-Angle Gallery
+
+Checks that the (persons x angles x 128) gallery matrix stays in sync with
+known_faces and that recognize_face_multi_angle returns exactly what the
+original per-person loop returned. Uses a float64 gallery: bit-identical
+distances need the encodings at their original precision. Also covers the
+legacy model's growable encoding matrix.
+"""
+
+import numpy as np
+import sys
+import os
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import face_recognition
+from face_model import FaceRecognitionModel
+from multi_angle_face_model import MultiAngleFaceModel
+from gallery_test_utils import learned_gallery
+
+
+def _reference_best_match(model, photo_encoding, photo_orientation):
+    """Original per-person loop, kept here as the ground truth"""
+    best_person_id = None
+    best_weighted_distance = float('inf')
+
+    for person_id, data in model.known_faces.items():
+        encodings = data.get('encodings', {})
+
+        distance_to_center = float('inf')
+        distance_to_left = float('inf')
+        distance_to_right = float('inf')
+
+        if 'center' in encodings:
+            distance_to_center = face_recognition.face_distance([encodings['center']], photo_encoding)[0]
+        if 'left' in encodings:
+            distance_to_left = face_recognition.face_distance([encodings['left']], photo_encoding)[0]
+        if 'right' in encodings:
+            distance_to_right = face_recognition.face_distance([encodings['right']], photo_encoding)[0]
+
+        if photo_orientation == 'center':
+            weighted_distance = distance_to_center * 0.6 + distance_to_left * 0.2 + distance_to_right * 0.2
+            primary_distance = distance_to_center
+        elif photo_orientation in ('left', 'angle_left'):
+            weighted_distance = distance_to_left * 0.6 + distance_to_center * 0.3 + distance_to_right * 0.1
+            primary_distance = distance_to_left
+        elif photo_orientation in ('right', 'angle_right'):
+            weighted_distance = distance_to_right * 0.6 + distance_to_center * 0.3 + distance_to_left * 0.1
+            primary_distance = distance_to_right
+        else:
+            primary_distance = min(distance_to_center, distance_to_left, distance_to_right)
+            weighted_distance = (distance_to_center + distance_to_left + distance_to_right) / 3
+
+        final_distance = min(primary_distance, weighted_distance)
+        if final_distance < best_weighted_distance:
+            best_weighted_distance = final_distance
+            best_person_id = person_id
+
+    return best_person_id, best_weighted_distance
+
+
+def _random_encoding(rng):
+    return rng.normal(0, 0.1, 128)
+
+
+def test_gallery_matches_reference_loop():
+    """Vectorized recognition must equal the per-person loop"""
+    print("=" * 70)
+    print("TEST: Vectorized gallery vs reference loop")
+    print("=" * 70)
+
+    rng = np.random.default_rng(7)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = learned_gallery(rng, data_dir, 60, all_angles=True, encoding_dtype='float64')[0]
+
+        orientations = ['center', 'left', 'right', 'angle_left', 'angle_right', 'unknown', None]
+        for trial in range(40):
+            # Half the queries are perturbed copies of stored encodings
+            person_id = model._gallery_ids[trial % len(model._gallery_ids)]
+            query = model.known_faces[person_id]['encodings']['center'] + rng.normal(0, 0.02, 128)
+            if trial % 2:
+                query = _random_encoding(rng)
+
+            for orientation in orientations:
+                expected_id, expected_distance = _reference_best_match(model, query, orientation)
+                matched_id, confidence, angle, distance, details = model.recognize_face_multi_angle(
+                    query, photo_orientation=orientation
+                )
+                assert details['person_id'] == expected_id
+                assert details['final_distance'] == expected_distance
+                assert distance == expected_distance
+
+    print("✓ Vectorized results identical to the reference loop")
+
+
+def test_gallery_tracks_updates_and_migration():
+    """learn/update/migrate must keep the gallery in sync with known_faces"""
+    print("=" * 70)
+    print("TEST: Gallery sync on update and migration")
+    print("=" * 70)
+
+    rng = np.random.default_rng(11)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = learned_gallery(rng, data_dir, 5, all_angles=True, encoding_dtype='float64')[0]
+
+        # Better quality right angle for an existing person
+        person_id = model._gallery_ids[0]
+        center = model.known_faces[person_id]['encodings']['center']
+        right = _random_encoding(rng)
+        assert model.learn_face_multi_angle({'center': center, 'right': right}, {'center': 0, 'right': 99.0}) == person_id
+        row = model._gallery_rows[person_id]
+        assert model._gallery_mask[row, 2]
+        assert np.array_equal(model._gallery[row, 2], right)
+
+        # Legacy migration appends center-only rows
+        legacy_encodings = [_random_encoding(rng) for _ in range(3)]
+        legacy_ids = ['person_9001', 'person_9002', 'person_9003']
+        model.migrate_from_old_model(legacy_encodings, legacy_ids)
+        for encoding, legacy_id in zip(legacy_encodings, legacy_ids):
+            row = model._gallery_rows[legacy_id]
+            assert list(model._gallery_mask[row]) == [True, False, False]
+            assert np.array_equal(model._gallery[row, 0], encoding)
+
+        # Reloading from disk rebuilds the same gallery
+        reloaded = MultiAngleFaceModel(data_file=model.data_file, encoding_dtype='float64')
+        count = len(model._gallery_ids)
+        assert reloaded._gallery_ids == model._gallery_ids
+        assert np.array_equal(reloaded._gallery[:count], model._gallery[:count])
+        assert np.array_equal(reloaded._gallery_mask[:count], model._gallery_mask[:count])
+
+    print("✓ Gallery stays in sync with known_faces")
+
+
+def test_legacy_matrix_grows_in_place():
+    """Legacy model appends into a doubling buffer and returns match distances"""
+    print("=" * 70)
+    print("TEST: Legacy growable encoding matrix")
+    print("=" * 70)
+
+    rng = np.random.default_rng(2)
+    with tempfile.TemporaryDirectory() as data_dir:
+        model = FaceRecognitionModel(data_file=os.path.join(data_dir, 'known_faces.dat'))
+        model.store.fsync = False
+        encodings = [rng.normal(0, 1.0, 128) for _ in range(100)]
+        buffers = set()
+        for encoding in encodings:
+            model.learn_face(encoding)
+            buffers.add(id(model._encodings))
+        assert len(model.known_ids) == 100
+        assert model._encodings.shape[0] == 128
+        assert len(buffers) <= 5, "buffer should only be reallocated when full"
+        assert np.array_equal(model.known_encodings, np.array(encodings))
+
+        query = encodings[42] + rng.normal(0, 0.01, 128)
+        person_id, distance = model.recognize_face(query)
+        assert person_id == model.known_ids[42]
+        assert distance == face_recognition.face_distance([encodings[42]], query)[0]
+        person_id, distance = model.recognize_face(rng.normal(0, 1.0, 128))
+        assert person_id is None and distance > 0.54
+
+        # The snapshot is loaded as the buffer and grows on the next learn
+        model.save_model()
+        reloaded = FaceRecognitionModel(data_file=model.data_file)
+        reloaded.store.fsync = False
+        new_id = reloaded.learn_face(rng.normal(0, 1.0, 128))
+        assert new_id == 'person_0101' and reloaded.known_encodings.shape == (101, 128)
+        assert np.array_equal(reloaded.known_encodings[:100], np.array(encodings))
+
+    print("✓ Amortized growth, distances returned with the match")
+
+
+if __name__ == '__main__':
+    test_gallery_matches_reference_loop()
+    test_gallery_tracks_updates_and_migration()
+    test_legacy_matrix_grows_in_place()
+    print("\nALL TESTS PASSED")